@@ -3,7 +3,7 @@ use serde_json::{Value, json};
 use lambda_runtime::tracing::info;
 use crate::historical_data::BTC_DATA;
 // import from historical_data.rs
-use crate::types::Candle;
+use crate::types::{Candle, Reason, Side, Signal, SIGNAL_SCHEMA_VERSION};
 
 
 use ta::indicators::SimpleMovingAverage;
@@ -65,25 +65,26 @@ struct Position {
     last_fill_time: Option<String>,
 }
 
-fn sma_cross_strategy(data: &[Candle], n1: usize, n2: usize) -> Vec<String> {
+fn signal(side: Side, reason: Reason, price: f64, size: Option<f64>, entry: Option<f64>, index: usize) -> Signal {
+    Signal { indicator: "SMA", side, reason, price, size, entry, index }
+}
+
+fn sma_cross_strategy(data: &[Candle], n1: usize, n2: usize) -> Vec<Signal> {
     let mut sma1 = SimpleMovingAverage::new(n1).unwrap();
     let mut sma2 = SimpleMovingAverage::new(n2).unwrap();
     let mut position = 0; // 0 = flat, 1 = long, -1 = short
     let mut signals = Vec::new();
 
-    for candle in data {
+    for (index, candle) in data.iter().enumerate() {
         let price = candle.close.parse::<f64>().unwrap_or(0.0);
         let sma1_val = sma1.next(price);
         let sma2_val = sma2.next(price);
-        // println!("sma1: {}, sma2: {}", sma1.next(price), sma2.next(price));
 
         if sma1_val > sma2_val && position <= 0 {
-            println!("Buy at price: {}", price);
-            signals.push(format!("Buy at price: {}", price));
+            signals.push(signal(Side::Buy, Reason::Cross, price, None, None, index));
             position = 1;
         } else if sma1_val < sma2_val && position >= 0 {
-            println!("Sell at price: {}", price);
-            signals.push(format!("Sell at price: {}", price));
+            signals.push(signal(Side::Sell, Reason::Cross, price, None, None, index));
             position = -1;
         }
     }
@@ -96,7 +97,7 @@ fn sma_cross_strategy_with_positions(
     n1: usize,
     n2: usize,
     positions: &[Position],
-) -> Vec<String> {
+) -> Vec<Signal> {
     let mut sma1 = SimpleMovingAverage::new(n1).unwrap();
     let mut sma2 = SimpleMovingAverage::new(n2).unwrap();
     let mut open_positions: Vec<(f64, f64)> = positions.iter()
@@ -111,7 +112,7 @@ fn sma_cross_strategy_with_positions(
     let mut prev_sma1 = None;
     let mut prev_sma2 = None;
 
-    for candle in data {
+    for (index, candle) in data.iter().enumerate() {
         let price = candle.close.parse::<f64>().unwrap_or(0.0);
         let curr_sma1 = sma1.next(price);
         let curr_sma2 = sma2.next(price);
@@ -120,23 +121,23 @@ fn sma_cross_strategy_with_positions(
             // Bullish crossover: Buy signal
             if p_sma1 <= p_sma2 && curr_sma1 > curr_sma2 {
                 let size = 0.001;
-                signals.push(format!("Buy at price: {} size: {}", price, size));
+                signals.push(signal(Side::Buy, Reason::Cross, price, Some(size), None, index));
                 open_positions.push((price, size));
             }
             // Bearish crossover: Sell signal (close oldest position)
             else if p_sma1 >= p_sma2 && curr_sma1 < curr_sma2 && !open_positions.is_empty() {
                 let (entry_price, size) = open_positions.remove(0);
-                signals.push(format!("Sell at price: {} size: {} entry: {}", price, size, entry_price));
+                signals.push(signal(Side::Sell, Reason::Cross, price, Some(size), Some(entry_price), index));
             }
         }
 
         // Stop-loss/take-profit for all open positions
         open_positions.retain(|(entry, size)| {
             if price <= entry * 0.95 {
-                signals.push(format!("Stop-loss sell at price: {} size: {} entry: {}", price, size, entry));
+                signals.push(signal(Side::Sell, Reason::StopLoss, price, Some(*size), Some(*entry), index));
                 false
             } else if price >= entry * 1.10 {
-                signals.push(format!("Take-profit sell at price: {} size: {} entry: {}", price, size, entry));
+                signals.push(signal(Side::Sell, Reason::TakeProfit, price, Some(*size), Some(*entry), index));
                 false
             } else {
                 true
@@ -173,11 +174,11 @@ fn backtest_sma_strategy(
     for (i, signal) in signals.iter().enumerate() {
         let price = data.get(i).map(|c| c.close.parse::<f64>().unwrap_or(0.0)).unwrap_or(0.0);
 
-        if signal.contains("Buy at price") && !in_position {
+        if signal.side == Side::Buy && !in_position {
             entry_price = price;
             in_position = true;
             open_position_entry = Some(price);
-        } else if signal.contains("Sell at price") && in_position {
+        } else if signal.side == Side::Sell && signal.reason == Reason::Cross && in_position {
             // Simple PnL calculation: sell - buy
             balance += price - entry_price;
             in_position = false;
@@ -268,21 +269,20 @@ pub async fn function_handler(event: LambdaEvent<Value>) -> Result<Value, Error>
         return Err(Error::from("n1 must be less than n2"));
     }
 
-    let sma_signals = sma_cross_strategy(&data, n1, n2)
-        .into_iter()
-        .map(|s| format!("SMA Signal: {}", s))
-        .collect::<Vec<String>>();
+    let sma_signals = sma_cross_strategy(&data, n1, n2);
     // let macd_signals = macd_strategy(&data, 12, 26, 9, &positions)
     //     .into_iter()
     //     .map(|s| format!("MACD Signal: {}", s))
     //     .collect::<Vec<String>>();
     // let signals = [sma_signals, macd_signals].concat();
     let signals = sma_signals; // For now, only using SMA signals
-    for signal in signals {
-        println!("{}", signal);
-    }
+    info!("Signals: {:?}", signals);
 
-    Ok(json!({ "message": "Invoked directly!", "input": event.payload }))
+    Ok(json!({
+        "status": "success",
+        "schema": SIGNAL_SCHEMA_VERSION,
+        "signals": signals,
+    }))
 }
 
 
@@ -296,8 +296,8 @@ mod tests {
         // This data will cause SMA(2) to cross above SMA(3) (buy), then below (sell)
         let data = BTC_DATA.clone();
         let signals = sma_cross_strategy(&data, 2, 3);
-        assert!(signals.iter().any(|s| s.contains("Buy at price")), "Should generate a buy signal");
-        assert!(signals.iter().any(|s| s.contains("Sell at price")), "Should generate a sell signal");
+        assert!(signals.iter().any(|s| s.side == Side::Buy), "Should generate a buy signal");
+        assert!(signals.iter().any(|s| s.side == Side::Sell), "Should generate a sell signal");
     }
 
     #[test]
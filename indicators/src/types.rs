@@ -1,4 +1,4 @@
-use serde::Deserialize;
+use serde::{Deserialize, Serialize};
 
 #[derive(Debug, Deserialize, Clone)]
 pub struct Candle {
@@ -8,4 +8,34 @@ pub struct Candle {
     pub high: String,
     pub open: String,
     pub volume: String,
-}
\ No newline at end of file
+}
+
+pub const SIGNAL_SCHEMA_VERSION: u32 = 1;
+
+#[derive(Debug, Serialize, Clone, Copy, PartialEq)]
+#[serde(rename_all = "UPPERCASE")]
+pub enum Side {
+    Buy,
+    Sell,
+}
+
+#[derive(Debug, Serialize, Clone, Copy, PartialEq)]
+#[serde(rename_all = "SCREAMING_SNAKE_CASE")]
+pub enum Reason {
+    Cross,
+    StopLoss,
+    TakeProfit,
+}
+
+/// A trading signal, decoded by serverless/utils/signals.py
+#[derive(Debug, Serialize, Clone, PartialEq)]
+pub struct Signal {
+    pub indicator: &'static str,
+    pub side: Side,
+    pub reason: Reason,
+    pub price: f64,
+    pub size: Option<f64>,
+    pub entry: Option<f64>,
+    /// Position of the candle in the window received
+    pub index: usize,
+}
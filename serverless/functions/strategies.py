@@ -1,23 +1,142 @@
-import json
 import datetime
+import functools
 
+from concurrent.futures import ThreadPoolExecutor, wait
 from decimal import Decimal
-from pydantic import Field
+from pydantic import Field, PrivateAttr
 from typing import List
 
 
 from models.queues import ProductConfiguration
-from models.order_configs import OrderConfigurationMapping
 from models.api import Position
 
 from utils.logger import logger as log
+from utils.metrics import metrics
 from utils.api_client import ProviderClient, notify_assistant
 from utils.lambda_client import LambdaClient
+from utils.config_cache import ConfigurationCache
+from utils.serialization import dumps, loads
+from utils.claim_check import check_in
+from utils.candle_publisher import candle_publisher
+from utils.candle_codec import pack
+from utils.indicator_cache import Uncached, indicator_cache, window_key
+from utils.features import FeatureSet, candle_features
+from utils.indicators import sma_cross_records
+from utils.signals import SignalDecodeException, decode
+from utils.decision_memo import decision_memo
+from utils.volume_profile import volume_profiles
+from utils.timeframes import timeframe_table
+from utils.position_index import POSITION_INDEX_MIN_POSITIONS, position_indexes, profit
+from utils.trigger_book import trigger_books
+from utils.excursions import entry_time, excursions, trailing_stops
+from utils.portfolio_analytics import portfolio_analytics
 from utils.common import send_message_to_queue, ULID, Env, ASSISTANT_NOTIFICATION_MESSAGE
 from utils import exceptions
 
 SERVICE = "strategy"
 
+# Parameters sent to the technical analysis Lambda
+TA_PARAMS = {
+    "n1": 14,  # TODO: Configurable
+    "n2": 50,  # TODO: Configurable
+    "indicators": (
+        "sma",  # Simple Moving Average
+        # "ema",  # Exponential Moving Average
+        # "rsi",  # Relative Strength Index
+        # "macd",  # Moving Average Convergence Divergence
+        # "bollinger_bands",  # Bollinger Bands
+    ),
+    "candle_stick_scope": 12,  # TODO: Configurable
+    "support_resistance_tolerance": 0.05,  # TODO: Configurable
+}
+
+# Parameters of the per-run candle features, the same as sent to the TA Lambda
+FEATURE_PARAMS = {
+    "tolerance": TA_PARAMS["support_resistance_tolerance"],
+    "candle_stick_scope": TA_PARAMS["candle_stick_scope"],
+    "n1": TA_PARAMS["n1"],
+    "n2": TA_PARAMS["n2"],
+}
+# Candle windows whose features a strategy keeps at once
+MAX_FEATURE_SETS = 4
+
+# Restricted price diff percentage (min, max) per strategy term, a window
+# whose diff_pct is within the range fails the price diff check
+PRICE_DIFF_PCT_RESTRICTED = {
+    "SHORT_TERM": (Decimal("1.0"), Decimal("1.0")),  # TODO: Configurable
+    "MEDIUM_TERM": (Decimal("-10.0"), Decimal("-5.0")),
+    "LONG_TERM": None,
+}
+# Lowest profit percentage at which a position is worth a notification,
+# positions are sold above the configured profit_target
+PROFIT_TARGET_PCT_MIN = Decimal("4.0")  # TODO: Configurable
+# Distance from the support/resistance level, relative to it, that confirms a side
+SUPPORT_LEVEL_THRESHOLD = Decimal("0.01")  # TODO: Configurable
+RESISTANCE_LEVEL_THRESHOLD = Decimal("0.01")  # TODO: Configurable
+
+# Stages of a run in evaluation order, cheapest first, with what they cost.
+# A stage that rejects the run skips every later one, so the remote TA call
+# is only made once the local gates have passed.
+RUN_STAGES = (
+    ("order_side", "local"),
+    ("confirm_side_with_trend", "local"),
+    ("portfolio_exposure", "local"),
+    ("ta_indicators", "remote"),
+)
+
+# Remote TA invokes still running after their hedge budget can hold a few
+# workers, the pool is created on first use
+TA_HEDGE_WORKERS = 4
+# Longest wait for hedged remote TA invokes before the handler returns, the
+# ones still running after it are logged and left to finish
+TA_HEDGE_DRAIN_MS = 100
+# Time left to the invocation when draining remote TA invokes stops
+TA_HEDGE_DRAIN_MARGIN_MS = 1000
+_ta_executor = None
+# Remote TA invokes the local indicators served in place of, to their correlation_id
+_ta_hedged = {}
+
+
+def ta_executor():
+    global _ta_executor
+    if _ta_executor is None:
+        _ta_executor = ThreadPoolExecutor(max_workers=TA_HEDGE_WORKERS, thread_name_prefix="ta-hedge")
+    return _ta_executor
+
+
+def drain_ta_hedges(timeout):
+    """
+    Waits up to timeout seconds for the remote TA invokes that were hedged,
+    so their metrics and logs stay in the invocation that started them.
+    Invokes not started yet are cancelled, the ones still running are
+    logged with their correlation_id and left to finish.
+    """
+    if not _ta_hedged:
+        return
+    done, running = wait(list(_ta_hedged), timeout=timeout)
+    for future in done:
+        _ta_hedged.pop(future)
+    for future in running:
+        correlation_id = _ta_hedged.pop(future)
+        if future.cancel():
+            metrics.increment("ta_indicators_hedge_cancelled")
+        else:
+            metrics.increment("ta_indicators_hedge_orphaned")
+            log.warning("TA_HEDGE_ORPHANED", correlation_id=correlation_id, service=SERVICE)
+
+
+def ta_hedges_drained(fn):
+    """ Decorates a handler so the remote TA invokes it hedged are drained before it returns """
+    @functools.wraps(fn)
+    def wrapper(event, context):
+        try:
+            return fn(event, context)
+        finally:
+            remaining_ms = getattr(context, "get_remaining_time_in_millis", None)
+            timeout = min(remaining_ms() - TA_HEDGE_DRAIN_MARGIN_MS, TA_HEDGE_DRAIN_MS) if remaining_ms else 0
+            drain_ta_hedges(max(timeout, 0) / 1000)
+    return wrapper
+
 
 class MomentumStrategy(ProductConfiguration):
     correlation_id: str = Field(..., alias="correlation_id")
@@ -25,15 +144,82 @@ class MomentumStrategy(ProductConfiguration):
     portfolio: dict = Field(..., alias="portfolio")
     strategy_term: str = Field(..., alias="strategy_term")
 
+    _loggers: dict = PrivateAttr(default_factory=dict)
+    _feature_sets: dict = PrivateAttr(default_factory=dict)
+
+    def _logger(self, operation, **context):
+        """ Logger bound to this run's context, created once per operation """
+        key = (operation, tuple(context.items()))
+        logger = self._loggers.get(key)
+        if logger is None:
+            logger = log.bind(
+                correlation_id=self.correlation_id,
+                product_id=self.product_id,
+                provider=self.provider,
+                service=SERVICE,
+                operation=operation,
+                **context,
+            )
+            self._loggers[key] = logger
+        return logger
+
+    def features(self, historical_data, **params):
+        """
+        Lazily derived features of a candle window (see utils.features).
+        The latest few windows are kept, so every stage of a run shares the
+        values derived from the same candles.
+        """
+        params = {**FEATURE_PARAMS, **params}
+        key = (id(historical_data), tuple(params.items()))
+        entry = self._feature_sets.get(key)
+        # The entry keeps the window alive, so its id cannot be reused
+        if entry is not None and entry.candles is historical_data:
+            return entry
+        features = FeatureSet(candle_features, historical_data, **params)
+        self._feature_sets[key] = features
+        if len(self._feature_sets) > MAX_FEATURE_SETS:
+            self._feature_sets.pop(next(iter(self._feature_sets)))
+        return features
+
+    @candle_features.consumes("latest_close")
     def review_positions(self, data):
-        OPERATION = "REVIEW_POSITIONS"
-        logger = log.bind(
-            correlation_id=self.correlation_id,
-            product_id=self.product_id,
-            provider=self.provider,
-            service=SERVICE,
-            operation=OPERATION,
+        positions = self._review_positions(data)
+        if Env.TRAILING_STOP_PCT and self.positions:
+            positions = self._with_trailing_stops(data, positions)
+        return positions
+
+    def _with_trailing_stops(self, data, positions):
+        """ Adds the positions whose trailing stop was hit within the candle window, in book order """
+        stats = excursions(
+            data,
+            [position.average_filled_price for position in self.positions],
+            [entry_time(position) for position in self.positions],
         )
+        if stats is None:
+            return positions
+        stopped = trailing_stops(stats, Env.TRAILING_STOP_PCT, Env.TRAILING_STOP_ACTIVATION_PCT)
+        if not stopped.any():
+            return positions
+
+        selected = {position.position_id for position in positions}
+        added = [
+            position for position, hit in zip(self.positions, stopped)
+            if hit and position.position_id not in selected
+        ]
+        if added:
+            self._logger("REVIEW_POSITIONS").info(
+                "TRAILING_STOP_HIT",
+                message="Positions fell from their peak since entry",
+                position_ids=[position.position_id for position in added],
+                trail_pct=Env.TRAILING_STOP_PCT,
+            )
+        selected.update(position.position_id for position in added)
+        return [position for position in self.positions if position.position_id in selected]
+
+    @candle_features.consumes("latest_close")
+    def _review_positions(self, data):
+        OPERATION = "REVIEW_POSITIONS"
+        logger = self._logger(OPERATION)
 
         if not self.positions:
             logger.warning(
@@ -44,6 +230,17 @@ class MomentumStrategy(ProductConfiguration):
             )
             return []
 
+        key = (self.provider, self.product_id, self.strategy_term)
+        if Env.SELL_REVIEW_MODE == "triggers":
+            book = trigger_books.book(key, self.positions, self.profit_target, PROFIT_TARGET_PCT_MIN)
+            if not book.degenerate:
+                return self._review_triggered_positions(data, book)
+
+        if len(self.positions) >= POSITION_INDEX_MIN_POSITIONS:
+            index = position_indexes.index(key, self.positions)
+            if not index.degenerate:
+                return self._review_indexed_positions(data, index)
+
         positions_with_profit = []
         for position in self.positions:
             try:
@@ -64,15 +261,69 @@ class MomentumStrategy(ProductConfiguration):
 
         return positions_with_profit
 
+    @candle_features.consumes("latest_close")
+    def _review_indexed_positions(self, data, index):
+        """
+        review_positions through a position index: only the positions in
+        the notification band are analyzed one by one, the sellable ones
+        above it are found by bisection. Returns the same positions.
+        """
+        logger = self._logger("REVIEW_POSITIONS")
+        current_price = self.features(data)["latest_close"]
+        for position in index.in_band(current_price, PROFIT_TARGET_PCT_MIN, self.profit_target):
+            try:
+                self.analyze_historical_data_selling(
+                    data, position.filled_size, position.average_filled_price, position.position_id
+                )
+            except exceptions.AnalyzeSellPricesException as e:
+                logger.warning("REVIEW_MARKET_ANALYZE_EXCEPTION", **e.__dict__)
+            except Exception as e:
+                logger.error(
+                    "REVIEW_MARKET_GENERAL_EXCEPTION",
+                    message="Error analyzing sell prices",
+                    error=str(e),
+                )
+                raise e
+
+        return index.above(current_price, max(PROFIT_TARGET_PCT_MIN, self.profit_target))
+
+    @candle_features.consumes("latest_close")
+    def _review_triggered_positions(self, data, book):
+        """
+        review_positions through a trigger book: only the positions whose
+        thresholds the price crossed since the previous review are looked
+        at, those entering the notification band are analyzed (and
+        notified) once. Returns every position in the sell band.
+        """
+        logger = self._logger("REVIEW_POSITIONS")
+        crossings = book.update(self.features(data)["latest_close"])
+        for position in crossings.notify:
+            try:
+                self.analyze_historical_data_selling(
+                    data, position.filled_size, position.average_filled_price, position.position_id
+                )
+            except exceptions.AnalyzeSellPricesException as e:
+                logger.warning("REVIEW_MARKET_ANALYZE_EXCEPTION", **e.__dict__)
+            except Exception as e:
+                logger.error(
+                    "REVIEW_MARKET_GENERAL_EXCEPTION",
+                    message="Error analyzing sell prices",
+                    error=str(e),
+                )
+                raise e
+        if crossings.sell:
+            logger.info(
+                "SELL_TRIGGERED",
+                message="Positions entered the sell band",
+                position_ids=[position.position_id for position in crossings.sell],
+            )
+
+        return book.sellable()
+
+    @candle_features.consumes("diff_pct", "latest_close")
     def order_side(self, historical_data, side=None):
         OPERATION = "ORDER_SIDE"
-        logger = log.bind(
-            correlation_id=self.correlation_id,
-            product_id=self.product_id,
-            provider=self.provider,
-            service=SERVICE,
-            operation=OPERATION,
-        )
+        logger = self._logger(OPERATION)
         if self.strategy_term == "SHORT_TERM":
             # For short term trading, this will always be a buy
             return "BUY", [], f"{SERVICE}_{OPERATION}_HIGH"
@@ -113,145 +364,143 @@ class MomentumStrategy(ProductConfiguration):
 
                 return side, positions, risk
 
+    @candle_features.consumes("diff_pct")
     def validate_price_diff_pct(self, historical_data):
         """ This function checks the max min diff percentage"""
         OPERATION = "PRICE_DIFF_PCT"
-        logger = log.bind(
-            correlation_id=self.correlation_id,
-            product_id=self.product_id,
-            provider=self.provider,
-            service=SERVICE,
-            operation=OPERATION,
-        )
-        
-        latest_price = historical_data[0]["close"] or 0
-        opening_price = historical_data[-1]["close"] or 0
+        logger = self._logger(OPERATION)
 
         try:
-            _diff = Decimal(latest_price) - Decimal(opening_price)
-            try:
-                x = _diff / Decimal(opening_price)
-            except ZeroDivisionError:
-                x = 0
-            diff_pct = (x) * 100
-
-            if self.strategy_term == "SHORT_TERM":
-                price_diff_pct_max_threshold = Decimal("1.0")
-                price_diff_pct_min_threshold = Decimal("1.0")
-                if price_diff_pct_max_threshold <= diff_pct <= price_diff_pct_min_threshold:  # TODO: Configurable
-                    return False, diff_pct
-            elif self.strategy_term == "MEDIUM_TERM":
-                price_diff_pct_max_threshold = Decimal("-5.0")
-                price_diff_pct_min_threshold = Decimal("-10.0")
-                # For MEDIUM_TERM, we return False if the diff_pct is in the restricted range (-10% to -5%)
-                if price_diff_pct_min_threshold <= diff_pct <= price_diff_pct_max_threshold:
-                    return False, diff_pct
-            elif self.strategy_term == "LONG_TERM":
-                pass
-                # price_diff_pct_max_threshold = self.price_diff_pct_max_threshold
-                # price_diff_pct_min_threshold = self.price_diff_pct_min_threshold
-            else:
+            diff_pct = self.features(historical_data)["diff_pct"]
+
+            if self.strategy_term not in PRICE_DIFF_PCT_RESTRICTED:
                 raise ValueError(
                     f"Invalid strategy term: {self.strategy_term}"
                 )
+            restricted = PRICE_DIFF_PCT_RESTRICTED[self.strategy_term]
+            # We return False if the diff_pct is in the term's restricted range
+            if restricted and restricted[0] <= diff_pct <= restricted[1]:
+                return False, diff_pct
         except Exception as e:
             logger.error("ERROR_VALIDATING_PRICE_DIFF_PCT", message=str(e))
             raise
 
         return True, diff_pct
 
-    def validate_support_resistance(self, historical_data, tolerance=0.05):
-        from statistics import mean
-        """ This function checks the support and resistance levels"""
-        OPERATION = "VALIDATE_SUPPORT_RESISTANCE"
-        logger = log.bind(
-            correlation_id=self.correlation_id,
-            product_id=self.product_id,
-            provider=self.provider,
-            service=SERVICE,
-            operation=OPERATION,
-        )
+    @candle_features.consumes("max_min_pct")
+    def validate_maxmin_pct(self, historical_data):
+        """
+        Checks the window has moved at least maxmin_pct_threshold percent
+        between its lowest low and highest high. Not part of the decision yet.
+        """
+        OPERATION = "MAXMIN_PCT"
+        logger = self._logger(OPERATION)
         try:
-            highs = [Decimal(candle["high"]) for candle in historical_data]
-            lows = [Decimal(candle["low"]) for candle in historical_data]
+            max_min_pct = self.features(historical_data)["max_min_pct"]
+        except Exception as e:
+            logger.error("ERROR_VALIDATING_MAXMIN_PCT", message=str(e))
+            raise
 
-            # Find potential support and resistance levels
-            support_levels = []
-            resistance_levels = []
+        if max_min_pct is None or max_min_pct < self.maxmin_pct_threshold:
+            return False, max_min_pct
+        return True, max_min_pct
 
-            for low in lows:
-                if all(abs(low - other_low) / low <= tolerance for other_low in lows):
-                    support_levels.append(low)
+    def _cached(self, name, historical_data, compute, *params, shared=False):
+        """ Runs compute() once per candle window of this product, see utils.indicator_cache """
+        key = None
+        if indicator_cache.enabled:
+            key = window_key(name, historical_data, *params, scope=(self.provider, self.product_id))
+        return indicator_cache.get_or_compute(key, compute, shared=shared)
 
-            for high in highs:
-                if all(abs(high - other_high) / high <= tolerance for other_high in highs):
-                    resistance_levels.append(high)
+    def validate_support_resistance(self, historical_data, tolerance=0.05):
+        return self._cached(
+            "support_resistance",
+            historical_data,
+            lambda: self._validate_support_resistance(historical_data, tolerance),
+            tolerance,
+        )
 
-            # Average the clustered levels
-            support = mean(support_levels) if support_levels else None
-            resistance = mean(resistance_levels) if resistance_levels else None
+    @candle_features.consumes("levels")
+    def _validate_support_resistance(self, historical_data, tolerance):
+        """ This function checks the support and resistance levels"""
+        OPERATION = "VALIDATE_SUPPORT_RESISTANCE"
+        logger = self._logger(OPERATION)
+        try:
+            return self.features(historical_data, tolerance=tolerance)["levels"]
         except Exception as e:
             logger.error("ERROR_VALIDATING_SUPPORT_RESISTANCE", message=str(e))
             raise e
-
-        
-        return {"support": support, "resistance": resistance}
     
+    def volume_profile_levels(self, historical_data):
+        """ Support and resistance from the high-volume nodes of the product's volume profile """
+        OPERATION = "VOLUME_PROFILE_LEVELS"
+        logger = self._logger(OPERATION)
+        try:
+            profile = volume_profiles.profile(
+                (self.provider, self.product_id, self.strategy_term), historical_data
+            )
+            return profile.levels(historical_data[0]["close"])
+        except Exception as e:
+            logger.error("ERROR_VOLUME_PROFILE_LEVELS", message=str(e))
+            raise e
+
+    def timeframes(self, historical_data):
+        """ Confirmation features of the window resampled to every higher timeframe, see utils.timeframes """
+        return self._cached(
+            "timeframes",
+            historical_data,
+            lambda: timeframe_table(
+                historical_data,
+                candle_stick_scope=FEATURE_PARAMS["candle_stick_scope"],
+                tolerance=FEATURE_PARAMS["tolerance"],
+                n1=FEATURE_PARAMS["n1"],
+                n2=FEATURE_PARAMS["n2"],
+            ),
+        )
+
     def detect_bullish_engulfing(self, historical_data):
-        # Assumes data is a list of dicts with 'open', 'close', 'high', 'low'
-        for i in range(1, len(historical_data)):
-            prev = historical_data[len(historical_data)-i]
-            curr = historical_data[(len(historical_data)-i)-1]
-
-            prev_open = Decimal(prev["open"])
-            prev_close = Decimal(prev["close"])
-            curr_open = Decimal(curr["open"])
-            curr_close = Decimal(curr["close"])
-            
-            # Previous candle bearish, current candle bullish and engulfs previous
-            if prev_close < prev_open and curr_close > curr_open:
-                if curr_close > prev_open and curr_open < prev_close:
-                    return True
-        return False
+        return self._cached(
+            "bullish_engulfing",
+            historical_data,
+            lambda: self._detect_bullish_engulfing(historical_data),
+        )
+
+    @candle_features.consumes("bullish_engulfing")
+    def _detect_bullish_engulfing(self, historical_data):
+        # Any candle pair in the window, not only the candle stick scope
+        return self.features(historical_data, candle_stick_scope=None)["bullish_engulfing"]
 
     def detect_bearish_engulfing(self, historical_data):
-        for i in range(1, len(historical_data)):
-            prev = historical_data[len(historical_data)-i]
-            curr = historical_data[(len(historical_data)-i)-1]
-
-            prev_open = Decimal(prev["open"])
-            prev_close = Decimal(prev["close"])
-            curr_open = Decimal(curr["open"])
-            curr_close = Decimal(curr["close"])
-
-            if prev_close > prev_open and curr_close < curr_open:
-                if curr_open > prev_close and curr_close < prev_open:
-                    return True
-        return False
-    
+        return self._cached(
+            "bearish_engulfing",
+            historical_data,
+            lambda: self._detect_bearish_engulfing(historical_data),
+        )
+
+    @candle_features.consumes("bearish_engulfing")
+    def _detect_bearish_engulfing(self, historical_data):
+        return self.features(historical_data, candle_stick_scope=None)["bearish_engulfing"]
+
+    @candle_features.consumes("levels", "latest_close", "bullish_engulfing", "bearish_engulfing")
     def confirm_side_with_trend(self, historical_data, side):
-        levels = self.validate_support_resistance(historical_data)
+        features = self.features(historical_data)
+        if Env.SUPPORT_RESISTANCE_SOURCE == "volume_profile" and "start" in historical_data[0]:
+            levels = self.volume_profile_levels(historical_data)
+        else:
+            levels = self.validate_support_resistance(historical_data)
         support = levels["support"]
         resistance = levels["resistance"]
-        latest_close = Decimal(historical_data[0]["close"])
-        logger = log.bind(
-            correlation_id=self.correlation_id,
-            product_id=self.product_id,
-            provider=self.provider,
-            service=SERVICE,
-            operation="CONFIRM_SIDE_WITH_TREND",
-            strategy_term=self.strategy_term,
-        )
+        latest_close = features["latest_close"]
+        logger = self._logger("CONFIRM_SIDE_WITH_TREND", strategy_term=self.strategy_term)
 
-        candle_stick_scope = 12
-        support_level_threshold = Decimal("0.01")  # TODO: Configurable
-        resistance_level_threshold = Decimal("0.01")  # TODO: Configurable
+        # Engulfing patterns within the candle stick scope of the window
+        bullish = features["bullish_engulfing"]
+        bearish = features["bearish_engulfing"]
 
-        bullish = self.detect_bullish_engulfing(historical_data[:candle_stick_scope]) 
-        bearish = self.detect_bearish_engulfing(historical_data[:candle_stick_scope])
-
-        if (support and (abs(latest_close - support) / support < support_level_threshold) and bullish and side == "BUY") or \
-           (resistance and (abs(latest_close - resistance) / resistance < resistance_level_threshold) and bearish and side == "SELL"):  # TODO: Configurable
+        if (support and (abs(latest_close - support) / support < SUPPORT_LEVEL_THRESHOLD) and bullish and side == "BUY") or \
+           (resistance and (abs(latest_close - resistance) / resistance < RESISTANCE_LEVEL_THRESHOLD) and bearish and side == "SELL"):  # TODO: Configurable
+            if Env.CONFIRM_TIMEFRAMES and "start" in historical_data[0]:
+                self.confirm_side_with_timeframes(historical_data, side)
             return True
 
         logger.warning(
@@ -268,15 +517,30 @@ class MomentumStrategy(ProductConfiguration):
             f"Invalid side: {side}. Support: {support}, Resistance: {resistance}, Latest Close: {latest_close}"
         )
 
+    def confirm_side_with_timeframes(self, historical_data, side):
+        """ Rejects a side the trend of one of the CONFIRM_TIMEFRAMES runs against """
+        table = self.timeframes(historical_data)
+        opposing = "DOWN" if side == "BUY" else "UP"
+        against = [
+            name.strip() for name in Env.CONFIRM_TIMEFRAMES.split(",")
+            if table.get(name.strip(), {}).get("trend") == opposing
+        ]
+        if not against:
+            return True
+
+        self._logger("CONFIRM_SIDE_WITH_TIMEFRAMES", strategy_term=self.strategy_term).warning(
+            "CONFIRM_SIDE_WITH_TIMEFRAMES_WARNING",
+            message="Higher timeframe trend against side",
+            side=side,
+            timeframes=against,
+        )
+        raise exceptions.InvalidSideException(
+            f"Invalid side: {side}. Trend {opposing} on timeframes: {', '.join(against)}"
+        )
+
     def handle_historical_data(self):
         OPERATION = "HANDLE_HISORTICAL_DATA"
-        logger = log.bind(
-            correlation_id=self.correlation_id,
-            product_id=self.product_id,
-            provider=self.provider,
-            service=SERVICE,
-            operation=OPERATION,
-        )
+        logger = self._logger(OPERATION)
         if self.strategy_term == "SHORT_TERM":
             # UNIX value for 4 hours ago
             start = int(
@@ -300,11 +564,7 @@ class MomentumStrategy(ProductConfiguration):
 
             candles = response["candles"]
 
-            # send this data to data collection service
-            msg_body = {
-                "data_collection_type": "CANDLE_STICK",
-                "candle_stick_data": candles,
-            }
+            # send new closed candles to data collection service
             msg_attributes = {
                 "provider": {
                     "stringValue": self.provider,
@@ -319,9 +579,14 @@ class MomentumStrategy(ProductConfiguration):
                     "dataType": "String",
                 },
             }
-            send_message_to_queue(
+            candle_publisher.publish(
+                send_message_to_queue,
                 Env.QUEUE_DATA_COLLECTION_URL,
-                msg_body,
+                self.provider,
+                self.product_id,
+                granularity,
+                candles,
+                period_seconds=60,
                 msg_attrs=msg_attributes,
             )
         elif self.strategy_term == "MEDIUM_TERM":
@@ -362,13 +627,7 @@ class MomentumStrategy(ProductConfiguration):
         # We skip adding the trend to our sum for our first
         # price since that's just used to get the prev trend
         # for our initial price
-        logger = log.bind(
-            correlation_id=self.correlation_id,
-            product_id=self.product_id,
-            provider=self.provider,
-            service=SERVICE,
-            operation="ANALYZE_BUY_DATA",
-        )
+        logger = self._logger("ANALYZE_BUY_DATA")
       
         maxmin_diffpct_check_passed, diff_pct = self.validate_price_diff_pct(data)
         if not maxmin_diffpct_check_passed:
@@ -381,21 +640,18 @@ class MomentumStrategy(ProductConfiguration):
                 "Max min diff pct check failed"
             )
 
+    @candle_features.consumes("latest_close")
     def analyze_historical_data_selling(self, data, size, at_price, position_id):
         """
         Args:
             temp_dict (_type_): _description_
             pending_order_id_list (_type_): _description_
         """
-        current_price = Decimal(data[0]["close"])
+        current_price = self.features(data)["latest_close"]
         profit_target_pct_max = self.profit_target
-        profit_target_pct_min = Decimal("4.0")  # TODO: Configurable
+        profit_target_pct_min = PROFIT_TARGET_PCT_MIN
 
-        current_amt = current_price * size
-        bought_amt = at_price * size
-
-        profit_amt_dlrs = current_amt - bought_amt
-        profit_pct = (profit_amt_dlrs / bought_amt) * 100
+        current_amt, bought_amt, profit_amt_dlrs, profit_pct = profit(current_price, size, at_price)
 
         if profit_target_pct_min <= profit_pct <= profit_target_pct_max:
             message = ASSISTANT_NOTIFICATION_MESSAGE.format(
@@ -437,52 +693,84 @@ class MomentumStrategy(ProductConfiguration):
         This function will calculate the technical analysis indicators
         for the historical data.
         """
-        OPERATION = "TA_INDICATORS"
-        logger = log.bind(
-            correlation_id=self.correlation_id,
-            product_id=self.product_id,
-            provider=self.provider,
-            service=SERVICE,
-            operation=OPERATION,
+        simulated = "SIMLAMBDA" in self.correlation_id
+        return self._cached(
+            "ta_indicators",
+            historical_data,
+            lambda: self._ta_indicators(historical_data),
+            tuple(TA_PARAMS.items()),
+            simulated,
+            shared=True,
         )
 
-        try:
-            lambda_client = LambdaClient(
-                correlation_id=self.correlation_id
-            )
-        except Exception as e:
-            logger.error("LAMBDA_CLIENT_EXCEPTION", message=str(e))
-            raise e
+    def _ta_indicators(self, historical_data):
+        OPERATION = "TA_INDICATORS"
+        logger = self._logger(OPERATION)
 
         payload = {
             "historical_data": historical_data,
             "product_id": self.product_id,
             "provider": self.provider,
-            "n1": 14,  # TODO: Configurable
-            "n2": 50,  # TODO: Configurable
             "strategy_term": self.strategy_term,
             "correlation_id": self.correlation_id,
-            "indicators": [
-                "sma",  # Simple Moving Average
-                # "ema",  # Exponential Moving Average
-                # "rsi",  # Relative Strength Index
-                # "macd",  # Moving Average Convergence Divergence
-                # "bollinger_bands",  # Bollinger Bands
-            ],
-            "candle_stick_scope": 12,  # TODO: Configurable
-            "support_resistance_tolerance": 0.05,  # TODO: Configurable
+            **TA_PARAMS,
+            "indicators": list(TA_PARAMS["indicators"]),
         }
-        
+
+        # Simulated runs go to the simulator, which has no local equivalent
+        if Env.TA_HEDGE_BUDGET_MS is None or "SIMLAMBDA" in self.correlation_id:
+            return self._invoke_ta_lambda(payload)
+
+        # Hedged: the local indicators serve when the Lambda is slow or failing.
+        # The client is created here, boto3's default session is not thread safe
+        remote = ta_executor().submit(self._invoke_ta_lambda, payload, self._lambda_client())
+        try:
+            signals = remote.result(timeout=int(Env.TA_HEDGE_BUDGET_MS) / 1000)
+            path = "remote"
+        except Exception as e:
+            logger.warning("TA_INDICATORS_HEDGED", message=str(e) or type(e).__name__)
+            try:
+                signals = sma_cross_records(historical_data, TA_PARAMS["n1"], TA_PARAMS["n2"])
+                path = "local"
+                if not remote.done():
+                    _ta_hedged[remote] = self.correlation_id
+            except Exception as local_error:
+                # Nothing to serve locally, wait for the remote result or its error
+                logger.warning("LOCAL_TA_INDICATORS_EXCEPTION", message=str(local_error))
+                signals = remote.result()
+                path = "remote"
+
+        metrics.increment(f"ta_indicators_{path}")
+        logger.info("TA_INDICATORS_SERVED", path=path)
+        # The local indicators only stand in for this run, the next one tries the Lambda again
+        return Uncached(signals) if path == "local" else signals
+
+    def _lambda_client(self):
+        try:
+            return LambdaClient(
+                correlation_id=self.correlation_id
+            )
+        except Exception as e:
+            self._logger("TA_INDICATORS").error("LAMBDA_CLIENT_EXCEPTION", message=str(e))
+            raise e
+
+    def _invoke_ta_lambda(self, payload, lambda_client=None):
+        OPERATION = "TA_INDICATORS"
+        logger = self._logger(OPERATION)
+
+        if lambda_client is None:
+            lambda_client = self._lambda_client()
+
         try:
             response = lambda_client.invoke_lambda_function(
-                json.dumps(payload)
+                dumps(payload)
             )
             
         except Exception as e:
             logger.error("INVOKE_LAMBDA_EXCEPTION", message=str(e))
             raise e
         
-        response = json.loads(response)
+        response = loads(response)
         if response.get("status") != "success":
             logger.error(
                 "BAD_LAMBDA_RESPONSE",
@@ -495,71 +783,136 @@ class MomentumStrategy(ProductConfiguration):
 
         return response.get("signals", [])
 
-    def run(self, side=None):
-        OPERATION = "STRATEGY_RUN"
-        logger = log.bind(
-            correlation_id=self.correlation_id,
-            product_id=self.product_id,
-            provider=self.provider,
-            service=SERVICE,
-            operation=OPERATION,
-            strategy_term=self.strategy_term,
-        )
+    def _stage_order_side(self, state):
+        logger = self._logger("STRATEGY_RUN", strategy_term=self.strategy_term)
+        try:
+            side, positions, risk = self.order_side(state["historical_data"], state["side"])
+        except exceptions.RequestedSellNoPositions as e:
+            raise e
+        except Exception as e:
+            logger.error("ORDER_SIDE_GENERAL_EXCEPTION", message=str(e), side=state["side"])
+            raise Exception("ORDER_SIDE_GENERAL_EXCEPTION")
 
-        risk_flags = []
+        state.update(side=side, positions=positions)
+        state["risk_flags"].append(risk)
 
+    def _stage_confirm_side_with_trend(self, state):
+        OPERATION = "STRATEGY_RUN"
+        logger = self._logger(OPERATION, strategy_term=self.strategy_term)
         try:
-            historical_data = self.handle_historical_data()
+            self.confirm_side_with_trend(state["historical_data"], state["side"])
+            state["risk_flags"].append(f"{SERVICE}_{OPERATION}_LOW")
+        except exceptions.InvalidSideException as e:
+            state["risk_flags"].append(f"{SERVICE}_{OPERATION}_HIGH")
         except Exception as e:
-            logger.error("HANDLE_TICKER_EXCEPTION", message=str(e), side=side)
+            logger.error("CONFIRM_TREND_EXCEPTION", message=str(e))
             raise e
-        
+
+    def _stage_portfolio_exposure(self, state):
+        if Env.MAX_CLUSTER_EXPOSURE is None:
+            return
+
+        OPERATION = "PORTFOLIO_EXPOSURE"
+        logger = self._logger(OPERATION, strategy_term=self.strategy_term)
+        historical_data = state["historical_data"]
+        tracker = portfolio_analytics.tracker(self.provider, self.strategy_term)
+        tracker.observe(self.product_id, historical_data)
+
+        # Exposure is per portfolio, the correlations are shared
+        portfolio = (self.portfolio.get("portfolio") or {}).get("uuid")
+        latest_close = self.features(historical_data)["latest_close"]
+        held = sum((position.filled_size for position in self.positions), Decimal(0))
+        tracker.set_exposure(self.product_id, held * latest_close, portfolio)
+
+        # Over the limit only raises the risk, the buy is not rejected
+        exposure = tracker.cluster_exposure(self.product_id, portfolio)
+        if state["side"] == "BUY" and exposure + self.config_quote_max_size > Decimal(Env.MAX_CLUSTER_EXPOSURE):
+            logger.warning(
+                "CLUSTER_EXPOSURE_HIGH",
+                cluster=tracker.cluster_of(self.product_id),
+                exposure=exposure,
+                max_exposure=Env.MAX_CLUSTER_EXPOSURE,
+            )
+            state["risk_flags"].append(f"{SERVICE}_{OPERATION}_HIGH")
+
+    def _stage_ta_indicators(self, state):
+        logger = self._logger("STRATEGY_RUN", strategy_term=self.strategy_term)
         try:
-            signals = self.ta_indicators(historical_data)
+            signals = self.ta_indicators(state["historical_data"])
         except Exception as e:
-            logger.error("TA_INDICATORS_EXCEPTION", message=str(e), side=side)
+            logger.error("TA_INDICATORS_EXCEPTION", message=str(e), side=state["side"])
             raise e
-        
+
+        # Signals do not feed the decision yet, undecodable ones are only logged
         try:
-            side, positions, risk = self.order_side(historical_data, side)
-        except exceptions.RequestedSellNoPositions as e:
-            raise e
-        except Exception as e:
-            logger.error("ORDER_SIDE_GENERAL_EXCEPTION", message=str(e), side=side)
-            raise Exception("ORDER_SIDE_GENERAL_EXCEPTION")
+            state["signals"] = decode(signals)
+        except SignalDecodeException as e:
+            logger.warning("TA_SIGNALS_DECODE_EXCEPTION", message=str(e))
 
-        risk_flags.append(risk)
+    def run(self, side=None):
+        OPERATION = "STRATEGY_RUN"
+        logger = self._logger(OPERATION, strategy_term=self.strategy_term)
 
         try:
-            self.confirm_side_with_trend(historical_data, side)
-            risk_flags.append(f"{SERVICE}_{OPERATION}_LOW")
-        except exceptions.InvalidSideException as e:
-            risk_flags.append(f"{SERVICE}_{OPERATION}_HIGH")
+            with metrics.timer("handle_historical_data"):
+                historical_data = self.handle_historical_data()
         except Exception as e:
-            logger.error("CONFIRM_TREND_EXCEPTION", message=str(e))
+            logger.error("HANDLE_TICKER_EXCEPTION", message=str(e), side=side)
             raise e
-            
-            
-        return side, historical_data, positions, risk_flags
+
+        state = {
+            "historical_data": historical_data,
+            "side": side,
+            "positions": [],
+            "risk_flags": [],
+            "signals": None,
+        }
+        for index, (stage, cost) in enumerate(RUN_STAGES):
+            try:
+                with metrics.timer(stage):
+                    getattr(self, f"_stage_{stage}")(state)
+            except Exception as e:
+                # A rejected run skips every later stage, the remote ones included
+                for skipped, skipped_cost in RUN_STAGES[index + 1:]:
+                    metrics.increment(f"{skipped}_skipped")
+                    logger.info(
+                        "STAGE_SKIPPED",
+                        stage=skipped,
+                        cost=skipped_cost,
+                        reason=f"{stage}: {type(e).__name__}",
+                    )
+                raise e
+
+        return state["side"], historical_data, state["positions"], state["risk_flags"]
 
 class StrategyHandler:
+    # Validated configuration per config_id/content, reused by warm containers.
+    # Only the per-message fields are validated once a configuration is cached.
+    configurations = ConfigurationCache(
+        MomentumStrategy,
+        dynamic_fields=("positions", "correlation_id", "portfolio"),
+    )
+
     @classmethod
     def create(cls, **kwargs):
         strategy_term = kwargs.get("strategy_term")
         strategy_type = kwargs.get("strategy_type")
         if strategy_term == "MEDIUM_TERM":
-            return MomentumStrategy(**kwargs)
+            return cls.configurations.build(**kwargs)
         elif strategy_term == "SHORT_TERM":
-            return MomentumStrategy(**kwargs)
+            return cls.configurations.build(**kwargs)
         else:
             raise ValueError(f"INVALID_STRATEGY: TYPE {strategy_type}, TERM {strategy_term}")
 
 
+
+@metrics.flush_after
+@ta_hedges_drained
 def handler(event, context):
     """ Handles events from Assets service """
     OPERATION = "ASSETS_HANDLER"
     record = event["Records"][0] or {}
-    event_body_dict = json.loads(record.get("body", {}))
+    event_body_dict = loads(record.get("body", {}))
     portfolio = event_body_dict.get("portfolio")
     correlation_id = event_body_dict.get("correlation_id", str(ULID()))
     provider = event_body_dict.get("provider")
@@ -574,6 +927,9 @@ def handler(event, context):
     positions = event_body_dict.get("positions", [])
     assistant_event = event_body_dict.get("assistant_event", False)
 
+    if event_body_dict.get("resync_candles"):
+        candle_publisher.request_resync(provider, product_id)
+
     logger = log.bind(
         correlation_id=correlation_id,
         product_id=product_id,
@@ -582,6 +938,11 @@ def handler(event, context):
         operation=OPERATION,
         strategy_term=strategy_term,
     )
+    metrics.set_dimensions(
+        provider=provider,
+        product_id=product_id,
+        strategy_term=strategy_term,
+    )
 
     # if we receive an assistant event, we should bypass the strategy creation
     if assistant_event:
@@ -605,37 +966,64 @@ def handler(event, context):
         send_message_to_queue(Env.QUEUE_RISK_URL, msg_body)
         return {"statusCode": 200}
 
-    strategy = StrategyHandler.create(
-        provider=provider,
-        product_id=product_id,
-        portfolio=portfolio,
-        positions=positions,
-        correlation_id=correlation_id,
-        strategy_term=strategy_term,
-        **config_dict,
+    # Repeated evaluations within a candle reuse the previous decision
+    memo_key = decision_memo.key(
+        provider, product_id, strategy_term, assets_requested_side, positions, config_dict
     )
+    found, decision = decision_memo.get(memo_key, price=product.get("price"))
+    if found and (decision is None or decision_memo.policy == "suppress"):
+        logger.info(
+            "DECISION_REUSED",
+            message="No new candle since the last decision, risk message suppressed",
+            policy=decision_memo.policy,
+        )
+        return {"statusCode": 200}
 
-    try:
-        side, historical_data, positions, new_risk_flags = strategy.run(assets_requested_side)
-    except exceptions.RequestedSellNoPositions:
-        return {
-            "statusCode": 200,
-        }
-    except Exception as e:
-        logger.error(
-            "STRATEGY_FAILED",
-            message="Failed to analyze product for buying/selling",
-            error=str(e),
+    if found:
+        logger.info(
+            "DECISION_REUSED",
+            message="No new candle since the last decision, risk message re-emitted",
+            policy=decision_memo.policy,
+        )
+    else:
+        strategy = StrategyHandler.create(
+            provider=provider,
+            product_id=product_id,
+            portfolio=portfolio,
+            positions=positions,
+            correlation_id=correlation_id,
+            strategy_term=strategy_term,
+            **config_dict,
         )
-        raise e
 
-    positions_dict = [
-        position.model_dump()
-        for position in positions
-    ]
+        try:
+            side, historical_data, positions, new_risk_flags = strategy.run(assets_requested_side)
+        except exceptions.RequestedSellNoPositions:
+            decision_memo.set(memo_key, None, price=product.get("price"))
+            return {
+                "statusCode": 200,
+            }
+        except Exception as e:
+            logger.error(
+                "STRATEGY_FAILED",
+                message="Failed to analyze product for buying/selling",
+                error=str(e),
+            )
+            raise e
+
+        decision = {
+            "side": side,
+            "positions": [
+                position.model_dump()
+                for position in positions
+            ],
+            "risk_flags": new_risk_flags,
+            "historical_data": pack(historical_data),
+        }
+        decision_memo.set(memo_key, decision, price=product.get("price"))
 
     # Add risk flags to the list
-    risk_flags.extend(new_risk_flags)
+    risk_flags.extend(decision["risk_flags"])
 
     msg_body = {}
     msg_body["portfolio"] = portfolio
@@ -643,14 +1031,15 @@ def handler(event, context):
     msg_body["correlation_id"] = correlation_id
     msg_body["provider"] = provider
     msg_body["config"] = config_dict
-    msg_body["side"] = side
-    msg_body["positions"] = positions_dict
+    msg_body["side"] = decision["side"]
+    msg_body["positions"] = decision["positions"]
     msg_body["strategy_term"] = strategy_term
-    msg_body["historical_data"] = historical_data
+    msg_body["historical_data"] = decision["historical_data"]
     msg_body["risk_flags"] = risk_flags
     msg_body["assistant_event"] = assistant_event
 
-    send_message_to_queue(Env.QUEUE_RISK_URL, msg_body)
+    # Oversized bodies carry references to blob storage instead of the data
+    send_message_to_queue(Env.QUEUE_RISK_URL, check_in(msg_body))
 
     logger.info(
         "STRATEGY_COMPLETE",
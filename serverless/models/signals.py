@@ -0,0 +1,29 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+from enum import Enum
+
+
+SIGNAL_SCHEMA_VERSION = 1
+
+
+class SignalSide(str, Enum):
+    buy = "BUY"
+    sell = "SELL"
+
+
+class SignalReason(str, Enum):
+    cross = "CROSS"
+    stop_loss = "STOP_LOSS"
+    take_profit = "TAKE_PROFIT"
+
+
+class Signal(BaseModel):
+    """ A trading signal from the indicators service (schema version 1) """
+    indicator: str = Field(..., alias="indicator")
+    side: SignalSide = Field(..., alias="side")
+    reason: SignalReason = Field(default=SignalReason.cross, alias="reason")
+    price: float = Field(..., alias="price")
+    size: Optional[float] = Field(default=None, alias="size")
+    entry: Optional[float] = Field(default=None, alias="entry")
+    # Position of the candle in the window sent, None for legacy signals
+    index: Optional[int] = Field(default=None, alias="index")
@@ -0,0 +1,519 @@
+"""
+Benchmarks for the strategy hot paths.
+
+    python -m tests.benchmarks.bench_strategy                     # compare against baselines
+    python -m tests.benchmarks.bench_strategy --update-baselines  # record new baselines
+    python -m tests.benchmarks.bench_strategy --filter review     # run a subset
+
+Every benchmark runs across input sizes and records the median and minimum
+wall time per call and the peak traced memory of one call. Results are
+compared with baselines.json; a case whose minimum time or peak memory
+exceeds its baseline by more than the configured ratio fails the run.
+"""
+import os
+
+# Same environment the unit tests run with (see pytest.ini), set before any
+# service module reads Env
+for key, value in {
+    "PROVIDER_URL": "https://provider-url.com",
+    "PROVIDER_API_KEY": "123-fake-provider-api-key",
+    "AUTH0_OAUTH_URL": "https://fake-url.com/oauth/token",
+    "CACHE_TABLE_NAME": "cache",
+    "REGION": "us-east-1",
+    "QUEUE_RISK_URL": "https://sqs.us-east-1.amazonaws.com/123456789012/risk.fifo",
+    "QUEUE_DATA_COLLECTION_URL": "https://sqs.us-east-1.amazonaws.com/123456789012/data-collection",
+    "AWS_ACCESS_KEY_ID": "testing",
+    "AWS_SECRET_ACCESS_KEY": "testing",
+    "AWS_DEFAULT_REGION": "us-east-1",
+}.items():
+    os.environ.setdefault(key, value)
+
+import argparse
+import contextlib
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+from unittest.mock import Mock, patch
+
+from tests.golden.candles import synthetic_candles, synthetic_positions
+
+
+BASELINES_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+DEFAULT_THRESHOLDS = {"time_ratio": 2.0, "memory_ratio": 1.25}
+MIN_MEASURE_SECONDS = 0.2
+
+BENCHMARKS = []
+
+
+def benchmark(name, sizes):
+    """
+    Registers a benchmark. The decorated function is a generator that sets
+    up its inputs for one size and yields the callable to measure; anything
+    it patches stays active until the measurement is done.
+    """
+    def decorator(fn):
+        BENCHMARKS.append((name, sizes, fn))
+        return fn
+    return decorator
+
+
+def strategy_payload(position_count, strategy_term="MEDIUM_TERM"):
+    return {
+        "provider": "COINBASE",
+        "product_id": "BTC-USD",
+        "portfolio": {"portfolio": {"name": "bench", "uuid": "portfolio-uuid"}},
+        "positions": synthetic_positions(position_count),
+        "correlation_id": "01D9GQZ2R1T0Z6ZQ0X6W0M1Z4Z",
+        "strategy_term": strategy_term,
+        "toggle": True,
+        "profit_target": "5.0",
+        "config_quote_min_size": "10",
+        "config_quote_max_size": "100",
+        "base_increment": "0.00000001",
+        "quote_increment": "0.01",
+        "base_min_size": "0.00001",
+        "base_max_size": "100",
+        "cancel_only": False,
+        "limit_only": False,
+        "post_only": False,
+        "trading_disabled": False,
+    }
+
+
+def build_strategy(position_count=0, strategy_term="MEDIUM_TERM"):
+    from functions.strategies import MomentumStrategy
+    return MomentumStrategy(**strategy_payload(position_count, strategy_term))
+
+
+@benchmark("strategy_construction", sizes=[0, 10, 100, 1000])
+def bench_strategy_construction(size):
+    from functions.strategies import StrategyHandler
+    payload = strategy_payload(size)
+    yield lambda: StrategyHandler.create(**payload)
+
+
+@benchmark("strategy_construction_validated", sizes=[0, 10, 100, 1000])
+def bench_strategy_construction_validated(size):
+    # Full pydantic validation of every field, the cost before the config cache
+    from functions.strategies import MomentumStrategy
+    payload = strategy_payload(size)
+    yield lambda: MomentumStrategy(**payload)
+
+
+@benchmark("validate_support_resistance", sizes=[12, 60, 300])
+def bench_validate_support_resistance(size):
+    from utils.indicator_cache import indicator_cache
+    strategy = build_strategy()
+    candles = synthetic_candles(size, seed=size)
+
+    def run():
+        # Computation cost, indicator_cache_hit measures the cached path, so
+        # neither the indicator cache nor the run's feature sets may serve it
+        strategy._feature_sets.clear()
+        return strategy.validate_support_resistance(candles)
+    with patch.object(indicator_cache, "enabled", False):
+        yield run
+
+
+@benchmark("indicator_cache_hit", sizes=[12, 60, 300])
+def bench_indicator_cache_hit(size):
+    strategy = build_strategy()
+    candles = synthetic_candles(size, seed=size)
+
+    def run():
+        strategy.validate_support_resistance(candles)
+        strategy.detect_bullish_engulfing(candles)
+        strategy.detect_bearish_engulfing(candles)
+    run()
+    yield run
+
+
+@benchmark("detect_engulfing", sizes=[12, 60, 300])
+def bench_detect_engulfing(size):
+    from utils.indicator_cache import indicator_cache
+    strategy = build_strategy()
+    candles = synthetic_candles(size, seed=size)
+
+    def run():
+        strategy._feature_sets.clear()
+        strategy.detect_bullish_engulfing(candles)
+        strategy.detect_bearish_engulfing(candles)
+    with patch.object(indicator_cache, "enabled", False):
+        yield run
+
+
+@benchmark("review_positions", sizes=[1, 10, 100, 1000, 10000])
+def bench_review_positions(size):
+    strategy = build_strategy(size)
+    candles = synthetic_candles(60, seed=size)
+    with patch("functions.strategies.notify_assistant"):
+        yield lambda: strategy.review_positions(candles)
+
+
+@benchmark("handle_historical_data", sizes=[60, 300, 1440])
+def bench_handle_historical_data(size):
+    from utils.candle_publisher import CandlePublisher
+    strategy = build_strategy(strategy_term="SHORT_TERM")
+    provider = Mock()
+    provider.get_candles.return_value = {"candles": synthetic_candles(size, seed=size)}
+    # Watermarks in memory only, after the first call nothing new is published
+    publisher = CandlePublisher()
+    with patch("functions.strategies.ProviderClient", return_value=provider), \
+            patch("functions.strategies.send_message_to_queue"), \
+            patch("functions.strategies.candle_publisher", publisher), \
+            patch.object(publisher, "_load_watermark", return_value=None), \
+            patch.object(publisher, "_advance_watermark", return_value=True):
+        yield strategy.handle_historical_data
+
+
+def risk_body(size):
+    strategy = build_strategy(25)
+    return {
+        "portfolio": strategy.portfolio,
+        "product": {"product_id": strategy.product_id},
+        "correlation_id": strategy.correlation_id,
+        "provider": strategy.provider,
+        "config": strategy_payload(0),
+        "side": "SELL",
+        "positions": [position.model_dump() for position in strategy.positions],
+        "strategy_term": strategy.strategy_term,
+        "historical_data": synthetic_candles(size, seed=size),
+        "risk_flags": ["strategy_ORDER_SIDE_LOW"],
+        "assistant_event": False,
+    }
+
+
+@benchmark("decimal_encoder_risk_body", sizes=[60, 300, 1440])
+def bench_decimal_encoder_risk_body(size):
+    from utils.common import DecimalEncoder
+    body = risk_body(size)
+    yield lambda: json.dumps(body, cls=DecimalEncoder)
+
+
+@benchmark("serialize_risk_body", sizes=[60, 300, 1440])
+def bench_serialize_risk_body(size):
+    # Configured backend of utils.serialization, orjson when installed
+    from utils.serialization import dumps
+    body = risk_body(size)
+    yield lambda: dumps(body)
+
+
+@benchmark("deserialize_risk_body", sizes=[60, 300, 1440])
+def bench_deserialize_risk_body(size):
+    from utils.serialization import dumps, loads
+    data = dumps(risk_body(size))
+    yield lambda: loads(data)
+
+
+@benchmark("candle_codec_encode", sizes=[60, 300, 1440])
+def bench_candle_codec_encode(size):
+    from utils.candle_codec import encode
+    candles = synthetic_candles(size, seed=size)
+    yield lambda: encode(candles)
+
+
+@benchmark("candle_codec_decode", sizes=[60, 300, 1440])
+def bench_candle_codec_decode(size):
+    from utils.candle_codec import decode, encode
+    encoded = encode(synthetic_candles(size, seed=size))
+    yield lambda: decode(encoded)
+
+
+def signal_window(size):
+    """ A candle window oscillating fast enough to cross the SMAs about every 20 candles """
+    import math
+    return [{"close": str(round(100 + 10 * math.sin(i / 7), 2))} for i in range(size)]
+
+
+@benchmark("signals_decode_legacy", sizes=[1000, 10000])
+def bench_signals_decode_legacy(size):
+    from utils.indicators import sma_cross_signals
+    from utils.signals import columns
+    signals = sma_cross_signals(signal_window(size), 5, 20)
+    yield lambda: columns(signals)
+
+
+@benchmark("signals_decode_typed", sizes=[1000, 10000])
+def bench_signals_decode_typed(size):
+    from utils.indicators import sma_cross_records
+    from utils.signals import columns
+    signals = sma_cross_records(signal_window(size), 5, 20)
+    yield lambda: columns(signals)
+
+
+@benchmark("rolling_stats_stream", sizes=[1440, 10000])
+def bench_rolling_stats_stream(size):
+    from utils.rolling import RollingMaxMinPct, RollingMeanVariance
+    closes = [float(candle["close"]) for candle in synthetic_candles(size, seed=size)]
+
+    def run():
+        max_min, mean_variance = RollingMaxMinPct(60), RollingMeanVariance(60)
+        for close in closes:
+            max_min.push(close)
+            mean_variance.push(close)
+    yield run
+
+
+@benchmark("rolling_stats_vectorized", sizes=[1440, 10000])
+def bench_rolling_stats_vectorized(size):
+    from utils.rolling import rolling_max_min_pct, rolling_variance
+    closes = [float(candle["close"]) for candle in synthetic_candles(size, seed=size)]
+    yield lambda: (rolling_max_min_pct(closes, 60), rolling_variance(closes, 60))
+
+
+@benchmark("volume_profile_levels", sizes=[300, 1440])
+def bench_volume_profile_levels(size):
+    from utils.volume_profile import VolumeProfile
+    candles = synthetic_candles(size, seed=size)
+    profile = VolumeProfile.for_price(candles[0]["close"], window=size)
+    profile.update(candles)
+    # Steady state: the window is known, only the open candle changes
+    yield lambda: (profile.update(candles), profile.levels(candles[0]["close"]))
+
+
+@benchmark("sma_cross_single", sizes=[1440])
+def bench_sma_cross_single(size):
+    from utils.indicators import sma_cross_records
+    candles = synthetic_candles(size, seed=size)
+    yield lambda: sma_cross_records(candles, 14, 50)
+
+
+@benchmark("sma_cross_grid_50x50", sizes=[1440])
+def bench_sma_cross_grid(size):
+    from utils.indicator_grid import sma_cross_grid
+    closes = [float(candle["close"]) for candle in synthetic_candles(size, seed=size)]
+    fast, slow = range(2, 52), range(10, 210, 4)
+    yield lambda: sma_cross_grid(closes, fast, slow)
+
+
+@benchmark("trigger_book_update", sizes=[1000, 10000])
+def bench_trigger_book_update(size):
+    import itertools
+    from decimal import Decimal
+    from models.api import Position
+    from utils.trigger_book import TriggerBook
+    book = TriggerBook(Decimal("5.0"))
+    book.sync([Position(**position) for position in synthetic_positions(size)])
+    walk = itertools.cycle([Decimal("100000"), Decimal("100150.25")])
+    book.update(next(walk))
+    # Steady state: the price moves by 0.15% between evaluations
+    yield lambda: book.update(next(walk))
+
+
+@benchmark("trailing_stops", sizes=[1000, 10000])
+def bench_trailing_stops(size):
+    from models.api import Position
+    from utils.excursions import entry_time, excursions, trailing_stops
+    positions = [Position(**position) for position in synthetic_positions(size)]
+    candles = synthetic_candles(120, seed=size, granularity=3600)
+
+    def run():
+        stats = excursions(
+            candles,
+            [position.average_filled_price for position in positions],
+            [entry_time(position) for position in positions],
+        )
+        return trailing_stops(stats, 2.5, 4.0)
+    yield run
+
+
+@benchmark("timeframe_table", sizes=[300, 1440])
+def bench_timeframe_table(size):
+    from utils.timeframes import timeframe_table
+    candles = synthetic_candles(size, seed=size)
+    yield lambda: timeframe_table(candles)
+
+
+@benchmark("portfolio_correlation_period", sizes=[100, 500])
+def bench_portfolio_correlation_period(size):
+    import itertools
+    from utils.portfolio_analytics import CorrelationTracker
+    tracker = CorrelationTracker()
+    windows = {f"P{i:04d}-USD": synthetic_candles(121, seed=i, granularity=3600) for i in range(size)}
+    for product_id, candles in windows.items():
+        tracker.observe(product_id, candles)
+    periods = itertools.count(int(windows["P0000-USD"][0]["start"]), 3600)
+
+    def run():
+        # Every product reports the candle of a new period, completing the previous one
+        start = next(periods)
+        for i, product_id in enumerate(windows):
+            close = str(100000 * (1 + (i + start // 3600) % 7 / 1000))
+            tracker.observe(product_id, [{"start": str(start + 3600)}, {"start": str(start), "close": close}])
+        return tracker.cluster_exposure("P0000-USD")
+    yield run
+
+
+@benchmark("universe_screen", sizes=[300, 1000])
+def bench_universe_screen(size):
+    from utils.screener import UniverseScreener
+    products = [f"P{i:04d}-USD" for i in range(size)]
+    screener = UniverseScreener(products, 120)
+    candles = synthetic_candles(120 + size, seed=size, granularity=3600)
+    for i, product_id in enumerate(products):
+        screener.load(product_id, candles[i:i + 120])
+    yield lambda: screener.screen(restricted=(-10.0, -5.0))
+
+
+@benchmark("handler_import", sizes=[0])
+def bench_handler_import(size):
+    # Cold start import of the handler module, in a fresh interpreter each call
+    import subprocess
+    serverless_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    command = [sys.executable, "-c", "import functions.strategies"]
+    yield lambda: subprocess.run(command, cwd=serverless_dir, env=os.environ.copy(), check=True)
+
+
+@benchmark("handler_round_trip", sizes=[0, 10, 100])
+def bench_handler_round_trip(size):
+    import boto3
+    from moto import mock_aws
+    from functions.strategies import handler
+    from utils.common import Env
+
+    payload = strategy_payload(size)
+    config = {
+        key: value for key, value in payload.items()
+        if key not in ("provider", "product_id", "portfolio", "positions", "correlation_id", "strategy_term")
+    }
+    event = {"Records": [{"body": json.dumps({
+        "correlation_id": payload["correlation_id"],
+        "provider": payload["provider"],
+        "product": {"product_id": payload["product_id"]},
+        "portfolio": payload["portfolio"],
+        "positions": payload["positions"],
+        "strategy_term": "MEDIUM_TERM",
+        "config": config,
+    })}]}
+
+    provider = Mock()
+    provider.get_candles.return_value = {"candles": synthetic_candles(120, seed=size)}
+    lambda_client = Mock()
+    lambda_client.invoke_lambda_function.return_value = '{"status": "success", "signals": []}'
+
+    with mock_aws():
+        boto3.client("sqs", Env.REGION).create_queue(
+            QueueName=Env.QUEUE_RISK_URL.split("/")[-1], Attributes={"FifoQueue": "true"}
+        )
+        with patch("functions.strategies.ProviderClient", return_value=provider), \
+                patch("functions.strategies.LambdaClient", return_value=lambda_client), \
+                patch("functions.strategies.notify_assistant"):
+            yield lambda: handler(event, {})
+
+
+def measure(call):
+    """ Median seconds per call and peak traced bytes of a single call """
+    call()  # warm up imports and caches
+
+    tracemalloc.start()
+    call()
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings = []
+    deadline = time.perf_counter() + MIN_MEASURE_SECONDS
+    while len(timings) < 5 or time.perf_counter() < deadline:
+        started = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - started)
+
+    return {
+        "median_seconds": statistics.median(timings),
+        "min_seconds": min(timings),
+        "peak_bytes": peak_bytes,
+        "runs": len(timings),
+    }
+
+
+def run_benchmarks(name_filter=None):
+    results = {}
+    with open(os.devnull, "w") as devnull:
+        for name, sizes, fn in BENCHMARKS:
+            if name_filter and name_filter not in name:
+                continue
+            for size in sizes:
+                case = fn(size)
+                call = next(case)
+                # Log lines go to stdout; keep them out of the report but still pay for them
+                with contextlib.redirect_stdout(devnull):
+                    results[f"{name}[{size}]"] = measure(call)
+                case.close()
+    return results
+
+
+def load_baselines(path=BASELINES_PATH):
+    if not os.path.exists(path):
+        return {"thresholds": dict(DEFAULT_THRESHOLDS), "results": {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare_to_baselines(results, baselines):
+    """ Returns a list of (case, metric, baseline, current, ratio) regressions """
+    thresholds = {**DEFAULT_THRESHOLDS, **baselines.get("thresholds", {})}
+    regressions = []
+    for case, current in results.items():
+        baseline = baselines.get("results", {}).get(case)
+        if not baseline:
+            continue
+        # min_seconds is far less sensitive to scheduler noise than the median
+        for metric, limit in (("min_seconds", thresholds["time_ratio"]), ("peak_bytes", thresholds["memory_ratio"])):
+            if not baseline[metric]:
+                continue
+            ratio = current[metric] / baseline[metric]
+            if ratio > limit:
+                regressions.append((case, metric, baseline[metric], current[metric], ratio))
+    return regressions
+
+
+def report(results, baselines):
+    lines = [f"{'case':<40} {'median':>12} {'peak':>12} {'baseline':>12} {'ratio':>7}"]
+    for case, current in results.items():
+        baseline = baselines.get("results", {}).get(case)
+        base_time = f"{baseline['median_seconds'] * 1000:.3f}ms" if baseline else "-"
+        ratio = f"{current['median_seconds'] / baseline['median_seconds']:.2f}" if baseline else "-"
+        lines.append(
+            f"{case:<40} {current['median_seconds'] * 1000:>10.3f}ms "
+            f"{current['peak_bytes'] / 1024:>10.1f}KB {base_time:>12} {ratio:>7}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Strategy hot path benchmarks")
+    parser.add_argument("--filter", dest="name_filter", default=None)
+    parser.add_argument("--update-baselines", action="store_true")
+    parser.add_argument("--baselines", default=BASELINES_PATH)
+    parser.add_argument("--output", default=None, help="also write the raw results to this JSON file")
+    args = parser.parse_args(argv)
+
+    baselines = load_baselines(args.baselines)
+    results = run_benchmarks(args.name_filter)
+    print(report(results, baselines))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.update_baselines:
+        baselines.setdefault("thresholds", dict(DEFAULT_THRESHOLDS))
+        baselines.setdefault("results", {}).update(results)
+        baselines["environment"] = {"python": platform.python_version(), "machine": platform.machine()}
+        with open(args.baselines, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baselines written to {args.baselines}")
+        return 0
+
+    regressions = compare_to_baselines(results, baselines)
+    for case, metric, baseline, current, ratio in regressions:
+        print(f"REGRESSION {case} {metric}: {baseline:.6g} -> {current:.6g} (x{ratio:.2f})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+import json
+import os
+import random
+
+from decimal import Decimal
+
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+# Latest candle in the synthetic windows, kept fixed so runs are reproducible
+SYNTHETIC_END = 1749700800
+
+
+def load_recorded(name):
+    """ Loads a recorded candle window (newest first, provider format) """
+    with open(os.path.join(DATA_DIR, f"{name}.json")) as f:
+        return json.load(f)
+
+
+def synthetic_candles(
+    count,
+    seed=0,
+    base_price=100000,
+    drift=0.0,
+    volatility=0.004,
+    granularity=60,
+    end=SYNTHETIC_END,
+):
+    """
+    Random walk candles in the provider format: string fields and the
+    latest candle first, the same shape ProviderClient.get_candles returns.
+    """
+    rng = random.Random(seed)
+    candles = []
+    price = base_price
+    start = end - (count - 1) * granularity
+    for _ in range(count):
+        open_ = price
+        close = open_ * (1 + drift + rng.gauss(0, volatility))
+        high = max(open_, close) * (1 + abs(rng.gauss(0, volatility / 2)))
+        low = min(open_, close) * (1 - abs(rng.gauss(0, volatility / 2)))
+        candles.append({
+            "start": str(start),
+            "low": f"{low:.2f}",
+            "high": f"{high:.2f}",
+            "open": f"{open_:.2f}",
+            "close": f"{close:.2f}",
+            "volume": f"{rng.uniform(1, 250):.8f}",
+        })
+        price = close
+        start += granularity
+
+    candles.reverse()
+    return candles
+
+
+def engulfing_candles(bullish=True, base_price=82650, granularity=1800, end=SYNTHETIC_END):
+    """ Tight range window whose latest two candles form an engulfing pattern """
+    candles = synthetic_candles(
+        12, seed=7, base_price=base_price, volatility=0.0005, granularity=granularity, end=end
+    )
+    prev, curr = candles[1], candles[0]
+    p = Decimal(candles[2]["close"])
+    if bullish:
+        prev.update(open=str(p), close=str(p - 20))
+        curr.update(open=str(p - 25), close=str(p + 5))
+    else:
+        prev.update(open=str(p), close=str(p + 20))
+        curr.update(open=str(p + 25), close=str(p - 5))
+    for candle in (prev, curr):
+        prices = [Decimal(candle["open"]), Decimal(candle["close"])]
+        candle["high"] = str(max(prices) + 3)
+        candle["low"] = str(min(prices) - 3)
+    return candles
+
+
+def candle_sets():
+    """ Named candle windows every equivalence check runs against """
+    recorded = load_recorded("btc_usd_1h")
+    return {
+        "recorded_btc_1h_full": recorded,
+        "recorded_btc_1h_12": recorded[:12],
+        "recorded_btc_1h_tail_60": recorded[-60:],
+        "synthetic_flat_300": synthetic_candles(300, seed=1, volatility=0.0002),
+        "synthetic_uptrend_300": synthetic_candles(300, seed=2, drift=0.0008),
+        "synthetic_downtrend_300": synthetic_candles(300, seed=3, drift=-0.0008),
+        "synthetic_volatile_120": synthetic_candles(120, seed=4, volatility=0.02),
+        "synthetic_hourly_120": synthetic_candles(120, seed=5, granularity=3600),
+        "synthetic_two_candles": synthetic_candles(2, seed=6),
+        "synthetic_bullish_engulfing": engulfing_candles(bullish=True),
+        "synthetic_bearish_engulfing": engulfing_candles(bullish=False),
+    }
+
+
+def synthetic_positions(count, base_price=100000, spread=0.2, seed=0, product_id="BTC-USD"):
+    """ Position payloads (as they arrive on the strategy queue) around base_price """
+    rng = random.Random(seed)
+    positions = []
+    for i in range(count):
+        entry = base_price * (1 + rng.uniform(-spread, spread))
+        positions.append({
+            "global_product_id": "COINBASE.BTC.USD",
+            "component_id": f"{i:06d}.ENTRY",
+            "position_id": f"position-{i:06d}",
+            "order_id": f"order-{i:06d}",
+            "product_id": product_id,
+            "user_id": "user-id",
+            "order_configuration": {"market_market_ioc": {"quote_size": "5"}},
+            "side": "BUY",
+            "client_order_id": f"client-order-{i:06d}",
+            "status": "FILLED",
+            "time_in_force": "IMMEDIATE_OR_CANCEL",
+            "created_time": "2025-06-01T00:00:00Z",
+            "completion_percentage": "100",
+            "filled_size": f"{5 / entry:.16f}",
+            "average_filled_price": f"{entry:.2f}",
+            "fee": "",
+            "number_of_fills": "1",
+            "filled_value": "5",
+            "pending_cancel": False,
+            "size_in_quote": True,
+            "total_fees": "0.06",
+            "size_inclusive_of_fees": True,
+            "total_value_after_fees": "5",
+            "trigger_status": "INVALID_ORDER_TYPE",
+            "order_type": "MARKET",
+            "reject_reason": "REJECT_REASON_UNSPECIFIED",
+            "settled": True,
+            "product_type": "SPOT",
+            "reject_message": "",
+            "cancel_message": "",
+            "order_placement_source": "RETAIL_ADVANCED",
+            "outstanding_hold_amount": "0",
+            "is_liquidation": False,
+            "last_fill_time": "2025-06-01T00:00:01Z",
+            "edit_history": [],
+            "leverage": "",
+            "margin_type": "UNKNOWN_MARGIN_TYPE",
+            "retail_portfolio_id": "retail-portfolio-uuid",
+            "originating_order_id": "",
+            "attached_order_id": "",
+            "attached_order_configuration": None,
+            "ttl": 0,
+        })
+    return positions
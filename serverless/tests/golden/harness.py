@@ -0,0 +1,175 @@
+"""
+Side by side equivalence harness for optimised strategy paths.
+
+A check runs the frozen reference implementation and a candidate over the
+same named inputs, normalises both outputs to a flat dict of fields and
+compares each field with its tolerance rule. The report carries every
+mismatch together with the timing of both sides, so a faster path can only
+land if it makes the same decisions.
+"""
+import time
+
+from decimal import Decimal
+
+
+RAISES = "__raises__"
+
+
+class Exact:
+    def __call__(self, reference, candidate):
+        return reference == candidate
+
+    def __repr__(self):
+        return "Exact()"
+
+
+class Abs:
+    def __init__(self, tolerance):
+        self.tolerance = Decimal(str(tolerance))
+
+    def __call__(self, reference, candidate):
+        if reference is None or candidate is None:
+            return reference is candidate
+        return abs(Decimal(str(reference)) - Decimal(str(candidate))) <= self.tolerance
+
+    def __repr__(self):
+        return f"Abs({self.tolerance})"
+
+
+class Rel:
+    def __init__(self, tolerance):
+        self.tolerance = Decimal(str(tolerance))
+
+    def __call__(self, reference, candidate):
+        if reference is None or candidate is None:
+            return reference is candidate
+        reference = Decimal(str(reference))
+        candidate = Decimal(str(candidate))
+        if reference == 0:
+            return candidate == 0
+        return abs(reference - candidate) / abs(reference) <= self.tolerance
+
+    def __repr__(self):
+        return f"Rel({self.tolerance})"
+
+
+class Ignore:
+    def __call__(self, reference, candidate):
+        return True
+
+    def __repr__(self):
+        return "Ignore()"
+
+
+class Mismatch:
+    def __init__(self, case, field, reference, candidate, rule):
+        self.case = case
+        self.field = field
+        self.reference = reference
+        self.candidate = candidate
+        self.rule = rule
+
+    def __repr__(self):
+        return (
+            f"{self.case}.{self.field}: reference={self.reference!r} "
+            f"candidate={self.candidate!r} rule={self.rule!r}"
+        )
+
+
+class EquivalenceReport:
+    def __init__(self, name, cases, mismatches, reference_seconds, candidate_seconds):
+        self.name = name
+        self.cases = cases
+        self.mismatches = mismatches
+        self.reference_seconds = reference_seconds
+        self.candidate_seconds = candidate_seconds
+
+    @property
+    def equivalent(self):
+        return not self.mismatches
+
+    @property
+    def speedup(self):
+        if not self.candidate_seconds:
+            return float("inf")
+        return self.reference_seconds / self.candidate_seconds
+
+    def summary(self):
+        lines = [
+            f"{self.name}: {self.cases} cases, {len(self.mismatches)} mismatches, "
+            f"reference {self.reference_seconds * 1000:.3f}ms, "
+            f"candidate {self.candidate_seconds * 1000:.3f}ms, "
+            f"speedup x{self.speedup:.2f}"
+        ]
+        lines.extend(f"  {mismatch!r}" for mismatch in self.mismatches)
+        return "\n".join(lines)
+
+    def assert_equivalent(self):
+        print(self.summary())
+        assert self.equivalent, self.summary()
+
+
+def _as_fields(output, normalize):
+    if normalize:
+        output = normalize(output)
+    if isinstance(output, dict):
+        return dict(output)
+    if isinstance(output, (tuple, list)):
+        return {str(i): value for i, value in enumerate(output)}
+    return {"value": output}
+
+
+def _run(fn, args, repeat):
+    elapsed = 0.0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        try:
+            output = fn(*args)
+        except Exception as e:
+            output = e
+        elapsed += time.perf_counter() - started
+    return output, elapsed
+
+
+def compare(name, reference, candidate, cases, rules=None, normalize=None, default_rule=None, repeat=1):
+    """
+    Args:
+        name: label used in the report
+        reference: the frozen implementation, called as reference(*args)
+        candidate: the optimised implementation, same signature
+        cases: dict of case name -> tuple of positional args
+        rules: dict of output field -> tolerance rule (Exact, Abs, Rel, Ignore)
+        normalize: optional callable turning an output into a dict of fields
+        default_rule: rule for fields without an entry in rules, Exact by default
+        repeat: number of timed calls per side and case
+    """
+    rules = rules or {}
+    default_rule = default_rule or Exact()
+    mismatches = []
+    reference_seconds = 0.0
+    candidate_seconds = 0.0
+
+    for case, args in cases.items():
+        expected, elapsed = _run(reference, args, repeat)
+        reference_seconds += elapsed
+        actual, elapsed = _run(candidate, args, repeat)
+        candidate_seconds += elapsed
+
+        # Both sides must fail the same way, or both must succeed
+        if isinstance(expected, Exception) or isinstance(actual, Exception):
+            expected_type = type(expected).__name__ if isinstance(expected, Exception) else None
+            actual_type = type(actual).__name__ if isinstance(actual, Exception) else None
+            if expected_type != actual_type:
+                mismatches.append(Mismatch(case, RAISES, expected_type, actual_type, Exact()))
+            continue
+
+        expected = _as_fields(expected, normalize)
+        actual = _as_fields(actual, normalize)
+        for field in sorted(set(expected) | set(actual)):
+            rule = rules.get(field, default_rule)
+            if field not in expected or field not in actual:
+                mismatches.append(Mismatch(case, field, expected.get(field), actual.get(field), rule))
+            elif not rule(expected[field], actual[field]):
+                mismatches.append(Mismatch(case, field, expected[field], actual[field], rule))
+
+    return EquivalenceReport(name, len(cases), mismatches, reference_seconds, candidate_seconds)
@@ -0,0 +1,160 @@
+"""
+Frozen reference implementations of the strategy decision paths.
+
+These are copies of the MomentumStrategy logic as it was before any
+performance work, lifted out into plain functions. Optimised code paths are
+checked against them by the golden equivalence tests, so they must not be
+"improved" - change them only when a decision rule is changed on purpose.
+"""
+from decimal import Decimal
+from statistics import mean
+
+
+def price_diff_pct(historical_data, strategy_term):
+    latest_price = historical_data[0]["close"] or 0
+    opening_price = historical_data[-1]["close"] or 0
+
+    _diff = Decimal(latest_price) - Decimal(opening_price)
+    try:
+        x = _diff / Decimal(opening_price)
+    except ZeroDivisionError:
+        x = 0
+    diff_pct = (x) * 100
+
+    if strategy_term == "SHORT_TERM":
+        if Decimal("1.0") <= diff_pct <= Decimal("1.0"):
+            return False, diff_pct
+    elif strategy_term == "MEDIUM_TERM":
+        if Decimal("-10.0") <= diff_pct <= Decimal("-5.0"):
+            return False, diff_pct
+    elif strategy_term == "LONG_TERM":
+        pass
+    else:
+        raise ValueError(f"Invalid strategy term: {strategy_term}")
+
+    return True, diff_pct
+
+
+def support_resistance(historical_data, tolerance=0.05):
+    highs = [Decimal(candle["high"]) for candle in historical_data]
+    lows = [Decimal(candle["low"]) for candle in historical_data]
+
+    support_levels = []
+    resistance_levels = []
+
+    for low in lows:
+        if all(abs(low - other_low) / low <= tolerance for other_low in lows):
+            support_levels.append(low)
+
+    for high in highs:
+        if all(abs(high - other_high) / high <= tolerance for other_high in highs):
+            resistance_levels.append(high)
+
+    support = mean(support_levels) if support_levels else None
+    resistance = mean(resistance_levels) if resistance_levels else None
+    return {"support": support, "resistance": resistance}
+
+
+def bullish_engulfing(historical_data):
+    for i in range(1, len(historical_data)):
+        prev = historical_data[len(historical_data)-i]
+        curr = historical_data[(len(historical_data)-i)-1]
+
+        prev_open = Decimal(prev["open"])
+        prev_close = Decimal(prev["close"])
+        curr_open = Decimal(curr["open"])
+        curr_close = Decimal(curr["close"])
+
+        if prev_close < prev_open and curr_close > curr_open:
+            if curr_close > prev_open and curr_open < prev_close:
+                return True
+    return False
+
+
+def bearish_engulfing(historical_data):
+    for i in range(1, len(historical_data)):
+        prev = historical_data[len(historical_data)-i]
+        curr = historical_data[(len(historical_data)-i)-1]
+
+        prev_open = Decimal(prev["open"])
+        prev_close = Decimal(prev["close"])
+        curr_open = Decimal(curr["open"])
+        curr_close = Decimal(curr["close"])
+
+        if prev_close > prev_open and curr_close < curr_open:
+            if curr_open > prev_close and curr_close < prev_open:
+                return True
+    return False
+
+
+def review_positions(historical_data, positions, profit_target):
+    """
+    Returns (sellable position ids, notified position ids) where positions
+    are the validated Position models the strategy holds.
+    """
+    current_price = Decimal(historical_data[0]["close"])
+    profit_target_pct_min = Decimal("4.0")
+
+    sellable = []
+    notified = []
+    for position in positions:
+        size = position.filled_size
+        at_price = position.average_filled_price
+        current_amt = current_price * size
+        bought_amt = at_price * size
+        profit_pct = ((current_amt - bought_amt) / bought_amt) * 100
+
+        if profit_target_pct_min <= profit_pct <= profit_target:
+            notified.append(position.position_id)
+            continue
+        elif profit_pct <= profit_target_pct_min:
+            continue
+        sellable.append(position.position_id)
+
+    return sellable, notified
+
+
+def sma_cross_signals(historical_data, n1, n2):
+    """
+    Python port of sma_cross_strategy in indicators/src/event_handler.rs,
+    including the `ta` crate's SMA warm-up (average of the values seen so
+    far until the window is full) and Rust's float formatting.
+    """
+    def sma(period):
+        # Mirrors ta::indicators::SimpleMovingAverage, running sum included,
+        # so float rounding matches the Rust side
+        state = {"buffer": [0.0] * period, "index": 0, "count": 0, "sum": 0.0}
+
+        def next_value(price):
+            old_val = state["buffer"][state["index"]]
+            state["buffer"][state["index"]] = price
+            state["index"] = (state["index"] + 1) % period
+            if state["count"] < period:
+                state["count"] += 1
+            state["sum"] = state["sum"] - old_val + price
+            return state["sum"] / state["count"]
+        return next_value
+
+    def fmt(price):
+        return str(int(price)) if price.is_integer() else repr(price)
+
+    sma1 = sma(n1)
+    sma2 = sma(n2)
+    position = 0
+    signals = []
+    for candle in historical_data:
+        try:
+            price = float(candle["close"])
+        except (TypeError, ValueError):
+            price = 0.0
+        sma1_val = sma1(price)
+        sma2_val = sma2(price)
+
+        if sma1_val > sma2_val and position <= 0:
+            signals.append(f"SMA Signal: Buy at price: {fmt(price)}")
+            position = 1
+        elif sma1_val < sma2_val and position >= 0:
+            signals.append(f"SMA Signal: Sell at price: {fmt(price)}")
+            position = -1
+
+    return signals
@@ -5,6 +5,16 @@ import os
 from utils.common import Env
 
 
+@pytest.fixture(autouse=True)
+def clear_indicator_cache():
+    """Indicator results are cached per process, keep tests independent."""
+    from utils.indicator_cache import indicator_cache
+
+    indicator_cache.clear()
+    yield
+    indicator_cache.clear()
+
+
 @pytest.fixture()
 def aws_credentials():
     """Mocked AWS Credentials for moto."""
@@ -195,6 +205,49 @@ def config(config_response):
     return config_response["config"]
 
 
+@pytest.fixture
+def make_strategy(config, portfolio):
+    """Builds a MomentumStrategy from the test config, profit_target overrides the config's"""
+    from functions.strategies import MomentumStrategy
+
+    def make(product_id="BTC-USD", strategy_term="MEDIUM_TERM", positions=(), profit_target=None):
+        config_copy = config.copy()
+        config_copy.pop('product_id', None)
+        if profit_target is not None:
+            config_copy["profit_target"] = profit_target
+        return MomentumStrategy(
+            provider="COINBASE",
+            product_id=product_id,
+            portfolio=portfolio,
+            positions=list(positions),
+            correlation_id="test-correlation-id",
+            strategy_term=strategy_term,
+            **config_copy
+        )
+    return make
+
+
+@pytest.fixture
+def strategy_term():
+    return "MEDIUM_TERM"
+
+
+@pytest.fixture
+def strategy_positions():
+    return []
+
+
+@pytest.fixture
+def profit_target():
+    return None
+
+
+@pytest.fixture
+def strategy(make_strategy, strategy_term, strategy_positions, profit_target):
+    """A BTC-USD strategy, modules override strategy_term, strategy_positions or profit_target"""
+    return make_strategy(strategy_term=strategy_term, positions=strategy_positions, profit_target=profit_target)
+
+
 @pytest.fixture
 def is_disabled():
     return False
@@ -0,0 +1,37 @@
+from tests.benchmarks import bench_strategy
+
+
+class TestBenchmarks:
+
+    def test_run_benchmarks_records_time_and_memory(self):
+        """Each size of a benchmark produces a timed result with peak memory"""
+        results = bench_strategy.run_benchmarks("detect_engulfing")
+
+        assert set(results) == {"detect_engulfing[12]", "detect_engulfing[60]", "detect_engulfing[300]"}
+        for result in results.values():
+            assert result["median_seconds"] > 0
+            assert result["min_seconds"] <= result["median_seconds"]
+            assert result["peak_bytes"] > 0
+            assert result["runs"] >= 5
+
+    def test_compare_to_baselines_flags_regressions(self):
+        """Cases beyond the time or memory ratio are reported, others are not"""
+        baselines = {
+            "thresholds": {"time_ratio": 1.5, "memory_ratio": 1.25},
+            "results": {
+                "fast[1]": {"min_seconds": 1.0, "median_seconds": 1.0, "peak_bytes": 100},
+                "slow[1]": {"min_seconds": 1.0, "median_seconds": 1.0, "peak_bytes": 100},
+            },
+        }
+        results = {
+            "fast[1]": {"min_seconds": 1.2, "median_seconds": 1.2, "peak_bytes": 110},
+            "slow[1]": {"min_seconds": 2.0, "median_seconds": 2.0, "peak_bytes": 200},
+            "new[1]": {"min_seconds": 9.0, "median_seconds": 9.0, "peak_bytes": 900},
+        }
+
+        regressions = bench_strategy.compare_to_baselines(results, baselines)
+
+        assert [(case, metric) for case, metric, *_ in regressions] == [
+            ("slow[1]", "min_seconds"),
+            ("slow[1]", "peak_bytes"),
+        ]
@@ -0,0 +1,64 @@
+from unittest.mock import patch
+
+import pytest
+
+from tests.golden.candles import candle_sets, synthetic_candles
+from utils import candle_codec
+from utils.candle_codec import CandleCodecException, decode, encode, is_encoded
+from utils.serialization import dumps, loads
+
+
+class TestCandleCodec:
+
+    @pytest.mark.parametrize("name,candles", candle_sets().items())
+    def test_round_trip_is_exact(self, name, candles):
+        """Decoding restores the exact candle strings"""
+        encoded = encode(candles)
+        assert is_encoded(encoded)
+        assert decode(loads(dumps(encoded))) == candles
+
+    def test_uncompressed_round_trip(self):
+        """The codec works without zlib as well"""
+        candles = synthetic_candles(60, seed=9)
+        encoded = encode(candles, compress=False)
+        assert encoded["z"] == "none"
+        assert decode(encoded) == candles
+
+    def test_mixed_decimal_places_round_trip(self):
+        """Values keep their own decimal places and signs"""
+        candles = [
+            {"start": "1749700860", "low": "0.00001", "high": "12", "open": "-1.50", "close": "3.1", "volume": "0"},
+            {"start": "1749700800", "low": "100", "high": "100.125", "open": "-0.5", "close": "3.10", "volume": "12.00000000"},
+        ]
+        assert decode(encode(candles)) == candles
+
+    def test_window_shrinks_several_fold(self):
+        """A 300 candle window is several times smaller than its JSON"""
+        candles = synthetic_candles(300, seed=3)
+        assert len(dumps(candles)) / len(dumps(encode(candles))) > 4
+
+    @pytest.mark.parametrize("candles", [
+        [{"close": "100"}],
+        [{"start": "1", "low": "1e5", "high": "1", "open": "1", "close": "1", "volume": "1"}],
+        [{"start": "1", "low": "01", "high": "1", "open": "1", "close": "1", "volume": "1"}],
+        [{"start": "1", "low": "-0.0", "high": "1", "open": "1", "close": "1", "volume": "1"}],
+        [{"start": "1", "low": 1.5, "high": "1", "open": "1", "close": "1", "volume": "1"}],
+        [],
+    ])
+    def test_unsupported_windows_stay_json(self, candles):
+        """Windows the codec cannot restore exactly are left as JSON lists"""
+        assert encode(candles) is candles
+        assert decode(candles) is candles
+
+    def test_unknown_version_raises(self):
+        """Payloads from a newer codec version are rejected"""
+        encoded = encode(synthetic_candles(10, seed=1))
+        with pytest.raises(CandleCodecException):
+            decode({**encoded, "v": 99})
+
+    def test_pack_follows_env(self):
+        """CANDLE_CODEC selects the wire format, JSON by default"""
+        candles = synthetic_candles(10, seed=1)
+        assert candle_codec.pack(candles) is candles
+        with patch.object(candle_codec.Env, "CANDLE_CODEC", "compact"):
+            assert is_encoded(candle_codec.pack(candles))
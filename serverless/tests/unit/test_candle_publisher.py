@@ -0,0 +1,140 @@
+from unittest.mock import Mock, patch
+
+import pytest
+
+from tests.golden.candles import synthetic_candles
+from utils.candle_publisher import CandlePublisher
+
+
+NOW = 1749700800
+
+
+class FakeClock:
+    def __init__(self, now=NOW):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def window(end, count=300):
+    """ 1 minute candles, newest first, the newest one still open at `end` """
+    return synthetic_candles(count, seed=1, granularity=60, end=end)
+
+
+def published(send):
+    return [candle for call in send.call_args_list for candle in call.args[1]["candle_stick_data"]]
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+class TestCandlePublisher:
+
+    def test_first_publish_sends_closed_candles(self, clock):
+        """Without a watermark every closed candle is sent, the open one is not"""
+        publisher = CandlePublisher(min_batch=5, clock=clock)
+        send = Mock()
+        candles = window(NOW)
+
+        sent = publisher.publish(send, "queue", "COINBASE", "BTC-USD", 1, candles, 60)
+
+        assert sent == 299
+        assert published(send) == candles[1:]
+        assert send.call_args.args[1]["data_collection_type"] == "CANDLE_STICK"
+
+    def test_only_new_candles_are_sent(self, clock):
+        """Later runs send only what closed since the watermark, in batches"""
+        publisher = CandlePublisher(min_batch=5, clock=clock)
+        send = Mock()
+        publisher.publish(send, "queue", "COINBASE", "BTC-USD", 1, window(NOW), 60)
+
+        send.reset_mock()
+        clock.now = NOW + 120
+        assert publisher.publish(send, "queue", "COINBASE", "BTC-USD", 1, window(NOW + 120), 60) == 0
+        send.assert_not_called()
+
+        clock.now = NOW + 300
+        candles = window(NOW + 300)
+        assert publisher.publish(send, "queue", "COINBASE", "BTC-USD", 1, candles, 60) == 5
+        assert published(send) == candles[1:6]
+
+    def test_batches_are_split(self, clock):
+        """Messages carry at most max_batch candles"""
+        publisher = CandlePublisher(max_batch=100, clock=clock)
+        send = Mock()
+        publisher.publish(send, "queue", "COINBASE", "BTC-USD", 1, window(NOW), 60)
+
+        assert [len(call.args[1]["candle_stick_data"]) for call in send.call_args_list] == [100, 100, 99]
+
+    def test_resync_sends_full_window(self, clock):
+        """A requested resync republishes the full closed window once"""
+        publisher = CandlePublisher(min_batch=5, clock=clock)
+        send = Mock()
+        publisher.publish(send, "queue", "COINBASE", "BTC-USD", 1, window(NOW), 60)
+
+        send.reset_mock()
+        publisher.request_resync("COINBASE", "BTC-USD")
+        assert publisher.publish(send, "queue", "COINBASE", "BTC-USD", 1, window(NOW), 60) == 299
+        assert publisher.publish(send, "queue", "COINBASE", "BTC-USD", 1, window(NOW), 60) == 0
+
+    def test_watermark_is_shared_through_cache_table(self, clock):
+        """A new container continues from the stored watermark"""
+        CandlePublisher(clock=clock).publish(Mock(), "queue", "COINBASE", "BTC-USD", 1, window(NOW), 60)
+
+        send = Mock()
+        clock.now = NOW + 600
+        sent = CandlePublisher(min_batch=5, clock=clock).publish(send, "queue", "COINBASE", "BTC-USD", 1, window(NOW + 600), 60)
+        assert sent == 10
+
+    def test_untracked_candles_are_sent_as_is(self, clock):
+        """Candles without a start are published every time"""
+        publisher = CandlePublisher(clock=clock)
+        send = Mock()
+        assert publisher.publish(send, "queue", "COINBASE", "BTC-USD", 1, [{"close": "100"}], 60) == 1
+        assert publisher.publish(send, "queue", "COINBASE", "BTC-USD", 1, [{"close": "100"}], 60) == 1
+        assert send.call_count == 2
+
+    def test_containers_never_send_the_same_candles(self, clock):
+        """A container with a stale watermark loses the write and reselects from the stored one"""
+        first, second = CandlePublisher(min_batch=5, clock=clock), CandlePublisher(min_batch=5, clock=clock)
+        first_send, second_send = Mock(), Mock()
+        first.publish(first_send, "queue", "COINBASE", "BTC-USD", 1, window(NOW), 60)
+        assert second.publish(second_send, "queue", "COINBASE", "BTC-USD", 1, window(NOW), 60) == 0
+
+        # The second container advances the watermark, the first one's copy is stale
+        clock.now = NOW + 600
+        assert second.publish(second_send, "queue", "COINBASE", "BTC-USD", 1, window(NOW + 600), 60) == 10
+        clock.now = NOW + 900
+        candles = window(NOW + 900)
+        assert first.publish(first_send, "queue", "COINBASE", "BTC-USD", 1, candles, 60) == 5
+        assert published(first_send)[-5:] == candles[1:6]
+        assert set(map(str, published(second_send))).isdisjoint(map(str, published(first_send)))
+
+    def test_nothing_is_sent_without_the_watermark_write(self, clock):
+        """Candles are only published once their watermark is stored"""
+        publisher = CandlePublisher(clock=clock)
+        send = Mock()
+        with patch.object(publisher, "_table", side_effect=Exception("Unavailable")):
+            assert publisher.publish(send, "queue", "COINBASE", "BTC-USD", 1, window(NOW), 60) == 0
+        send.assert_not_called()
+
+    @pytest.mark.parametrize("first_publish", [False, True])
+    def test_failed_send_is_sent_again(self, clock, first_publish):
+        """A send error moves the watermark back, the next run sends the same candles"""
+        publisher = CandlePublisher(min_batch=5, clock=clock)
+        if not first_publish:
+            publisher.publish(Mock(), "queue", "COINBASE", "BTC-USD", 1, window(NOW), 60)
+            clock.now = NOW + 600
+        candles = window(clock.now)
+
+        with pytest.raises(Exception, match="Unavailable"):
+            publisher.publish(Mock(side_effect=Exception("Unavailable")), "queue", "COINBASE", "BTC-USD", 1, candles, 60)
+
+        # A new container reads the rolled back watermark from the cache table
+        send = Mock()
+        sent = CandlePublisher(min_batch=5, clock=clock).publish(send, "queue", "COINBASE", "BTC-USD", 1, candles, 60)
+        assert sent == (299 if first_publish else 10)
+        assert published(send) == candles[1:sent + 1]
@@ -0,0 +1,117 @@
+import json
+import os
+from unittest.mock import Mock, patch
+
+import boto3
+import pytest
+
+from functions.strategies import handler
+from tests.golden.candles import synthetic_candles
+from utils import claim_check
+from utils.claim_check import LocalBlobStore, S3BlobStore, WrittenKeys, check_in, check_out
+from utils.common import Env
+from utils.serialization import dumps, loads
+
+
+@pytest.fixture
+def body(positions, portfolio, config):
+    return {
+        "portfolio": portfolio,
+        "correlation_id": "test-correlation-id",
+        "config": config,
+        "side": "BUY",
+        "positions": positions,
+        "historical_data": synthetic_candles(300, seed=7),
+        "risk_flags": [],
+    }
+
+
+def stored_blobs(directory):
+    return [name for _, _, files in os.walk(directory) for name in files]
+
+
+class TestClaimCheck:
+
+    def test_small_body_is_unchanged(self, body, tmp_path):
+        """Bodies within the threshold are sent inline"""
+        store = LocalBlobStore(str(tmp_path))
+        assert check_in(body, store, threshold=10_000_000) is body
+        assert stored_blobs(tmp_path) == []
+
+    def test_oversized_body_is_offloaded(self, body, tmp_path):
+        """Bulky fields become references and resolve back to the same values"""
+        store = LocalBlobStore(str(tmp_path))
+        checked = check_in(body, store, threshold=1_000)
+
+        reference = checked["historical_data"][claim_check.REFERENCE_KEY]
+        assert reference["store"] == "local"
+        assert reference["key"].startswith("claim-check/")
+        assert checked["side"] == "BUY"
+        assert len(dumps(checked)) < 2_000
+        assert check_out(checked, store) == loads(dumps(body))
+
+    def test_identical_windows_are_deduplicated(self, body, tmp_path):
+        """The same candle window is stored once across messages"""
+        store = LocalBlobStore(str(tmp_path))
+        first = check_in(body, store, threshold=1_000)
+        second = check_in({**body, "side": "SELL"}, store, threshold=1_000)
+
+        assert first["historical_data"] == second["historical_data"]
+        assert len(stored_blobs(tmp_path)) == 4
+
+    def test_s3_store_round_trip(self, body):
+        """Blobs written to S3 are read back by consumers"""
+        boto3.client("s3", Env.REGION).create_bucket(Bucket="claim-check")
+        store = S3BlobStore("claim-check")
+
+        checked = check_in(body, store, threshold=1_000)
+        assert checked["positions"][claim_check.REFERENCE_KEY]["location"] == "claim-check"
+        assert check_out(checked, S3BlobStore("claim-check")) == loads(dumps(body))
+
+    def test_stale_writes_are_redone(self, body):
+        """A key written before the bucket may have expired it is uploaded again"""
+        boto3.client("s3", Env.REGION).create_bucket(Bucket="claim-check")
+        clock = Mock(return_value=1_000_000)
+        store = S3BlobStore("claim-check", WrittenKeys(maxsize=2, max_age=3600, clock=clock))
+
+        with patch.object(store.client, "put_object", wraps=store.client.put_object) as put_object:
+            assert store.put("a", b"a") is True
+            assert store.put("a", b"a") is False
+            clock.return_value += 3600
+            assert store.put("a", b"a") is True
+            assert put_object.call_count == 2
+
+            # The oldest key is forgotten past maxsize
+            store.put("b", b"b")
+            store.put("c", b"c")
+            assert store.put("a", b"a") is True
+            assert store.put("c", b"c") is False
+
+    @patch('functions.strategies.ProviderClient')
+    @patch('functions.strategies.LambdaClient')
+    @patch('functions.strategies.send_message_to_queue')
+    def test_handler_offloads_risk_body(self, mock_queue, mock_lambda_client, mock_provider_client, tmp_path, sqs_strategy_event_existing_positions):
+        """The risk queue message carries references once over the threshold"""
+        mock_client = Mock()
+        mock_client.get_candles.return_value = {"candles": [
+            {"close": "80000", "high": "80100", "low": "79900", "open": "79950"},
+            {"open": "80050", "close": "79950", "high": "80100", "low": "79900"}
+        ] * 7}
+        mock_provider_client.return_value = mock_client
+        mock_lambda = Mock()
+        mock_lambda.invoke_lambda_function.return_value = '{"status": "success", "signals": []}'
+        mock_lambda_client.return_value = mock_lambda
+
+        body = json.loads(sqs_strategy_event_existing_positions["Records"][0]["body"])
+        body["strategy_term"] = "MEDIUM_TERM"
+        event = {"Records": [{"body": json.dumps(body)}]}
+
+        with patch('functions.strategies.notify_assistant'), \
+                patch.object(claim_check, "blob_store", LocalBlobStore(str(tmp_path))), \
+                patch.object(claim_check, "THRESHOLD_BYTES", 1_000):
+            handler(event, {})
+
+        queue_url, message = mock_queue.call_args[0]
+        assert queue_url == Env.QUEUE_RISK_URL
+        assert claim_check.REFERENCE_KEY in message["historical_data"]
+        assert len(check_out(message, LocalBlobStore(str(tmp_path)))["historical_data"]) == 14
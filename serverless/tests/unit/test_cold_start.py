@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+
+
+SERVERLESS_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Loaded on first use only, never while the handler module is imported
+DEFERRED_MODULES = ("boto3", "botocore", "requests", "urllib3", "numpy", "models.order_configs")
+
+
+def import_times(module):
+    """ Runs `python -X importtime` in a fresh interpreter: {module: cumulative us} """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SERVERLESS_DIR,
+        env=os.environ.copy(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+class TestColdStart:
+
+    def test_handler_import_defers_heavy_dependencies(self):
+        """boto3, requests, numpy and unused models are not imported with the handler"""
+        times = import_times("functions.strategies")
+
+        loaded = [
+            name for name in times
+            if any(name == module or name.startswith(f"{module}.") for module in DEFERRED_MODULES)
+        ]
+        assert loaded == []
@@ -0,0 +1,84 @@
+import pytest
+from pydantic import ValidationError
+
+from functions.strategies import MomentumStrategy, StrategyHandler
+from utils.config_cache import ConfigurationCache
+
+
+DYNAMIC_FIELDS = ("positions", "correlation_id", "portfolio")
+
+
+@pytest.fixture
+def payload(config, portfolio, positions):
+    return {
+        **config,
+        "provider": "COINBASE",
+        "product_id": "BTC-USD",
+        "strategy_term": "MEDIUM_TERM",
+        "portfolio": portfolio,
+        "positions": positions,
+        "correlation_id": "test-correlation-id",
+    }
+
+
+class TestConfigurationCache:
+
+    def test_cached_build_matches_validation(self, payload):
+        """A cached build is the same model full validation produces"""
+        cache = ConfigurationCache(MomentumStrategy, DYNAMIC_FIELDS)
+        cache.build(**payload)
+
+        second = {**payload, "correlation_id": "next-correlation-id", "positions": payload["positions"][:1]}
+        cached = cache.build(**second)
+        validated = MomentumStrategy(**second)
+
+        assert len(cache) == 1
+        assert cached.model_dump() == validated.model_dump()
+        assert cached.model_fields_set == validated.model_fields_set
+        assert cached.correlation_id == "next-correlation-id"
+        assert cached._logger("REVIEW_POSITIONS") is cached._logger("REVIEW_POSITIONS")
+
+    def test_cached_builds_do_not_share_state(self, payload):
+        """Private attributes start empty on every build"""
+        cache = ConfigurationCache(MomentumStrategy, DYNAMIC_FIELDS)
+        first = cache.build(**payload)
+        second = cache.build(**{**payload, "correlation_id": "next-correlation-id"})
+        third = cache.build(**{**payload, "correlation_id": "last-correlation-id"})
+
+        second._logger("REVIEW_POSITIONS")
+        assert second._loggers is not third._loggers
+        assert first._loggers == {} and third._loggers == {}
+
+    def test_changed_configuration_is_a_new_entry(self, payload):
+        """Any change to the static configuration is validated again"""
+        cache = ConfigurationCache(MomentumStrategy, DYNAMIC_FIELDS)
+        cache.build(**payload)
+        changed = cache.build(**{**payload, "profit_target": "7.5"})
+
+        assert len(cache) == 2
+        assert str(changed.profit_target) == "7.5"
+
+    def test_fast_path_validates_dynamic_fields(self, payload):
+        """Invalid positions still raise once the configuration is cached"""
+        cache = ConfigurationCache(MomentumStrategy, DYNAMIC_FIELDS)
+        cache.build(**payload)
+
+        with pytest.raises(ValidationError):
+            cache.build(**{**payload, "positions": [{"position_id": None}]})
+
+    def test_least_recently_used_entry_is_evicted(self, payload):
+        """The cache holds at most maxsize configurations"""
+        cache = ConfigurationCache(MomentumStrategy, DYNAMIC_FIELDS, maxsize=2)
+        for target in ("1.0", "2.0", "3.0"):
+            cache.build(**{**payload, "profit_target": target})
+
+        assert len(cache) == 2
+        targets = [str(template.profit_target) for template in cache._entries.values()]
+        assert targets == ["2.0", "3.0"]
+
+    def test_handler_create_uses_cache(self, payload):
+        """StrategyHandler.create serves repeated configurations from the cache"""
+        StrategyHandler.configurations.clear()
+        StrategyHandler.create(**payload)
+        StrategyHandler.create(**{**payload, "correlation_id": "next-correlation-id"})
+        assert len(StrategyHandler.configurations) == 1
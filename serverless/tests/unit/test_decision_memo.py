@@ -0,0 +1,97 @@
+from unittest.mock import Mock, patch
+
+import pytest
+
+from functions.strategies import handler
+from utils.decision_memo import DecisionMemo
+from utils.indicator_cache import DynamoDBResultBackend
+
+
+NOW = 1749700830
+
+
+class FakeClock:
+    def __init__(self, now=NOW):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def memo_key(memo, positions=(), side=None, strategy_term="SHORT_TERM"):
+    return memo.key("COINBASE", "BTC-USD", strategy_term, side, list(positions), {"profit_target": "10"})
+
+
+class TestDecisionMemo:
+
+    def test_key_follows_closed_candle(self):
+        """The key changes once a new candle has closed"""
+        clock = FakeClock()
+        memo = DecisionMemo(policy="suppress", clock=clock)
+        key = memo_key(memo)
+
+        clock.now = NOW + 20
+        assert memo_key(memo) == key
+        clock.now = NOW + 40
+        assert memo_key(memo) != key
+
+    def test_key_follows_positions_side_and_term(self):
+        """Changed positions, requested side or term miss the memo"""
+        memo = DecisionMemo(policy="suppress", clock=FakeClock())
+        key = memo_key(memo)
+        assert memo_key(memo, positions=[{"id": "pos1"}]) != key
+        assert memo_key(memo, side="BUY") != key
+        assert memo_key(memo, strategy_term="MEDIUM_TERM") != key
+        assert memo_key(memo, strategy_term="LONG_TERM") is None
+
+    def test_disabled_memo_never_hits(self):
+        """The default policy keeps every evaluation"""
+        memo = DecisionMemo(clock=FakeClock())
+        key = memo_key(memo)
+        memo.set(key, {"side": "BUY"})
+        assert key is None
+        assert memo.get(key) == (False, None)
+
+    def test_price_move_threshold(self):
+        """Decisions are only reused while the price stays within the threshold"""
+        memo = DecisionMemo(policy="reemit", price_move_pct="0.5", clock=FakeClock())
+        key = memo_key(memo)
+        memo.set(key, {"side": "BUY"}, price="100")
+
+        assert memo.get(key, price="100.4") == (True, {"side": "BUY"})
+        assert memo.get(key, price="99") == (False, None)
+        assert memo.get(key) == (False, None)
+
+    def test_decisions_are_shared_through_cache_table(self):
+        """A new container reads decisions stored by another"""
+        clock = FakeClock()
+        backend = DynamoDBResultBackend(ttl=3600, clock=clock, prefix="decision_")
+        memo = DecisionMemo(policy="reemit", backend=backend, clock=clock)
+        memo.set(memo_key(memo), {"side": "BUY"})
+
+        other = DecisionMemo(policy="reemit", backend=backend, clock=clock)
+        assert other.get(memo_key(other)) == (True, {"side": "BUY"})
+
+
+class TestHandlerDecisionMemo:
+
+    @pytest.fixture
+    def strategy(self):
+        strategy = Mock()
+        strategy.run.return_value = ("BUY", [{"close": "100000"}], [], ["risk1"])
+        return strategy
+
+    @pytest.mark.parametrize("policy,sent", [("suppress", 1), ("reemit", 2)])
+    @patch('functions.strategies.send_message_to_queue')
+    def test_repeated_evaluation_skips_strategy(self, mock_queue, policy, sent, strategy, sqs_strategy_event_no_positions):
+        """A second evaluation within the candle does not run the strategy"""
+        memo = DecisionMemo(policy=policy, clock=FakeClock())
+        with patch('functions.strategies.decision_memo', memo), \
+                patch('functions.strategies.StrategyHandler.create', return_value=strategy) as mock_create:
+            handler(sqs_strategy_event_no_positions, {})
+            handler(sqs_strategy_event_no_positions, {})
+
+        mock_create.assert_called_once()
+        assert mock_queue.call_count == sent
+        if sent == 2:
+            assert mock_queue.call_args_list[0].args[1] == mock_queue.call_args_list[1].args[1]
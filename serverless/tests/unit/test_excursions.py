@@ -0,0 +1,102 @@
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from models.api import Position
+from tests.golden.candles import SYNTHETIC_END, synthetic_candles, synthetic_positions
+from utils.common import Env
+from utils.excursions import entry_time, excursions, parse_time, trailing_stops
+
+
+CANDLES = synthetic_candles(120, seed=9, granularity=3600, drift=0.001)
+
+
+def iso(timestamp):
+    return np.datetime_as_string(np.datetime64(int(timestamp), "s")) + "Z"
+
+
+def reference(candles, entry, time):
+    """ Peak and trough since entry, candle by candle """
+    since = [candle for candle in candles if int(candle["start"]) + 3600 > time] or candles[-1:]
+    peak = max([entry] + [float(candle["high"]) for candle in since])
+    trough = min([entry] + [float(candle["low"]) for candle in since])
+    return peak, trough, len(since)
+
+
+@pytest.fixture
+def profit_target():
+    return "50.0"
+
+
+class TestExcursions:
+
+    def test_excursions_match_reference(self):
+        """Peaks, troughs and drawdowns equal a per-position pass over the candles"""
+        oldest = int(CANDLES[-1]["start"])
+        times = [oldest - 7200, oldest, oldest + 1800, oldest + 3600 * 60 + 5, SYNTHETIC_END + 10]
+        entries = [float(CANDLES[60]["close"]) * factor for factor in (0.9, 1.0, 1.05, 0.97, 1.0)]
+        stats = excursions(CANDLES, entries, times)
+        latest = float(CANDLES[0]["close"])
+        for i, (entry, time) in enumerate(zip(entries, times)):
+            peak, trough, count = reference(CANDLES, entry, time)
+            assert stats["peak"][i] == pytest.approx(peak)
+            assert stats["trough"][i] == pytest.approx(trough)
+            assert stats["candles"][i] == count
+            assert stats["drawdown_pct"][i] == pytest.approx((peak - latest) / peak * 100)
+            assert stats["favorable_pct"][i] == pytest.approx((peak - entry) / entry * 100)
+            assert stats["adverse_pct"][i] == pytest.approx((entry - trough) / entry * 100)
+        assert stats["covered"].tolist() == [False, True, True, True, True]
+
+    def test_unknown_entry_times_never_stop(self):
+        """Positions without an entry time give NaN and no trailing stop"""
+        stats = excursions(CANDLES, [1.0], [None])
+        assert np.isnan(stats["peak"][0])
+        assert not trailing_stops(stats, 0, 0)[0]
+
+    def test_candles_without_start_give_no_excursions(self):
+        """Entries cannot be placed in a window without start times"""
+        assert excursions([{"high": "1", "low": "1", "close": "1"}], [1.0], [0.0]) is None
+        assert excursions([], [1.0], [0.0]) is None
+
+    def test_trailing_stop_conditions(self):
+        """A stop needs an activated peak, a drawdown from it and a remaining profit"""
+        stats = {
+            "favorable_pct": np.array([10.0, 10.0, 2.0, 10.0]),
+            "drawdown_pct": np.array([3.0, 1.0, 3.0, 12.0]),
+            "profit_pct": np.array([6.7, 8.9, 1.0, -1.2]),
+        }
+        assert trailing_stops(stats, 2.5, 4.0).tolist() == [True, False, False, False]
+
+    def test_entry_time_prefers_last_fill(self):
+        """The last fill dates the average price, the creation time is the fallback"""
+        position = Position(**synthetic_positions(1)[0])
+        assert entry_time(position) == parse_time("2025-06-01T00:00:01Z")
+        assert entry_time(position.model_copy(update={"last_fill_time": None})) == parse_time("2025-06-01T00:00:00Z")
+        assert parse_time("not a time") is None
+
+
+class TestStrategyTrailingStops:
+
+    def test_trailing_stop_adds_positions(self, strategy):
+        """With TRAILING_STOP_PCT set, positions that fell from their peak are sold too"""
+        peak = max(float(candle["high"]) for candle in CANDLES[:60])
+        latest = float(CANDLES[0]["close"])
+        position = synthetic_positions(1)[0]
+        position.update(
+            average_filled_price=f"{min(peak, latest) / 1.05:.2f}",
+            last_fill_time=iso(int(CANDLES[60]["start"])),
+        )
+        strategy.positions = [Position(**position)]
+        drawdown = (peak - latest) / peak * 100
+
+        with patch("functions.strategies.notify_assistant"):
+            assert strategy.review_positions(CANDLES) == []
+            with patch.object(Env, "TRAILING_STOP_PCT", str(drawdown / 2)):
+                assert strategy.review_positions(CANDLES) == strategy.positions
+            with patch.object(Env, "TRAILING_STOP_PCT", str(drawdown * 2)):
+                assert strategy.review_positions(CANDLES) == []
+            # Without start times the review goes on without trailing stops
+            unstarted = [{k: v for k, v in candle.items() if k != "start"} for candle in CANDLES]
+            with patch.object(Env, "TRAILING_STOP_PCT", str(drawdown / 2)):
+                assert strategy.review_positions(unstarted) == []
@@ -0,0 +1,69 @@
+from decimal import Decimal
+
+import pytest
+
+from tests.golden import reference
+from tests.golden.candles import candle_sets, synthetic_candles
+from utils.features import FeatureGraph, FeatureSet, candle_features
+
+
+class TestFeatureSet:
+
+    def test_features_are_computed_lazily(self):
+        """Only the requested feature and its dependencies are computed"""
+        features = FeatureSet(candle_features, synthetic_candles(60, seed=1))
+        features["diff_pct"]
+        assert features.computed == ["diff_pct"]
+
+        features["levels"]
+        assert features.computed == ["diff_pct", "highs", "lows", "levels"]
+
+    def test_features_are_computed_once(self):
+        """Shared dependencies are derived a single time"""
+        features = FeatureSet(candle_features, synthetic_candles(60, seed=1), candle_stick_scope=12)
+        features["bullish_engulfing"]
+        features["bearish_engulfing"]
+        assert features.computed.count("pattern_prices") == 1
+
+    @pytest.mark.parametrize("name,candles", candle_sets().items())
+    def test_features_match_reference(self, name, candles):
+        """Derived features equal the frozen decision logic"""
+        features = FeatureSet(candle_features, candles, tolerance=0.05)
+        assert features["diff_pct"] == reference.price_diff_pct(candles, "LONG_TERM")[1]
+        assert features["levels"] == reference.support_resistance(candles)
+        assert features["bullish_engulfing"] == reference.bullish_engulfing(candles)
+        assert features["bearish_engulfing"] == reference.bearish_engulfing(candles)
+
+    def test_unknown_features_raise(self):
+        """Dependencies and consumed features must be registered"""
+        graph = FeatureGraph()
+        with pytest.raises(ValueError):
+            graph.feature("sma", "closes")
+        with pytest.raises(ValueError):
+            graph.consumes("closes")
+
+
+class TestStrategyFeatures:
+
+    def test_early_exit_computes_only_price_diff(self, strategy):
+        """A rejected price diff does not derive the other features"""
+        candles = synthetic_candles(60, seed=1)
+        strategy.validate_price_diff_pct(candles)
+        assert strategy.features(candles).computed == ["diff_pct"]
+
+    def test_stages_share_a_window(self, strategy):
+        """Stages reading the same window reuse one feature set"""
+        candles = synthetic_candles(60, seed=1)
+        assert strategy.features(candles) is strategy.features(candles)
+        assert strategy.features(candles) is not strategy.features(list(candles))
+
+    def test_maxmin_pct_uses_window_range(self, strategy):
+        """The range check compares the window's high/low range to the threshold"""
+        candles = synthetic_candles(60, seed=1)
+        highs = [Decimal(candle["high"]) for candle in candles]
+        lows = [Decimal(candle["low"]) for candle in candles]
+        expected = (max(highs) - min(lows)) / min(lows) * 100
+
+        passed, max_min_pct = strategy.validate_maxmin_pct(candles)
+        assert max_min_pct == expected
+        assert passed == (expected >= strategy.maxmin_pct_threshold)
@@ -0,0 +1,122 @@
+import re
+import pytest
+from unittest.mock import patch
+
+from tests.golden import reference
+from tests.golden.candles import candle_sets, synthetic_candles, synthetic_positions
+from tests.golden.harness import compare, Exact, Rel, RAISES
+
+
+POSITION_ID = re.compile(r"PositionID: (\S+)")
+
+
+class TestGoldenEquivalence:
+
+    @pytest.mark.parametrize("strategy_term", ["SHORT_TERM", "MEDIUM_TERM", "LONG_TERM", "INVALID_TERM"])
+    def test_validate_price_diff_pct(self, make_strategy, strategy_term):
+        """validate_price_diff_pct makes the reference decision on every candle set"""
+        strategy = make_strategy(strategy_term=strategy_term)
+        cases = {name: (candles,) for name, candles in candle_sets().items()}
+        cases["zero_opening_price"] = ([{"close": "100"}, {"close": "0"}],)
+
+        report = compare(
+            f"validate_price_diff_pct[{strategy_term}]",
+            lambda data: reference.price_diff_pct(data, strategy_term),
+            strategy.validate_price_diff_pct,
+            cases,
+            rules={"0": Exact(), "1": Rel("1e-20")},
+        )
+        report.assert_equivalent()
+
+    @pytest.mark.parametrize("tolerance", [0.05, 0.01, 0.001])
+    def test_validate_support_resistance(self, make_strategy, tolerance):
+        """validate_support_resistance finds the reference levels"""
+        strategy = make_strategy()
+        cases = {name: (candles,) for name, candles in candle_sets().items()}
+
+        report = compare(
+            f"validate_support_resistance[{tolerance}]",
+            lambda data: reference.support_resistance(data, tolerance),
+            lambda data: strategy.validate_support_resistance(data, tolerance),
+            cases,
+            rules={"support": Rel("1e-20"), "resistance": Rel("1e-20")},
+        )
+        report.assert_equivalent()
+
+    @pytest.mark.parametrize("scope", [2, 12, None])
+    def test_engulfing_detectors(self, make_strategy, scope):
+        """Both engulfing detectors agree with the reference on every window"""
+        strategy = make_strategy()
+        cases = {name: (candles[:scope],) for name, candles in candle_sets().items()}
+
+        bullish = compare(
+            f"detect_bullish_engulfing[{scope}]",
+            reference.bullish_engulfing,
+            strategy.detect_bullish_engulfing,
+            cases,
+        )
+        bearish = compare(
+            f"detect_bearish_engulfing[{scope}]",
+            reference.bearish_engulfing,
+            strategy.detect_bearish_engulfing,
+            cases,
+        )
+        bullish.assert_equivalent()
+        bearish.assert_equivalent()
+
+    @pytest.mark.parametrize("count", [1, 25, 500])
+    def test_review_positions(self, make_strategy, count):
+        """review_positions keeps and notifies exactly the reference positions"""
+        candles = synthetic_candles(60, seed=11)
+        latest = float(candles[0]["close"])
+        strategy = make_strategy(positions=synthetic_positions(count, base_price=latest, spread=0.12))
+        notified = []
+
+        def record(correlation_id, message):
+            notified.append(POSITION_ID.search(message).group(1))
+
+        def candidate(data):
+            notified.clear()
+            kept = strategy.review_positions(data)
+            return [position.position_id for position in kept], list(notified)
+
+        cases = {
+            "latest_close": (candles,),
+            "rally": ([dict(candles[0], close=str(latest * 1.08))] + candles[1:],),
+            "selloff": ([dict(candles[0], close=str(latest * 0.9))] + candles[1:],),
+        }
+        with patch("functions.strategies.notify_assistant", side_effect=record):
+            report = compare(
+                f"review_positions[{count}]",
+                lambda data: reference.review_positions(data, strategy.positions, strategy.profit_target),
+                candidate,
+                cases,
+            )
+        report.assert_equivalent()
+
+    def test_sma_cross_reference_port(self):
+        """The Python port of the Rust SMA cross emits the Rust signal strings"""
+        data = [{"close": str(price)} for price in [1, 2, 3, 4, 3, 2, 1, 1.5]]
+        assert reference.sma_cross_signals(data, 2, 3) == [
+            "SMA Signal: Buy at price: 3",
+            "SMA Signal: Sell at price: 2",
+        ]
+
+    def test_harness_reports_mismatches_and_speedup(self):
+        """A diverging candidate is reported field by field with timings"""
+        cases = {"a": (1,), "b": (2,), "c": (0,)}
+        report = compare(
+            "harness_self_check",
+            lambda x: {"value": 10 / x, "label": "x"},
+            lambda x: {"value": 10 / x + (x == 2), "label": "x"},
+            cases,
+            rules={"value": Rel("0.01")},
+        )
+        assert not report.equivalent
+        assert [(m.case, m.field) for m in report.mismatches] == [("b", "value")]
+        assert report.reference_seconds > 0
+        assert report.speedup > 0
+        assert "speedup" in report.summary()
+
+        raising = compare("raises", lambda x: 1 / x, lambda x: 1, {"zero": (0,)})
+        assert raising.mismatches[0].field == RAISES
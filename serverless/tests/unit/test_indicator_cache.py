@@ -0,0 +1,107 @@
+from unittest.mock import Mock, patch
+
+import pytest
+
+from tests.golden.candles import synthetic_candles
+from utils.indicator_cache import DynamoDBResultBackend, IndicatorCache, indicator_cache, window_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestWindowKey:
+
+    def test_new_candle_changes_key(self):
+        """A newly closed candle invalidates results for the window"""
+        candles = synthetic_candles(60, seed=1, end=1749700800)
+        later = synthetic_candles(60, seed=1, end=1749700860)
+        assert window_key("sma", candles) == window_key("sma", list(candles))
+        assert window_key("sma", candles) != window_key("sma", later)
+
+    def test_open_candle_update_changes_key(self):
+        """Any change to the newest candle gives a new key"""
+        candles = synthetic_candles(60, seed=1)
+        updated = [{**candles[0], "high": "999999.99"}] + candles[1:]
+        assert window_key("sma", candles) != window_key("sma", updated)
+
+    def test_params_and_scope_are_part_of_key(self):
+        candles = synthetic_candles(12, seed=1)
+        assert window_key("sr", candles, 0.05) != window_key("sr", candles, 0.1)
+        assert window_key("sr", candles, scope=("BTC-USD",)) != window_key("sr", candles, scope=("ETH-USD",))
+
+    def test_windows_without_start_are_not_cached(self):
+        assert window_key("sma", [{"close": "100"}]) is None
+        assert window_key("sma", []) is None
+
+
+class TestIndicatorCache:
+
+    def test_computes_once_within_ttl(self):
+        """Results are reused until the TTL passes"""
+        clock = FakeClock()
+        cache = IndicatorCache(ttl=60, clock=clock)
+        compute = Mock(return_value=[1, 2])
+
+        assert cache.get_or_compute("key", compute) == [1, 2]
+        assert cache.get_or_compute("key", compute) == [1, 2]
+        assert compute.call_count == 1
+
+        clock.now = 61
+        cache.get_or_compute("key", compute)
+        assert compute.call_count == 2
+
+    def test_exceptions_are_not_cached(self):
+        cache = IndicatorCache()
+        compute = Mock(side_effect=[ValueError("boom"), "ok"])
+
+        with pytest.raises(ValueError):
+            cache.get_or_compute("key", compute)
+        assert cache.get_or_compute("key", compute) == "ok"
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = IndicatorCache(maxsize=2)
+        for key in ("a", "b", "a", "c"):
+            cache.get_or_compute(key, lambda: key)
+        assert len(cache) == 2
+        assert list(cache._entries) == ["a", "c"]
+
+    def test_shared_backend_serves_other_containers(self):
+        """A result computed by one container is read by another"""
+        compute = Mock(return_value=["SMA Signal: Buy at price: 1"])
+        IndicatorCache(backend=DynamoDBResultBackend()).get_or_compute("key", compute, shared=True)
+        result = IndicatorCache(backend=DynamoDBResultBackend()).get_or_compute("key", compute, shared=True)
+
+        assert result == ["SMA Signal: Buy at price: 1"]
+        assert compute.call_count == 1
+
+
+class TestStrategyIndicatorCache:
+
+    @patch('functions.strategies.LambdaClient')
+    def test_ta_indicators_invoked_once_per_candle(self, mock_lambda_client, strategy):
+        """Messages within one candle reuse the Lambda result"""
+        mock_lambda = Mock()
+        mock_lambda.invoke_lambda_function.return_value = '{"status": "success", "signals": ["SMA Signal: Buy at price: 1"]}'
+        mock_lambda_client.return_value = mock_lambda
+        candles = synthetic_candles(60, seed=1, end=1749700800)
+
+        assert strategy.ta_indicators(candles) == ["SMA Signal: Buy at price: 1"]
+        assert strategy.ta_indicators(list(candles)) == ["SMA Signal: Buy at price: 1"]
+        assert mock_lambda.invoke_lambda_function.call_count == 1
+
+        strategy.ta_indicators(synthetic_candles(60, seed=1, end=1749700860))
+        assert mock_lambda.invoke_lambda_function.call_count == 2
+
+    def test_cached_results_match_computation(self, strategy):
+        """Cached support/resistance and engulfing results equal fresh ones"""
+        candles = synthetic_candles(60, seed=4, volatility=0.02)
+        first = (strategy.validate_support_resistance(candles), strategy.detect_bullish_engulfing(candles))
+        assert len(indicator_cache) == 2
+
+        assert (strategy.validate_support_resistance(candles), strategy.detect_bullish_engulfing(candles)) == first
+        assert first == (strategy._validate_support_resistance(candles, 0.05), strategy._detect_bullish_engulfing(candles))
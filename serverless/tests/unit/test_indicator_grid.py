@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from tests.golden.candles import synthetic_candles
+from utils.indicator_grid import cross_signals, ema_matrix, signal_records, sma_cross_grid, sma_matrix
+from utils.indicators import SimpleMovingAverage, sma_cross_records
+
+
+CANDLES = synthetic_candles(400, seed=11, volatility=0.01)
+CLOSES = [float(candle["close"]) for candle in CANDLES]
+
+
+class TestIndicatorGrid:
+
+    def test_sma_matrix_matches_streaming_sma(self):
+        """Every row equals the service's SMA, warm-up included"""
+        periods = [1, 5, 14, 50]
+        matrix = sma_matrix(CLOSES, periods)
+        for row, period in zip(matrix, periods):
+            sma = SimpleMovingAverage(period)
+            assert row == pytest.approx([sma.next(close) for close in CLOSES])
+
+    def test_ema_matrix_matches_recursion(self):
+        """Rows are EMAs seeded with the first value"""
+        periods = [3, 12]
+        matrix = ema_matrix(CLOSES, periods)
+        for row, period in zip(matrix, periods):
+            k = 2 / (period + 1)
+            expected, current = [], CLOSES[0]
+            for close in CLOSES:
+                current = k * close + (1 - k) * current
+                expected.append(current)
+            assert row == pytest.approx(expected)
+
+    def test_grid_matches_single_runs(self):
+        """Each pair of the grid gives the signals of a single SMA-cross run"""
+        pairs, signals = sma_cross_grid(CLOSES, [5, 10, 14], [20, 50])
+        assert pairs == [(5, 20), (5, 50), (10, 20), (10, 50), (14, 20), (14, 50)]
+        for (n1, n2), row in zip(pairs, signals):
+            assert signal_records(CLOSES, row) == sma_cross_records(CANDLES, n1, n2)
+
+    def test_cross_signals_alternate(self):
+        """Repeated crossings in the same direction give one signal"""
+        fast = np.array([[1.0, 2.0, 3.0, 3.0, 1.0, 0.0, 2.0]])
+        slow = np.array([[2.0, 1.0, 1.0, 3.0, 2.0, 1.0, 1.0]])
+        assert cross_signals(fast, slow).tolist() == [[-1, 1, 0, 0, -1, 0, 1]]
+
+    def test_invalid_pairs_are_skipped(self):
+        """Pairs with n1 >= n2 are not evaluated"""
+        pairs, signals = sma_cross_grid(CLOSES, [50], [20])
+        assert pairs == []
+        assert signals.shape == (0, len(CLOSES))
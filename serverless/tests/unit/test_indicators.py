@@ -0,0 +1,171 @@
+import threading
+import time
+
+from unittest.mock import Mock, patch
+
+import pytest
+
+from functions import strategies
+from functions.strategies import drain_ta_hedges, ta_hedges_drained
+from tests.golden import reference
+from tests.golden.candles import candle_sets, synthetic_candles
+from utils.common import Env
+from utils.indicators import sma_cross_records, sma_cross_signals
+from utils.metrics import metrics
+
+
+@pytest.fixture
+def hedged():
+    with patch.object(Env, "TA_HEDGE_BUDGET_MS", "20"):
+        yield
+
+
+def lambda_response(signals):
+    return '{"status": "success", "signals": %s}' % str(signals).replace("'", '"')
+
+
+class TestSmaCrossSignals:
+
+    @pytest.mark.parametrize("name,candles", [
+        (name, candles) for name, candles in candle_sets().items() if len(candles) >= 50
+    ])
+    def test_matches_indicators_service(self, name, candles):
+        """Local signals equal the port of the Rust SMA cross"""
+        assert sma_cross_signals(candles, 14, 50) == reference.sma_cross_signals(candles, 14, 50)
+
+    def test_rejects_what_the_service_rejects(self):
+        """Short windows and inverted periods fail like the service does"""
+        with pytest.raises(ValueError):
+            sma_cross_signals(synthetic_candles(10, seed=1), 14, 50)
+        with pytest.raises(ValueError):
+            sma_cross_signals(synthetic_candles(60, seed=1), 50, 14)
+
+
+class TestHedgedTaIndicators:
+
+    @patch('functions.strategies.LambdaClient')
+    def test_remote_serves_within_budget(self, mock_lambda_client, strategy, hedged):
+        """A timely Lambda answer is used as it is"""
+        mock_lambda_client.return_value.invoke_lambda_function.return_value = lambda_response(["remote"])
+        metrics.reset()
+
+        assert strategy.ta_indicators(synthetic_candles(60, seed=1)) == ["remote"]
+        assert metrics.counters["ta_indicators_remote"] == 1
+
+    @patch('functions.strategies.LambdaClient')
+    def test_slow_remote_is_hedged_locally(self, mock_lambda_client, strategy, hedged):
+        """The local indicators serve once the budget is spent"""
+        release = threading.Event()
+
+        def slow_invoke(payload):
+            release.wait(5)
+            return lambda_response(["remote"])
+
+        mock_lambda_client.return_value.invoke_lambda_function.side_effect = slow_invoke
+        candles = synthetic_candles(60, seed=1)
+        metrics.reset()
+        try:
+            assert strategy.ta_indicators(candles) == sma_cross_records(candles, 14, 50)
+        finally:
+            release.set()
+        assert metrics.counters["ta_indicators_local"] == 1
+
+    @patch('functions.strategies.LambdaClient')
+    def test_hedged_invokes_are_drained(self, mock_lambda_client, strategy, hedged):
+        """A hedged invoke finishes within the invocation that started it"""
+        release = threading.Event()
+        threads = []
+
+        def slow_invoke(payload):
+            threads.append(threading.current_thread())
+            release.wait(5)
+            metrics.external_call("lambda_invocations")
+            return lambda_response(["remote"])
+
+        mock_lambda_client.return_value.invoke_lambda_function.side_effect = slow_invoke
+        candles = synthetic_candles(60, seed=1)
+
+        @ta_hedges_drained
+        def handler(event, context):
+            result = strategy.ta_indicators(candles)
+            release.set()
+            return result
+
+        context = Mock(**{"get_remaining_time_in_millis.return_value": 3000})
+        metrics.reset()
+        assert handler({}, context) == sma_cross_records(candles, 14, 50)
+        assert strategies._ta_hedged == {}
+        assert metrics.counters["lambda_invocations"] == 1
+        # The client is created by the caller, not in the worker
+        assert mock_lambda_client.call_count == 1
+        assert threads and threads[0] is not threading.main_thread()
+
+    @patch('functions.strategies.LambdaClient')
+    def test_undrained_invokes_are_reported(self, mock_lambda_client, strategy, hedged):
+        release = threading.Event()
+        mock_lambda_client.return_value.invoke_lambda_function.side_effect = lambda payload: release.wait(5)
+        metrics.reset()
+        try:
+            strategy.ta_indicators(synthetic_candles(60, seed=1))
+            drain_ta_hedges(0)
+        finally:
+            release.set()
+        assert strategies._ta_hedged == {}
+        assert metrics.counters["ta_indicators_hedge_orphaned"] == 1
+
+    @patch('functions.strategies.LambdaClient')
+    def test_drain_wait_is_capped(self, mock_lambda_client, strategy, hedged):
+        """The handler waits at most TA_HEDGE_DRAIN_MS for a hedged invoke, however long the invocation has left"""
+        release = threading.Event()
+        mock_lambda_client.return_value.invoke_lambda_function.side_effect = lambda payload: release.wait(5)
+
+        @ta_hedges_drained
+        def handler(event, context):
+            return strategy.ta_indicators(synthetic_candles(60, seed=1))
+
+        context = Mock(**{"get_remaining_time_in_millis.return_value": 900000})
+        metrics.reset()
+        started = time.monotonic()
+        try:
+            handler({}, context)
+        finally:
+            release.set()
+        assert time.monotonic() - started < 1
+        assert metrics.counters["ta_indicators_hedge_orphaned"] == 1
+
+    @patch('functions.strategies.LambdaClient')
+    def test_local_results_are_not_cached(self, mock_lambda_client, strategy, hedged):
+        """The next run with the same candles tries the Lambda again"""
+        mock_lambda_client.return_value.invoke_lambda_function.side_effect = [
+            Exception("Throttled"), lambda_response(["remote"]),
+        ]
+        candles = synthetic_candles(60, seed=1)
+
+        assert strategy.ta_indicators(candles) == sma_cross_records(candles, 14, 50)
+        assert strategy.ta_indicators(candles) == ["remote"]
+        assert strategy.ta_indicators(candles) == ["remote"]
+        assert mock_lambda_client.return_value.invoke_lambda_function.call_count == 2
+
+    @patch('functions.strategies.LambdaClient')
+    def test_failing_remote_is_hedged_locally(self, mock_lambda_client, strategy, hedged):
+        """A Lambda error no longer fails the run"""
+        mock_lambda_client.return_value.invoke_lambda_function.side_effect = Exception("Throttled")
+        candles = synthetic_candles(60, seed=1)
+
+        assert strategy.ta_indicators(candles) == sma_cross_records(candles, 14, 50)
+
+    @patch('functions.strategies.LambdaClient')
+    def test_remote_error_raises_without_local_result(self, mock_lambda_client, strategy, hedged):
+        """Without enough candles for the local indicators the remote error stands"""
+        mock_lambda_client.return_value.invoke_lambda_function.side_effect = Exception("Throttled")
+
+        with pytest.raises(Exception, match="Throttled"):
+            strategy.ta_indicators(synthetic_candles(10, seed=1))
+
+    @patch('functions.strategies.LambdaClient')
+    def test_unhedged_by_default(self, mock_lambda_client, strategy):
+        """Without a budget the Lambda error fails the call as before"""
+        mock_lambda_client.return_value.invoke_lambda_function.side_effect = Exception("Throttled")
+
+        with pytest.raises(Exception, match="Throttled"):
+            strategy.ta_indicators(synthetic_candles(60, seed=1))
@@ -0,0 +1,68 @@
+import pytest
+import structlog
+
+from functions.strategies import MomentumStrategy
+from utils.logger import EventSampler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestEventSampler:
+
+    def test_drops_events_over_limit(self):
+        """Only `limit` events of a sampled type pass per window"""
+        sampler = EventSampler({"NOISY": 2}, window_seconds=60, clock=FakeClock())
+
+        assert sampler(None, "warning", {"event": "NOISY"}) == {"event": "NOISY"}
+        assert sampler(None, "warning", {"event": "NOISY"}) == {"event": "NOISY"}
+        with pytest.raises(structlog.DropEvent):
+            sampler(None, "warning", {"event": "NOISY"})
+
+    def test_unsampled_events_pass(self):
+        """Events without a limit are never dropped"""
+        sampler = EventSampler({"NOISY": 0}, clock=FakeClock())
+        for _ in range(100):
+            assert sampler(None, "error", {"event": "IMPORTANT"}) == {"event": "IMPORTANT"}
+
+    def test_new_window_reports_dropped_count(self):
+        """The first event of a new window carries how many were dropped"""
+        clock = FakeClock()
+        sampler = EventSampler({"NOISY": 1}, window_seconds=60, clock=clock)
+
+        sampler(None, "warning", {"event": "NOISY"})
+        for _ in range(3):
+            with pytest.raises(structlog.DropEvent):
+                sampler(None, "warning", {"event": "NOISY"})
+
+        clock.now = 61
+        assert sampler(None, "warning", {"event": "NOISY"}) == {"event": "NOISY", "sampled_dropped": 3}
+        with pytest.raises(structlog.DropEvent):
+            sampler(None, "warning", {"event": "NOISY"})
+
+
+class TestStrategyLogger:
+
+    def test_logger_is_cached_per_operation(self, config, portfolio):
+        """Each operation binds its logger once per strategy run"""
+        config_copy = config.copy()
+        config_copy.pop('product_id', None)
+        strategy = MomentumStrategy(
+            provider="COINBASE",
+            product_id="BTC-USD",
+            portfolio=portfolio,
+            positions=[],
+            correlation_id="test-correlation-id",
+            strategy_term="MEDIUM_TERM",
+            **config_copy
+        )
+
+        review = strategy._logger("REVIEW_POSITIONS")
+        assert strategy._logger("REVIEW_POSITIONS") is review
+        assert strategy._logger("ORDER_SIDE") is not review
+        assert strategy._logger("STRATEGY_RUN", strategy_term="MEDIUM_TERM") is not strategy._logger("STRATEGY_RUN")
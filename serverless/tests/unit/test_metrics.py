@@ -0,0 +1,92 @@
+import io
+import json
+from unittest.mock import Mock, patch
+
+from functions.strategies import handler
+from utils.metrics import MetricsLogger
+
+
+def emf_lines(output):
+    return [json.loads(line) for line in output.splitlines() if line.startswith('{"_aws"')]
+
+
+class TestMetricsLogger:
+
+    def test_flush_writes_emf_document(self):
+        """Timings and counters are written as one EMF line with the dimensions"""
+        stream = io.StringIO()
+        metrics = MetricsLogger(stream=stream)
+        metrics.reset(provider="COINBASE", product_id="BTC-USD", strategy_term="MEDIUM_TERM")
+
+        with metrics.timer("order_side"):
+            pass
+        with metrics.timer("token_fetch"):
+            pass
+        with metrics.timer("token_fetch"):
+            pass
+        metrics.external_call("provider_requests")
+        metrics.external_call("sqs_messages")
+        metrics.flush()
+
+        doc = json.loads(stream.getvalue())
+        directive = doc["_aws"]["CloudWatchMetrics"][0]
+        assert directive["Namespace"] == "TraderStrategy"
+        assert directive["Dimensions"] == [["provider", "product_id", "strategy_term"]]
+        names = {metric["Name"]: metric["Unit"] for metric in directive["Metrics"]}
+        assert names["order_side_ms"] == "Milliseconds"
+        assert names["external_calls"] == "Count"
+        assert doc["provider"] == "COINBASE"
+        assert doc["product_id"] == "BTC-USD"
+        assert isinstance(doc["order_side_ms"], float)
+        assert len(doc["token_fetch_ms"]) == 2
+        assert doc["external_calls"] == 2
+        assert doc["provider_requests"] == 1
+
+    def test_flush_without_data_writes_nothing(self):
+        """Invocations that record nothing do not emit an empty document"""
+        stream = io.StringIO()
+        metrics = MetricsLogger(stream=stream)
+        metrics.flush()
+        assert stream.getvalue() == ""
+
+    def test_missing_dimension_is_unknown(self):
+        """EMF needs every dimension present, missing ones are UNKNOWN"""
+        metrics = MetricsLogger(stream=io.StringIO())
+        metrics.reset(provider=None)
+        metrics.increment("external_calls")
+        doc = metrics.document()
+        assert doc["provider"] == "UNKNOWN"
+        assert doc["strategy_term"] == "UNKNOWN"
+
+
+class TestHandlerMetrics:
+
+    @patch('functions.strategies.ProviderClient')
+    @patch('functions.strategies.LambdaClient')
+    @patch('functions.strategies.send_message_to_queue')
+    def test_handler_emits_stage_timings(self, mock_queue, mock_lambda_client, mock_provider_client, capsys, sqs_strategy_event_existing_positions):
+        """A full run emits one EMF line with every strategy stage timed"""
+        mock_client = Mock()
+        mock_client.get_candles.return_value = {"candles": [
+            {"close": "80000", "high": "80100", "low": "79900", "open": "79950"},
+            {"open": "80050", "close": "79950", "high": "80100", "low": "79900"}
+        ] * 7}
+        mock_provider_client.return_value = mock_client
+        mock_lambda = Mock()
+        mock_lambda.invoke_lambda_function.return_value = '{"status": "success", "signals": []}'
+        mock_lambda_client.return_value = mock_lambda
+
+        body = json.loads(sqs_strategy_event_existing_positions["Records"][0]["body"])
+        body["strategy_term"] = "MEDIUM_TERM"
+        event = {"Records": [{"body": json.dumps(body)}]}
+
+        with patch('functions.strategies.notify_assistant'):
+            handler(event, {})
+
+        docs = emf_lines(capsys.readouterr().out)
+        assert len(docs) == 1
+        doc = docs[0]
+        assert doc["product_id"] == "BTC-USD"
+        assert doc["strategy_term"] == "MEDIUM_TERM"
+        for stage in ("handle_historical_data", "ta_indicators", "order_side", "confirm_side_with_trend"):
+            assert f"{stage}_ms" in doc
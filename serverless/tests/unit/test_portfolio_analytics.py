@@ -0,0 +1,228 @@
+import math
+import random
+
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+
+from tests.golden.candles import SYNTHETIC_END, synthetic_positions
+from utils.common import Env
+from utils.portfolio_analytics import CorrelationTracker, portfolio_analytics
+
+
+GRANULARITY = 3600
+
+
+def candles_from(returns, end=SYNTHETIC_END, price=100.0):
+    """ Provider format candles (newest first) whose closes follow returns, plus an open candle """
+    closes = [price]
+    for value in returns:
+        closes.append(closes[-1] * math.exp(value))
+    closes.append(closes[-1])
+    start = end - (len(closes) - 1) * GRANULARITY
+    candles = [
+        {"start": str(start + i * GRANULARITY), "close": f"{close:.10f}"}
+        for i, close in enumerate(closes)
+    ]
+    return candles[::-1]
+
+
+def walks(count, seed=0):
+    """ Returns of a market factor, a product following it and an unrelated product """
+    rng = random.Random(seed)
+    market = [rng.gauss(0, 0.01) for _ in range(count)]
+    follower = [value + rng.gauss(0, 0.002) for value in market]
+    unrelated = [rng.gauss(0, 0.01) for _ in range(count)]
+    return market, follower, unrelated
+
+
+def reference(a, b, decay):
+    covariance = 0.0
+    for x, y in zip(a, b):
+        covariance = decay * covariance + (1 - decay) * x * y
+    return covariance
+
+
+@pytest.fixture
+def strategy_positions():
+    return synthetic_positions(10)
+
+
+class TestCorrelationTracker:
+
+    def test_live_updates_match_reference(self):
+        """Period by period updates equal the EWMA recursion over the joint returns"""
+        market, follower, _ = walks(60)
+        tracker = CorrelationTracker(decay=0.9)
+        for end in range(1, 61):
+            tracker.observe("A", candles_from(market[:end], end=SYNTHETIC_END + end * GRANULARITY))
+            tracker.observe("B", candles_from(follower[:end], end=SYNTHETIC_END + end * GRANULARITY))
+        tracker.complete()
+
+        covariance = tracker.covariance
+        assert covariance[0, 0] == pytest.approx(reference(market, market, 0.9))
+        assert covariance[0, 1] == pytest.approx(reference(market, follower, 0.9))
+        assert covariance[1, 1] == pytest.approx(reference(follower, follower, 0.9))
+
+    def test_new_products_start_from_history(self):
+        """A product's first window gives the covariances the live updates would have"""
+        market, follower, _ = walks(60)
+        tracker = CorrelationTracker(decay=0.9)
+        tracker.observe("A", candles_from(market))
+        tracker.observe("B", candles_from(follower))
+        tracker.complete()
+        assert tracker.covariance[0, 1] == pytest.approx(reference(market, follower, 0.9))
+        assert tracker.counts[0, 1] == 60
+
+        # Candles already seen are not counted twice
+        tracker.observe("A", candles_from(market))
+        tracker.complete()
+        assert tracker.counts[0, 0] == 60
+
+    def test_correlated_products_share_a_cluster(self):
+        market, follower, unrelated = walks(120)
+        tracker = CorrelationTracker()
+        for product_id, returns in (("A", market), ("B", follower), ("C", unrelated)):
+            tracker.observe(product_id, candles_from(returns))
+        tracker.complete()
+
+        correlation = tracker.correlation()
+        assert correlation[0, 1] > 0.9
+        assert abs(correlation[0, 2]) < 0.5
+        assert tracker.cluster_of("A") == tracker.cluster_of("B") == "A"
+        assert tracker.cluster_of("C") == "C"
+
+    def test_too_few_observations_do_not_cluster(self):
+        market, follower, _ = walks(10)
+        tracker = CorrelationTracker(min_observations=20)
+        tracker.observe("A", candles_from(market))
+        tracker.observe("B", candles_from(follower))
+        tracker.complete()
+        assert tracker.cluster_of("B") == "B"
+
+    def test_staggered_reports_update_every_pair_once(self):
+        """A period waits for every product, returns for a period already applied are dropped"""
+        market, follower, _ = walks(30)
+        tracker = CorrelationTracker()
+        tracker.observe("A", candles_from(market))
+        tracker.observe("B", candles_from(follower))
+        counts = tracker.counts.copy()
+        tracker.observe("A", candles_from(market + [0.01], end=SYNTHETIC_END + GRANULARITY))
+        tracker.observe("A", candles_from(market + [0.01, 0.01], end=SYNTHETIC_END + 2 * GRANULARITY))
+        assert (tracker.counts == counts).all()
+
+        tracker.observe("B", candles_from(follower + [0.01], end=SYNTHETIC_END + GRANULARITY))
+        assert (tracker.counts[:2, :2] == counts[:2, :2] + 1).all()
+        tracker.complete()
+        assert tracker.counts[0, 0] == counts[0, 0] + 2
+        assert tracker.counts[0, 1] == tracker.counts[1, 1] == counts[0, 1] + 1
+
+        # B's return for the period applied without it is dropped
+        tracker.observe("B", candles_from(follower + [0.01, 0.01], end=SYNTHETIC_END + 2 * GRANULARITY))
+        tracker.complete()
+        assert tracker.counts[1, 1] == counts[1, 1] + 1
+
+    def test_staggered_observers_match_reference(self):
+        """Products reporting in any order, some periods late, give the joint EWMA covariances"""
+        rng = random.Random(1)
+        market, follower, unrelated = walks(80, seed=1)
+        series = {"A": market, "B": follower, "C": unrelated, "D": [-value for value in market]}
+        seen = dict.fromkeys(series, 40)
+        tracker = CorrelationTracker(decay=0.9, max_pending=len(market))
+        for product_id, returns in series.items():
+            tracker.observe(product_id, candles_from(returns[:40], end=SYNTHETIC_END + 40 * GRANULARITY))
+        while min(seen.values()) < 80:
+            product_id = rng.choice([product_id for product_id, end in seen.items() if end < 80])
+            seen[product_id] = min(80, seen[product_id] + rng.randint(1, 3))
+            end = seen[product_id]
+            tracker.observe(product_id, candles_from(series[product_id][:end], end=SYNTHETIC_END + end * GRANULARITY))
+
+            correlation = tracker.correlation()
+            assert (abs(correlation) <= 1 + 1e-9).all()
+
+        assert (tracker.counts[:4, :4] == 80).all()
+        for i, a in enumerate(series.values()):
+            for j, b in enumerate(series.values()):
+                assert tracker.covariance[i, j] == pytest.approx(reference(a, b, 0.9))
+        assert tracker.correlation()[0, 3] == pytest.approx(-1)
+
+    def test_silent_products_do_not_hold_periods(self):
+        """Periods are applied without a product once max_pending later ones wait for it"""
+        market, follower, _ = walks(30)
+        tracker = CorrelationTracker(max_pending=2)
+        tracker.observe("A", candles_from(market))
+        tracker.observe("B", candles_from(follower))
+        counts = tracker.counts.copy()
+        for end in range(1, 5):
+            returns = market + [0.01] * end
+            tracker.observe("A", candles_from(returns, end=SYNTHETIC_END + end * GRANULARITY))
+        assert tracker.counts[0, 0] == counts[0, 0] + 2
+        assert tracker.counts[0, 1] == counts[0, 1] and tracker.counts[1, 1] == counts[1, 1]
+        assert (abs(tracker.correlation()) <= 1 + 1e-9).all()
+
+    def test_cluster_exposure_follows_exposures(self):
+        market, follower, unrelated = walks(120)
+        tracker = CorrelationTracker()
+        tracker.set_exposure("A", Decimal("100"))
+        for product_id, returns in (("A", market), ("B", follower), ("C", unrelated)):
+            tracker.observe(product_id, candles_from(returns))
+        tracker.complete()
+
+        tracker.set_exposure("B", Decimal("50"))
+        tracker.set_exposure("C", Decimal("70"))
+        assert tracker.cluster_exposure("A") == tracker.cluster_exposure("B") == Decimal("150")
+        tracker.set_exposure("A", Decimal("20"))
+        assert tracker.cluster_exposure("B") == Decimal("70")
+        assert tracker.cluster_exposure("C") == Decimal("70")
+        assert tracker.cluster_exposure("D") == Decimal(0)
+
+    def test_exposures_are_per_portfolio(self):
+        """Portfolios share the clusters but not their totals"""
+        market, follower, _ = walks(120)
+        tracker = CorrelationTracker()
+        tracker.observe("A", candles_from(market))
+        tracker.observe("B", candles_from(follower))
+        tracker.complete()
+
+        tracker.set_exposure("A", Decimal("100"), "first")
+        tracker.set_exposure("B", Decimal("50"), "second")
+        assert tracker.cluster_exposure("B", "first") == Decimal("100")
+        assert tracker.cluster_exposure("A", "second") == Decimal("50")
+        assert tracker.cluster_exposure("A") == Decimal(0)
+
+    def test_candles_without_start_are_ignored(self):
+        tracker = CorrelationTracker()
+        tracker.observe("A", [{"close": "1"}, {"close": "2"}])
+        tracker.observe("A", [])
+        assert tracker.products == [] and tracker.last_close == {}
+
+
+class TestStrategyPortfolioExposure:
+
+    candles = candles_from(walks(30)[0])
+
+    def run_stage(self, strategy, side):
+        state = {"historical_data": self.candles, "side": side, "risk_flags": []}
+        strategy._stage_portfolio_exposure(state)
+        return state["risk_flags"]
+
+    def test_disabled_without_limit(self, strategy):
+        with patch.object(portfolio_analytics, "_trackers", {}):
+            assert self.run_stage(strategy, "BUY") == []
+            assert portfolio_analytics._trackers == {}
+
+    def test_buy_over_limit_is_flagged(self, strategy):
+        """The cluster exposure plus a buy above MAX_CLUSTER_EXPOSURE flags the run"""
+        with patch.object(portfolio_analytics, "_trackers", {}):
+            with patch.object(Env, "MAX_CLUSTER_EXPOSURE", "1"):
+                assert self.run_stage(strategy, "BUY") == ["strategy_PORTFOLIO_EXPOSURE_HIGH"]
+                assert self.run_stage(strategy, "SELL") == []
+            with patch.object(Env, "MAX_CLUSTER_EXPOSURE", "100000"):
+                assert self.run_stage(strategy, "BUY") == []
+
+            tracker = portfolio_analytics.tracker("COINBASE", "MEDIUM_TERM")
+            held = sum(position.filled_size for position in strategy.positions)
+            assert tracker.cluster_exposure("BTC-USD", "portfolio-uuid") == held * Decimal(self.candles[0]["close"])
+            # A single product reports every period there is
+            assert tracker.counts[0, 0] == 30
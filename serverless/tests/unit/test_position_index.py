@@ -0,0 +1,127 @@
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+
+from models.api import Position
+from tests.golden.candles import synthetic_candles, synthetic_positions
+from utils.position_index import PositionIndex, PositionIndexStore, entry_price, profit
+
+
+POSITIONS = [Position(**position) for position in synthetic_positions(500, spread=0.2)]
+PRICE = Decimal("100000")
+
+
+def scan(positions, price, keep):
+    """ The reference: every position's profit computed one by one """
+    return [
+        position for position in positions
+        if keep(profit(price, position.filled_size, position.average_filled_price)[3])
+    ]
+
+
+def indexed(positions):
+    index = PositionIndex()
+    index.sync(positions)
+    return index
+
+
+@pytest.fixture
+def strategy_positions():
+    return synthetic_positions(300, spread=0.1)
+
+
+@pytest.fixture(params=["5.0", "1.5"])
+def profit_target(request):
+    return request.param
+
+
+class TestPositionIndex:
+
+    @pytest.mark.parametrize("price", [
+        PRICE,
+        Decimal("85000.37"),
+        # Prices at which a position sits exactly on a band edge
+        POSITIONS[7].average_filled_price * Decimal("1.04"),
+        POSITIONS[11].average_filled_price * Decimal("1.05"),
+    ])
+    def test_queries_match_scan(self, price):
+        """Band, sellable and size queries equal a scan of every position"""
+        index = indexed(POSITIONS)
+        low, high = Decimal("4.0"), Decimal("5.0")
+        assert index.in_band(price, low, high) == scan(POSITIONS, price, lambda pct: low <= pct <= high)
+        sellable = scan(POSITIONS, price, lambda pct: pct > high)
+        assert index.above(price, high) == sellable
+        assert index.size_above(price, high) == sum((p.filled_size for p in sellable), Decimal(0))
+
+    def test_incremental_changes_match_rebuild(self):
+        """Adding, removing and updating positions equals indexing the final book"""
+        index = indexed(POSITIONS[:300])
+        for position in POSITIONS[300:]:
+            index.add(position)
+        for position in POSITIONS[:100]:
+            index.remove(position.position_id)
+        moved = POSITIONS[200].model_copy(update={"average_filled_price": Decimal("90000")})
+        index.add(moved)
+
+        book = [moved if p.position_id == moved.position_id else p for p in POSITIONS[100:]]
+        book.sort(key=lambda p: p.position_id == moved.position_id)
+        assert len(index) == len(book)
+        assert index.above(PRICE, Decimal("5.0")) == scan(book, PRICE, lambda pct: pct > Decimal("5.0"))
+        assert index.size_above(PRICE, Decimal("-99")) == indexed(book).size_above(PRICE, Decimal("-99"))
+
+    def test_expired_positions_are_evicted(self):
+        """Positions leave the index once their ttl has passed"""
+        index = PositionIndex()
+        for ttl, position in zip((0, 100, 200), POSITIONS[:3]):
+            index.add(position.model_copy(update={"ttl": ttl}))
+        assert index.evict(150) == [POSITIONS[1].position_id]
+        assert POSITIONS[0].position_id in index and POSITIONS[2].position_id in index
+        assert index.evict(200) == [POSITIONS[2].position_id]
+        assert len(index) == 1
+
+    def test_store_syncs_books(self):
+        """A stored index follows the positions of each message"""
+        store = PositionIndexStore(maxsize=1)
+        index = store.index(("COINBASE", "BTC-USD", "MEDIUM_TERM"), POSITIONS[:10])
+        assert store.index(("COINBASE", "BTC-USD", "MEDIUM_TERM"), POSITIONS[5:20]) is index
+        assert len(index) == 15 and POSITIONS[0].position_id not in index
+        store.index(("COINBASE", "ETH-USD", "MEDIUM_TERM"), POSITIONS[:1])
+        assert store.index(("COINBASE", "BTC-USD", "MEDIUM_TERM"), []) is not index
+
+    def test_store_drops_expired_books(self):
+        """Books whose positions all expired leave the store on the next lookup"""
+        now = [0]
+        store = PositionIndexStore(clock=lambda: now[0])
+        expiring = [position.model_copy(update={"ttl": 100}) for position in POSITIONS[:5]]
+        store.index(("COINBASE", "ETH-USD", "MEDIUM_TERM"), expiring)
+        store.index(("COINBASE", "BTC-USD", "MEDIUM_TERM"), POSITIONS[:5])
+        assert len(store) == 2
+
+        now[0] = 100
+        store.index(("COINBASE", "BTC-USD", "MEDIUM_TERM"), POSITIONS[:5])
+        assert len(store) == 1
+
+    def test_entry_price_inverts_profit(self):
+        """entry_price gives the entry at which profit is the requested percentage"""
+        entry = entry_price(PRICE, Decimal("5.0"))
+        assert profit(PRICE, Decimal("1"), entry)[3] == pytest.approx(Decimal("5.0"))
+
+
+class TestStrategyPositionIndex:
+
+    def test_indexed_review_matches_scan(self, strategy):
+        """Large books give the same positions and notifications through the index, any profit target"""
+        candles = synthetic_candles(60, seed=3, base_price=100000)
+        with patch("functions.strategies.notify_assistant") as notify:
+            with patch("functions.strategies.POSITION_INDEX_MIN_POSITIONS", 10 ** 6):
+                expected = strategy.review_positions(candles)
+            expected_notifications = notify.call_args_list
+            notify.reset_mock()
+            with patch("functions.strategies.POSITION_INDEX_MIN_POSITIONS", 1):
+                positions = strategy.review_positions(candles)
+
+        assert expected
+        assert bool(notify.call_args_list) == (strategy.profit_target > Decimal("4.0"))
+        assert positions == expected
+        assert notify.call_args_list == expected_notifications
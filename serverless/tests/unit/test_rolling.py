@@ -0,0 +1,94 @@
+import random
+import statistics
+
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from utils import rolling
+from utils.rolling import RollingMaxMinPct, RollingMeanVariance, RollingMinMax, RollingPercentile
+
+
+WINDOW = 7
+
+
+@pytest.fixture
+def values():
+    rng = random.Random(5)
+    return [round(100 + rng.gauss(0, 5), 2) for _ in range(200)]
+
+
+def windows(values):
+    return [values[i - WINDOW + 1:i + 1] for i in range(WINDOW - 1, len(values))]
+
+
+class TestStreaming:
+
+    def test_min_max(self, values):
+        """Monotonic deques give the exact window extremes"""
+        expected = [(min(w), max(w)) for w in windows(values)]
+        stat = RollingMinMax(WINDOW)
+        results = []
+        for i, value in enumerate(values):
+            stat.push(value)
+            if i >= WINDOW - 1:
+                results.append((stat.min, stat.max))
+        assert results == expected
+
+    def test_max_min_pct_with_decimals(self):
+        """Decimals stay exact"""
+        stat = RollingMaxMinPct(3)
+        for value in ("100", "104", "102", "101"):
+            stat.push(Decimal(value))
+        assert stat.pct == (Decimal("104") - Decimal("101")) / Decimal("101") * 100
+
+    def test_mean_variance(self, values):
+        """Welford updates match the window mean and sample variance"""
+        stat = RollingMeanVariance(WINDOW)
+        results = []
+        for i, value in enumerate(values):
+            stat.push(value)
+            if i >= WINDOW - 1:
+                results.append((stat.mean, stat.variance))
+        for (mean, variance), window in zip(results, windows(values)):
+            assert mean == pytest.approx(statistics.mean(window))
+            assert variance == pytest.approx(statistics.variance(window))
+
+    @pytest.mark.parametrize("q", [0, 25, 50, 90, 100])
+    def test_percentile(self, values, q):
+        """Percentiles interpolate like numpy"""
+        stat = RollingPercentile(WINDOW, q)
+        results = []
+        for i, value in enumerate(values):
+            stat.push(value)
+            if i >= WINDOW - 1:
+                results.append(stat.value)
+        assert results == pytest.approx([np.percentile(w, q) for w in windows(values)])
+
+    def test_invalid_windows_raise(self):
+        """Empty windows and percentiles outside 0-100 are rejected"""
+        with pytest.raises(ValueError):
+            RollingMinMax(0)
+        with pytest.raises(ValueError):
+            RollingPercentile(5, 101)
+
+
+class TestVectorized:
+
+    def test_transforms_match_streaming(self, values):
+        """Whole-series transforms equal the streaming statistics"""
+        expected = windows(values)
+        assert list(rolling.rolling_min(values, WINDOW)) == [min(w) for w in expected]
+        assert list(rolling.rolling_max(values, WINDOW)) == [max(w) for w in expected]
+        assert rolling.rolling_mean(values, WINDOW) == pytest.approx([statistics.mean(w) for w in expected])
+        assert rolling.rolling_variance(values, WINDOW) == pytest.approx([statistics.variance(w) for w in expected])
+        assert rolling.rolling_percentile(values, WINDOW, 50) == pytest.approx([statistics.median(w) for w in expected])
+        assert rolling.rolling_max_min_pct(values, WINDOW) == pytest.approx(
+            [(max(w) - min(w)) / min(w) * 100 for w in expected]
+        )
+
+    def test_short_series_give_no_windows(self):
+        """Series shorter than the window have no full window"""
+        assert len(rolling.rolling_mean([1.0, 2.0], WINDOW)) == 0
+        assert len(rolling.rolling_min([1.0, 2.0], WINDOW)) == 0
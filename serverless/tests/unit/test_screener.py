@@ -0,0 +1,66 @@
+
+import numpy as np
+import pytest
+
+from tests.golden.candles import synthetic_candles
+from utils.features import FeatureSet, candle_features
+from utils.screener import UniverseScreener
+
+
+WINDOW = 120
+PRODUCTS = [f"P{i:03d}-USD" for i in range(40)]
+WINDOWS = {
+    product_id: synthetic_candles(
+        WINDOW, seed=i, drift=(i % 5 - 2) * 0.0008, volatility=0.002 + (i % 3) * 0.002, granularity=3600
+    )
+    for i, product_id in enumerate(PRODUCTS)
+}
+
+
+def universe():
+    screener = UniverseScreener(PRODUCTS, WINDOW)
+    for product_id, candles in WINDOWS.items():
+        screener.load(product_id, candles)
+    return screener
+
+
+class TestUniverseScreener:
+
+    def test_screen_matches_single_product_features(self):
+        """Every row equals the features a run derives from the product's window"""
+        result = universe().screen(restricted=(-10.0, -5.0))
+        for row, product_id in enumerate(PRODUCTS):
+            features = FeatureSet(candle_features, WINDOWS[product_id], tolerance=0.05)
+            diff_pct = float(features["diff_pct"])
+            assert result["diff_pct"][row] == pytest.approx(diff_pct)
+            assert result["restricted"][row] == (-10.0 <= diff_pct <= -5.0)
+            support = features["levels"]["support"]
+            if support is None:
+                assert np.isnan(result["support"][row])
+            else:
+                assert result["support"][row] == pytest.approx(float(support))
+
+    def test_push_advances_every_window(self):
+        """Appending a candle per product equals loading the shifted windows"""
+        series = {product_id: synthetic_candles(WINDOW + 3, seed=i) for i, product_id in enumerate(PRODUCTS[:5])}
+        pushed = UniverseScreener(list(series), WINDOW)
+        for product_id, candles in series.items():
+            pushed.load(product_id, candles[3:])
+        for offset in (2, 1, 0):
+            pushed.push(
+                [float(candles[offset]["close"]) for candles in series.values()],
+                [float(candles[offset]["low"]) for candles in series.values()],
+            )
+
+        loaded = UniverseScreener(list(series), WINDOW)
+        for product_id, candles in series.items():
+            loaded.load(product_id, candles[:WINDOW])
+        for pushed_values, loaded_values in zip(pushed.ordered(), loaded.ordered()):
+            assert np.array_equal(pushed_values, loaded_values)
+
+    def test_incomplete_windows_are_not_screened(self):
+        """Products without a full window are marked incomplete"""
+        screener = UniverseScreener(PRODUCTS[:2], WINDOW)
+        screener.load(PRODUCTS[0], WINDOWS[PRODUCTS[0]][:10])
+        assert screener.screen()["complete"].tolist() == [False, False]
+
@@ -0,0 +1,87 @@
+import dataclasses
+import datetime
+import json
+import math
+from decimal import Decimal
+
+import pytest
+
+from models.api import Position
+from utils import serialization
+from utils.common import ULID, DecimalEncoder
+
+
+orjson_only = pytest.mark.skipif(serialization.orjson is None, reason="orjson is not installed")
+
+
+@pytest.fixture
+def body(positions):
+    return {
+        "correlation_id": ULID(),
+        "config": {"profit_target": Decimal("1.50"), "toggle": True, "alias_to": []},
+        "positions": [Position(**position) for position in positions],
+        "historical_data": [{"start": "1749700800", "close": "80000.01"}],
+        "support_resistance_tolerance": 0.05,
+        "product": {"display_name": "Bitcoin ₿"},
+    }
+
+
+class TestSerialization:
+
+    def test_encodes_decimal_ulid_and_models(self, body):
+        """Decimals and ULIDs keep their string form, models dump in JSON mode"""
+        decoded = json.loads(serialization._stdlib_dumps(body))
+
+        assert decoded["correlation_id"] == str(body["correlation_id"])
+        assert decoded["config"]["profit_target"] == "1.50"
+        assert decoded["positions"][0] == body["positions"][0].model_dump(mode="json")
+
+    def test_matches_decimal_encoder_content(self, body):
+        """Decoded output equals what the previous DecimalEncoder produced"""
+        body["positions"] = [position.model_dump() for position in body["positions"]]
+        body["correlation_id"] = str(body["correlation_id"])
+
+        expected = json.loads(json.dumps(body, cls=DecimalEncoder))
+        assert json.loads(serialization.dumps(body)) == expected
+
+    @orjson_only
+    def test_backends_write_identical_output(self, body):
+        """orjson and the stdlib fallback produce the same string"""
+        assert serialization._orjson_dumps(body) == serialization._stdlib_dumps(body)
+
+    @orjson_only
+    def test_orjson_falls_back_for_unsupported_values(self):
+        """Values orjson rejects go through the stdlib path"""
+        assert serialization._orjson_dumps({"big": 2 ** 70}) == '{"big":1180591620717411303424}'
+        assert math.isnan(serialization._orjson_loads('{"value": NaN}')["value"])
+
+    @orjson_only
+    @pytest.mark.parametrize("value", [1e16, 1e-7, -2.5e-10, 0.1, 1e300])
+    def test_backends_agree_on_floats(self, value):
+        """Exponents are written differently but decode to the same value"""
+        body = {"value": value, "values": [value, None]}
+        assert json.loads(serialization._orjson_dumps(body)) == json.loads(serialization._stdlib_dumps(body))
+
+    @pytest.mark.parametrize("backend", ["_stdlib_dumps", pytest.param("_orjson_dumps", marks=orjson_only)])
+    @pytest.mark.parametrize("value", [math.nan, math.inf, -math.inf])
+    def test_non_finite_floats_raise(self, backend, value):
+        """NaN and Infinity are rejected rather than written as NaN or null"""
+        dumps = getattr(serialization, backend)
+        for body in (value, {"value": value}, {"nested": [{"value": None}, [1, value]]}):
+            with pytest.raises(ValueError):
+                dumps(body)
+        assert dumps({"value": None}) == '{"value":null}'
+
+    @pytest.mark.parametrize("backend", ["_stdlib_dumps", pytest.param("_orjson_dumps", marks=orjson_only)])
+    def test_datetimes_and_dataclasses_raise(self, backend):
+        """Types orjson knows natively are rejected like the stdlib does"""
+        dumps = getattr(serialization, backend)
+        Point = dataclasses.make_dataclass("Point", ["x"])
+        for value in (datetime.datetime(2025, 6, 1), datetime.date(2025, 6, 1), Point(1)):
+            with pytest.raises(TypeError):
+                dumps({"value": value})
+
+    def test_unsupported_type_raises(self):
+        """Unknown types are still rejected"""
+        with pytest.raises(TypeError):
+            serialization.dumps({"value": object()})
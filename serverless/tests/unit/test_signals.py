@@ -0,0 +1,55 @@
+import pytest
+
+from models.signals import SignalReason, SignalSide
+from tests.golden import reference
+from tests.golden.candles import synthetic_candles
+from utils.indicators import sma_cross_records
+from utils.signals import SignalDecodeException, columns, decode, parse_legacy, records
+
+
+class TestSignals:
+
+    @pytest.mark.parametrize("text,expected", [
+        ("SMA Signal: Buy at price: 100", {"indicator": "SMA", "side": "BUY", "reason": "CROSS", "price": 100.0}),
+        ("Sell at price: 101.5 size: 0.001 entry: 99", {"side": "SELL", "price": 101.5, "size": 0.001, "entry": 99.0}),
+        ("Stop-loss sell at price: 95 size: 0.001 entry: 100", {"side": "SELL", "reason": "STOP_LOSS", "entry": 100.0}),
+        ("Take-profit sell at price: 111 size: 0.001 entry: 100", {"side": "SELL", "reason": "TAKE_PROFIT"}),
+        ("MACD Signal: Sell at price: 7", {"indicator": "MACD", "side": "SELL"}),
+    ])
+    def test_legacy_strings_are_parsed(self, text, expected):
+        """Every string the indicators service used to format is understood"""
+        record = parse_legacy(text)
+        assert {field: record[field] for field in expected} == expected
+
+    @pytest.mark.parametrize("text", ["SMA Signal: Hold", "Buy at price: abc", ""])
+    def test_unrecognised_strings_raise(self, text):
+        """Strings outside the legacy format are rejected"""
+        with pytest.raises(SignalDecodeException):
+            parse_legacy(text)
+
+    def test_typed_and_legacy_signals_decode_alike(self):
+        """The typed schema and the legacy strings give the same models"""
+        candles = synthetic_candles(120, seed=4)
+        typed = sma_cross_records(candles, 14, 50)
+        legacy = reference.sma_cross_signals(candles, 14, 50)
+
+        decoded = decode(typed)
+        assert decoded[0].side in (SignalSide.buy, SignalSide.sell)
+        assert decoded[0].reason == SignalReason.cross
+        assert [signal.model_dump(exclude={"index"}) for signal in decoded] == \
+            [signal.model_dump(exclude={"index"}) for signal in decode(legacy)]
+
+    def test_invalid_typed_signal_raises(self):
+        """Typed signals are validated against the schema"""
+        with pytest.raises(SignalDecodeException):
+            decode([{"indicator": "SMA", "side": "HOLD", "price": 1}])
+
+    def test_columns(self):
+        """Columnar output has one list per schema field"""
+        signals = ["SMA Signal: Buy at price: 100", {"indicator": "SMA", "side": "SELL", "price": 101, "index": 3}]
+        result = columns(signals)
+        assert result["side"] == ["BUY", "SELL"]
+        assert result["price"] == [100.0, 101]
+        assert result["reason"] == ["CROSS", "CROSS"]
+        assert result["index"] == [None, 3]
+        assert records(None) == []
@@ -789,6 +789,65 @@ class TestMomentumStrategy:
         assert side == "SELL"
         assert "HIGH" in risk_flags[-1]
 
+    @patch('functions.strategies.ProviderClient')
+    @patch('functions.strategies.LambdaClient')
+    def test_run_rejected_sell_skips_ta_indicators(self, mock_lambda_client, mock_provider_client, config, portfolio):
+        """A requested sell without positions is rejected before the TA call"""
+        config_copy = config.copy()
+        config_copy.pop('product_id', None)
+
+        strategy = MomentumStrategy(
+            provider="COINBASE",
+            product_id="BTC-USD",
+            portfolio=portfolio,
+            positions=[],
+            correlation_id="test-correlation-id",
+            strategy_term="MEDIUM_TERM",
+            **config_copy
+        )
+
+        mock_client = Mock()
+        mock_client.get_candles.return_value = {"candles": [
+            {"close": "80000", "high": "80100", "low": "79900", "open": "79950"},
+            {"open": "80050", "close": "79950", "high": "80100", "low": "79900"}
+        ] * 7}
+        mock_provider_client.return_value = mock_client
+
+        with pytest.raises(RequestedSellNoPositions):
+            strategy.run("SELL")
+
+        mock_lambda_client.assert_not_called()
+
+    @patch('functions.strategies.ProviderClient')
+    @patch('functions.strategies.LambdaClient')
+    def test_run_rejected_buy_skips_ta_indicators(self, mock_lambda_client, mock_provider_client, config, portfolio):
+        """A buy failing the price diff check is rejected before the TA call"""
+        config_copy = config.copy()
+        config_copy.pop('product_id', None)
+
+        strategy = MomentumStrategy(
+            provider="COINBASE",
+            product_id="BTC-USD",
+            portfolio=portfolio,
+            positions=[],
+            correlation_id="test-correlation-id",
+            strategy_term="MEDIUM_TERM",
+            **config_copy
+        )
+
+        # -7% over the window, inside the restricted MEDIUM_TERM range
+        mock_client = Mock()
+        mock_client.get_candles.return_value = {"candles": [
+            {"close": "93000", "high": "93100", "low": "92900", "open": "92950"},
+            {"close": "100000", "high": "100100", "low": "99900", "open": "99950"},
+        ]}
+        mock_provider_client.return_value = mock_client
+
+        with pytest.raises(Exception, match="ORDER_SIDE_GENERAL_EXCEPTION"):
+            strategy.run("BUY")
+
+        mock_lambda_client.assert_not_called()
+
 class TestStrategyHandler:
     
     def test_create_medium_term_strategy(self, config, positions, portfolio):
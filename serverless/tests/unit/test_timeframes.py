@@ -0,0 +1,93 @@
+from unittest.mock import patch
+
+import pytest
+
+from functions.strategies import MomentumStrategy
+from tests.golden.candles import engulfing_candles, synthetic_candles
+from utils import exceptions
+from utils.common import Env
+from utils.features import FeatureSet, candle_features
+from utils.timeframes import resample, timeframe_table
+
+
+SERIES = synthetic_candles(1440, seed=3)
+
+
+def grouped(candles, period):
+    """ Bars of one period built candle by candle, newest first """
+    bars = {}
+    for candle in reversed(candles):
+        start = int(candle["start"]) // period * period
+        bar = bars.get(start)
+        if bar is None:
+            bars[start] = bar = {"open": float(candle["open"]), "high": [], "low": [], "volume": 0.0}
+        bar["high"].append(float(candle["high"]))
+        bar["low"].append(float(candle["low"]))
+        bar["volume"] += float(candle["volume"])
+        bar["close"] = float(candle["close"])
+    return [
+        (start, bar["open"], max(bar["high"]), min(bar["low"]), bar["close"], bar["volume"])
+        for start, bar in sorted(bars.items(), reverse=True)
+    ]
+
+
+@pytest.fixture
+def strategy_term():
+    return "SHORT_TERM"
+
+
+class TestTimeframes:
+
+    @pytest.mark.parametrize("period", [300, 3600, 86400])
+    def test_resample_matches_grouping(self, period):
+        """Bars hold the first open, last close, extremes and total volume of their candles"""
+        bars = resample(SERIES, period)
+        expected = grouped(SERIES, period)
+        assert len(bars) == len(expected)
+        for bar, values in zip(bars, expected):
+            fields = ("start", "open", "high", "low", "close", "volume")
+            assert [float(bar[field]) for field in fields] == pytest.approx(values)
+
+    def test_table_matches_features_of_resampled_series(self):
+        """Every row equals the single-timeframe features of that timeframe's bars"""
+        table = timeframe_table(SERIES, window=12, candle_stick_scope=12, n1=5, n2=20)
+        assert list(table) == ["5m", "15m", "1h", "4h", "1d"]
+        for row in table.values():
+            bars = resample(SERIES, row["period"])
+            assert row["bars"] == len(bars)
+            assert row["start"] == int(bars[0]["start"])
+            assert row["close"] == float(SERIES[0]["close"])
+
+            features = FeatureSet(candle_features, bars[:12], candle_stick_scope=12, tolerance=0.05)
+            levels = features["levels"]
+            for side in ("support", "resistance"):
+                expected = levels[side]
+                assert row[side] == (None if expected is None else pytest.approx(float(expected)))
+            assert row["bullish_engulfing"] == features["bullish_engulfing"]
+            assert row["bearish_engulfing"] == features["bearish_engulfing"]
+
+            averages = FeatureSet(candle_features, bars, n1=5, n2=20)
+            for column in ("sma_fast", "sma_slow"):
+                expected = averages[column]
+                assert row[column] == (None if expected is None else pytest.approx(float(expected)))
+
+    def test_finer_timeframes_are_left_out(self):
+        """A series cannot be resampled below its own granularity"""
+        table = timeframe_table(synthetic_candles(200, seed=5, granularity=3600))
+        assert list(table) == ["1h", "4h", "1d"]
+        assert timeframe_table(SERIES[:1]) == {}
+
+
+class TestStrategyTimeframes:
+
+    def test_higher_timeframe_trend_rejects_side(self, strategy):
+        """With CONFIRM_TIMEFRAMES set, an opposing higher timeframe trend rejects a confirmed side"""
+        candles = engulfing_candles(bullish=True)
+        table = {"1h": {"trend": "DOWN"}, "4h": {"trend": None}}
+        with patch.object(MomentumStrategy, "timeframes", return_value=table):
+            assert strategy.confirm_side_with_trend(candles, "BUY")
+            with patch.object(Env, "CONFIRM_TIMEFRAMES", "1h,4h"):
+                with pytest.raises(exceptions.InvalidSideException):
+                    strategy.confirm_side_with_trend(candles, "BUY")
+            with patch.object(Env, "CONFIRM_TIMEFRAMES", "4h"):
+                assert strategy.confirm_side_with_trend(candles, "BUY")
@@ -0,0 +1,99 @@
+import random
+
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+
+from models.api import Position
+from tests.golden.candles import synthetic_candles, synthetic_positions
+from utils.common import Env
+from utils.trigger_book import NOTIFY, SELL, TriggerBook, band
+
+
+POSITIONS = [Position(**position) for position in synthetic_positions(400, spread=0.1)]
+TARGET = Decimal("5.0")
+MIN_PCT = Decimal("4.0")
+
+
+def prices(count, seed=0):
+    """ A random walk of prices around the positions' entries """
+    rng = random.Random(seed)
+    price = 100000.0
+    walk = []
+    for _ in range(count):
+        price *= 1 + rng.gauss(0, 0.01)
+        walk.append(Decimal(f"{price:.2f}"))
+    return walk
+
+
+def bands(positions, price):
+    return {position.position_id: band(price, position, MIN_PCT, TARGET) for position in positions}
+
+
+@pytest.fixture
+def strategy_positions():
+    return synthetic_positions(200, spread=0.1)
+
+
+@pytest.fixture
+def profit_target():
+    return "5.0"
+
+
+class TestTriggerBook:
+
+    def test_crossings_match_band_changes(self):
+        """Each update emits exactly the positions whose band changed into notify or sell"""
+        book = TriggerBook(TARGET, MIN_PCT)
+        book.sync(POSITIONS)
+        previous = {}
+        for price in prices(200):
+            crossings = book.update(price)
+            current = bands(POSITIONS, price)
+            changed = [p for p in POSITIONS if current[p.position_id] != previous.get(p.position_id)]
+            assert crossings.notify == [p for p in changed if current[p.position_id] == NOTIFY]
+            assert crossings.sell == [p for p in changed if current[p.position_id] == SELL]
+            assert book.sellable() == [p for p in POSITIONS if current[p.position_id] == SELL]
+            previous = current
+
+    def test_unchanged_price_emits_nothing(self):
+        """A repeated price crosses no threshold"""
+        book = TriggerBook(TARGET, MIN_PCT)
+        book.sync(POSITIONS)
+        assert book.update(Decimal("100000"))
+        assert not book.update(Decimal("100000"))
+
+    def test_synced_positions_are_decided_on_next_update(self):
+        """New and changed positions are emitted on the next update if they are in a band"""
+        price = Decimal("100000")
+        book = TriggerBook(TARGET, MIN_PCT)
+        book.sync(POSITIONS[:200])
+        book.update(price)
+
+        moved = POSITIONS[0].model_copy(update={"average_filled_price": Decimal("90000")})
+        book.sync([moved, *POSITIONS[1:300]])
+        crossings = book.update(price)
+        current = bands([moved, *POSITIONS[200:300]], price)
+        assert {p.position_id for p in crossings.sell} == {i for i, b in current.items() if b == SELL}
+        assert {p.position_id for p in crossings.notify} == {i for i, b in current.items() if b == NOTIFY}
+
+
+class TestStrategyTriggerBook:
+
+    def test_triggered_review_notifies_once(self, strategy):
+        """Triggers return the positions of a scan, and notify each band entry once"""
+        candles = synthetic_candles(60, seed=3, base_price=100000)
+        with patch("functions.strategies.notify_assistant") as notify:
+            expected = strategy.review_positions(candles)
+            expected_notifications = notify.call_args_list
+            notify.reset_mock()
+            with patch.object(Env, "SELL_REVIEW_MODE", "triggers"):
+                assert strategy.review_positions(candles) == expected
+                notifications = notify.call_args_list
+                notify.reset_mock()
+                assert strategy.review_positions(candles) == expected
+
+        assert expected and expected_notifications
+        assert notifications == expected_notifications
+        notify.assert_not_called()
@@ -0,0 +1,106 @@
+from unittest.mock import patch
+
+import pytest
+
+from functions.strategies import MomentumStrategy
+from tests.golden.candles import synthetic_candles
+from utils.common import Env
+from utils.indicator_cache import DynamoDBResultBackend
+from utils.volume_profile import VolumeProfile, VolumeProfileStore, typical_price
+
+
+SERIES = synthetic_candles(400, seed=7)
+
+
+def windows(count=120):
+    """ Successive provider windows, one new candle each, oldest window first """
+    return [SERIES[i:i + count] for i in range(100, -1, -1)]
+
+
+def rebuilt(candles, window):
+    """ Profile built from scratch over the closed candles of one window """
+    profile = VolumeProfile(bin_size=100, window=window)
+    for candle in reversed(candles[1:window + 1]):
+        profile._add(int(candle["start"]), candle)
+    profile.open_candle = candles[0]
+    return profile
+
+
+@pytest.fixture
+def strategy_term():
+    return "SHORT_TERM"
+
+
+class TestVolumeProfile:
+
+    def test_incremental_updates_match_rebuild(self):
+        """Adding new candles and ageing old ones out equals a rebuilt profile"""
+        profile = VolumeProfile(bin_size=100, window=60)
+        for candles in windows():
+            profile.update(candles)
+
+        expected = rebuilt(windows()[-1], 60)
+        assert profile.volumes().keys() == expected.volumes().keys()
+        for index, volume in expected.volumes().items():
+            assert profile.volumes()[index] == pytest.approx(volume)
+        assert len(profile.candles) == 60
+
+    def test_repeated_window_adds_nothing(self):
+        """Candles already in the profile are not counted twice"""
+        profile = VolumeProfile(bin_size=100)
+        profile.update(SERIES[:120])
+        volumes = dict(profile.volumes())
+        profile.update(SERIES[:120])
+        assert profile.volumes() == volumes
+
+    def test_top_nodes_and_levels(self):
+        """Levels are the nearest high-volume nodes around the price"""
+        profile = VolumeProfile(bin_size=100)
+        profile.update(SERIES[:120])
+        nodes = profile.top_nodes(5)
+        volumes = sorted(profile.volumes().values(), reverse=True)
+        assert [volume for _, volume in nodes] == volumes[:5]
+
+        price = typical_price(SERIES[0])
+        levels = profile.levels(price, 5)
+        below = [node for node, _ in nodes if node <= price]
+        above = [node for node, _ in nodes if node > price]
+        assert levels["support"] == (pytest.approx(max(below)) if below else None)
+        assert levels["resistance"] == (pytest.approx(min(above)) if above else None)
+
+    def test_serialization_round_trip(self):
+        """A restored profile continues like the original"""
+        profile = VolumeProfile(bin_size=100, window=60)
+        profile.update(SERIES[10:130])
+        restored = VolumeProfile.from_dict(profile.to_dict())
+
+        profile.update(SERIES[:120])
+        restored.update(SERIES[:120])
+        assert restored.volumes() == pytest.approx(profile.volumes())
+
+    def test_store_shares_profiles_through_cache_table(self):
+        """A new container continues from the stored profile"""
+        backend = DynamoDBResultBackend(ttl=60, prefix="volume_profile_")
+        key = ("COINBASE", "BTC-USD", "SHORT_TERM")
+        first = VolumeProfileStore(backend).profile(key, SERIES[1:121])
+
+        other = VolumeProfileStore(backend).profile(key, SERIES[:120])
+        assert other.bin_size == first.bin_size
+        assert other.last_start == int(SERIES[1]["start"])
+        assert len(other.candles) == 120
+
+
+class TestStrategyVolumeProfile:
+
+    def test_confirm_uses_volume_profile_when_selected(self, strategy):
+        """SUPPORT_RESISTANCE_SOURCE selects the volume profile levels"""
+        candles = SERIES[:120]
+        store = VolumeProfileStore()
+        with patch.object(Env, "SUPPORT_RESISTANCE_SOURCE", "volume_profile"), \
+                patch("functions.strategies.volume_profiles", store), \
+                patch.object(MomentumStrategy, "validate_support_resistance") as clusters:
+            with pytest.raises(Exception):
+                strategy.confirm_side_with_trend(candles, "HOLD")
+
+        clusters.assert_not_called()
+        assert ("COINBASE", "BTC-USD", "SHORT_TERM") in store._profiles
@@ -1,12 +1,10 @@
-import requests
-
 from utils.common import Env
 from utils.logger import logger
+from utils.metrics import metrics
 
 from utils.exceptions import (
     GetProviderCandlesException,
 )
-from requests.exceptions import RequestException
 from utils.oauth import generate_oauth_token
 
 
@@ -33,6 +31,9 @@ class ProviderClient:
         }
 
     def get_candles(self, product_id: str, granularity: int, start: int, end: int):
+        import requests
+        from requests.exceptions import RequestException
+
         endpoint = f"api/v3/brokerage/products/{product_id}/candles"
         params = {
             "granularity": granularity,
@@ -40,6 +41,7 @@ class ProviderClient:
             "end": end,
         }
         try:
+            metrics.external_call("provider_requests")
             resp = requests.get(
                 f"{self.domain}/{endpoint}", headers=self.headers, params=params
             )
@@ -88,6 +90,9 @@ class AssistantClient:
         }
 
     def send_message(self, message: str, channel: str):
+        import requests
+        from requests.exceptions import RequestException
+
         endpoint = "/notifications"
         payload = {
             "message": message,
@@ -95,6 +100,7 @@ class AssistantClient:
         }
 
         try:
+            metrics.external_call("assistant_requests")
             resp = requests.post(
                 f"{self.domain}{endpoint}",
                 headers=self.headers,
@@ -107,14 +113,15 @@ class AssistantClient:
 
 
 def notify_assistant(correlation_id, message):
-    assistant_client = AssistantClient(correlation_id=correlation_id)
-
-    try:
-        assistant_client.send_message(message=message, channel="general")
-    except AssistantSendMessageException as e:
-        logger.error(
-            "SEND_ASSISTANT_MESSAGE_EXCEPTION",
-            message="Could not send message to assistant",
-            error=str(e),
-        )
-        raise e
\ No newline at end of file
+    with metrics.timer("notify_assistant"):
+        assistant_client = AssistantClient(correlation_id=correlation_id)
+
+        try:
+            assistant_client.send_message(message=message, channel="general")
+        except AssistantSendMessageException as e:
+            logger.error(
+                "SEND_ASSISTANT_MESSAGE_EXCEPTION",
+                message="Could not send message to assistant",
+                error=str(e),
+            )
+            raise e
\ No newline at end of file
@@ -0,0 +1,167 @@
+import base64
+import re
+import struct
+import zlib
+
+from itertools import accumulate
+
+from utils.common import Env
+
+
+CODEC = "candles"
+VERSION = 1
+
+FIELDS = ("start", "low", "high", "open", "close", "volume")
+PRICE_FIELDS = FIELDS[1:]
+
+# A column of comma joined decimal strings that format back to exactly the
+# same text: no leading zeros, exponents, signs on zero or spaces
+_DECIMAL = r"(?:-(?!0(?:\.0+)?(?:,|$)))?(?:0|[1-9]\d*)(?:\.\d+)?"
+DECIMAL_COLUMN = re.compile(rf"{_DECIMAL}(?:,{_DECIMAL})*")
+INTEGER_COLUMN = re.compile(r"(?:0|[1-9]\d*)(?:,(?:0|[1-9]\d*))*")
+
+# Narrowest little-endian signed type holding every delta of a column
+WIDTHS = (("b", 1 << 7), ("h", 1 << 15), ("i", 1 << 31), ("q", 1 << 63))
+
+
+class CandleCodecException(Exception):
+    pass
+
+
+def _pack_deltas(out, values):
+    """ First value as int64, then the deltas at the narrowest width """
+    deltas = [b - a for a, b in zip(values, values[1:])]
+    largest = max(max(deltas, default=0), -min(deltas, default=0) - 1)
+    for code, limit in WIDTHS:
+        if largest < limit:
+            break
+    else:
+        raise OverflowError
+    out += struct.pack("<qc", values[0], code.encode())
+    out += struct.pack(f"<{len(deltas)}{code}", *deltas)
+
+
+def _unpack_deltas(data, count, pos):
+    first, code = struct.unpack_from("<qc", data, pos)
+    pos += 9
+    fmt = f"<{count - 1}{code.decode()}"
+    deltas = struct.unpack_from(fmt, data, pos)
+    return list(accumulate(deltas, initial=first)), pos + struct.calcsize(fmt)
+
+
+def _pack_scales(out, scales):
+    """ Decimal places per value, a single byte when the column is uniform """
+    if min(scales) == max(scales):
+        out += bytes((0, scales[0]))
+    else:
+        out.append(1)
+        out += bytes(scales)
+
+
+def _unpack_scales(data, count, pos):
+    if data[pos] == 0:
+        return data[pos + 1], pos + 2
+    return list(data[pos + 1:pos + 1 + count]), pos + 1 + count
+
+
+def _format_column(mantissas, scales):
+    if isinstance(scales, int):
+        if scales == 0:
+            return [str(mantissa) for mantissa in mantissas]
+        if min(mantissas) >= 0:
+            unit = 10 ** scales
+            return [f"{mantissa // unit}.{mantissa % unit:0{scales}d}" for mantissa in mantissas]
+        scales = [scales] * len(mantissas)
+    return [_format_fixed_point(mantissa, scale) for mantissa, scale in zip(mantissas, scales)]
+
+
+def _format_fixed_point(mantissa, scale):
+    if not scale:
+        return str(mantissa)
+    sign = "-" if mantissa < 0 else ""
+    digits = str(abs(mantissa)).zfill(scale + 1)
+    return f"{sign}{digits[:-scale]}.{digits[-scale:]}"
+
+
+def _column(candles, field):
+    """ The field of every candle, None when the window does not fit the codec """
+    try:
+        values = [candle[field] for candle in candles]
+        joined = ",".join(values)
+    except (KeyError, TypeError):
+        return None
+    pattern = INTEGER_COLUMN if field == "start" else DECIMAL_COLUMN
+    return values if pattern.fullmatch(joined) else None
+
+
+def encode(candles, compress=True):
+    """
+    Encodes a candle window as a versioned compact payload:
+
+        {"codec": "candles", "v": 1, "n": <count>, "z": "zlib"|"none", "data": <base64>}
+
+    Start times and fixed-point prices are stored column by column as
+    deltas at the narrowest fixed width, with the decimal places of every
+    value so the original strings are restored exactly. Windows the codec cannot
+    represent (missing or extra fields, non-decimal values) are returned
+    unchanged as the JSON list.
+    """
+    if not candles or any(len(candle) != len(FIELDS) for candle in candles):
+        return candles
+    columns = [_column(candles, field) for field in FIELDS]
+    if any(column is None for column in columns):
+        return candles
+
+    out = bytearray()
+    try:
+        _pack_deltas(out, [int(start) for start in columns[0]])
+        for values in columns[1:]:
+            parts = [value.partition(".") for value in values]
+            _pack_scales(out, [len(fraction) for _, _, fraction in parts])
+            _pack_deltas(out, [int(whole + fraction) for whole, _, fraction in parts])
+    except (OverflowError, ValueError, struct.error):
+        return candles
+
+    data = zlib.compress(bytes(out)) if compress else bytes(out)
+    return {
+        "codec": CODEC,
+        "v": VERSION,
+        "n": len(candles),
+        "z": "zlib" if compress else "none",
+        "data": base64.b64encode(data).decode("ascii"),
+    }
+
+
+def is_encoded(payload):
+    return isinstance(payload, dict) and payload.get("codec") == CODEC
+
+
+def decode(payload):
+    """ Candle dicts from an encoded payload, JSON lists are returned as they are """
+    if not is_encoded(payload):
+        return payload
+    if payload.get("v") != VERSION:
+        raise CandleCodecException(f"Unsupported candle codec version: {payload.get('v')}")
+
+    data = base64.b64decode(payload["data"])
+    if payload.get("z") == "zlib":
+        data = zlib.decompress(data)
+    count = payload["n"]
+
+    starts, pos = _unpack_deltas(data, count, 0)
+    columns = [[str(start) for start in starts]]
+    for _ in PRICE_FIELDS:
+        scales, pos = _unpack_scales(data, count, pos)
+        mantissas, pos = _unpack_deltas(data, count, pos)
+        columns.append(_format_column(mantissas, scales))
+    if pos != len(data):
+        raise CandleCodecException("Trailing bytes in candle payload")
+
+    return [dict(zip(FIELDS, values)) for values in zip(*columns)]
+
+
+def pack(candles):
+    """ Candles in the wire format selected by CANDLE_CODEC ("json" or "compact") """
+    if Env.CANDLE_CODEC == "compact":
+        return encode(candles)
+    return candles
@@ -0,0 +1,188 @@
+import os
+import time
+
+from utils.candle_codec import pack
+from utils.common import Env
+from utils.logger import logger
+from utils.metrics import metrics
+
+
+# Most candles sent in one data collection message
+MAX_BATCH_SIZE = int(os.environ.get("DATA_COLLECTION_MAX_BATCH", 300))
+# New closed candles to accumulate before publishing. Unpublished candles stay
+# in the next fetched window, so waiting only delays them.
+MIN_BATCH_SIZE = int(os.environ.get("DATA_COLLECTION_MIN_BATCH", 5))
+
+WATERMARK_TTL = 3600 * 24
+
+
+def watermark_key(provider, product_id, granularity):
+    return f"candle_watermark_{provider}_{product_id}_{granularity}"
+
+
+class CandlePublisher:
+    """
+    Publishes candles to the data collection queue at most once per
+    provider/product/granularity.
+
+    A watermark (start of the newest published candle) is kept in the cache
+    table and shared by every container. Only closed candles newer than the
+    watermark are sent, in batches, and only after the watermark was moved
+    past them with a conditional write on the value they were selected
+    from. A container whose copy is stale loses that write, reloads the
+    stored watermark and selects again, so two containers never send the
+    same candles. When a send fails the watermark is moved back to where
+    it was, so the next run sends the candles again. The copy kept in
+    memory only saves the read while this container is the one advancing
+    the watermark.
+    """
+
+    def __init__(self, max_batch=MAX_BATCH_SIZE, min_batch=MIN_BATCH_SIZE, clock=time.time):
+        self.max_batch = max_batch
+        self.min_batch = min_batch
+        self.clock = clock
+        self._watermarks = {}
+        self._resync = set()
+
+    def request_resync(self, provider, product_id):
+        """ The next publish for the product sends the full closed window """
+        self._resync.add((provider, product_id))
+
+    def get_watermark(self, key, reload=False):
+        if reload or key not in self._watermarks:
+            self._watermarks[key] = self._load_watermark(key)
+        return self._watermarks[key]
+
+    def advance_watermark(self, key, expected, watermark):
+        """ Moves the stored watermark from expected to watermark, False when it was not at expected """
+        if not self._advance_watermark(key, expected, watermark):
+            return False
+        self._watermarks[key] = watermark
+        return True
+
+    def rollback_watermark(self, key, claimed, watermark):
+        """ Moves the stored watermark back from claimed to watermark, unless another container moved it since """
+        if self._advance_watermark(key, claimed, watermark):
+            self._watermarks[key] = watermark
+        else:
+            self._watermarks.pop(key, None)
+            logger.error("ROLLBACK_CANDLE_WATERMARK_ERROR", message=f"Watermark {key} moved past {claimed}")
+
+    def _table(self):
+        # Imported here so the handler module loads without boto3
+        import boto3
+
+        return boto3.resource("dynamodb", Env.REGION).Table(Env.CACHE_TABLE_NAME)
+
+    def _load_watermark(self, key):
+        try:
+            metrics.external_call("dynamodb_requests")
+            item = self._table().get_item(Key={"cache_key": key}).get("Item")
+            return int(item["watermark"]) if item else None
+        except Exception as e:
+            logger.error("GET_CANDLE_WATERMARK_ERROR", message=f"Error getting watermark: {e}")
+            return None
+
+    def _advance_watermark(self, key, expected, watermark):
+        try:
+            metrics.external_call("dynamodb_requests")
+            self._table().update_item(
+                Key={"cache_key": key},
+                UpdateExpression=(
+                    "REMOVE watermark" if watermark is None
+                    else "SET watermark = :watermark, expiration = :expiration"
+                ),
+                ConditionExpression=(
+                    "attribute_not_exists(watermark)" if expected is None else "watermark = :expected"
+                ),
+                ExpressionAttributeValues={
+                    **({} if watermark is None else {
+                        ":watermark": watermark,
+                        ":expiration": int(self.clock()) + WATERMARK_TTL,
+                    }),
+                    **({} if expected is None else {":expected": expected}),
+                },
+            )
+            return True
+        except Exception as e:
+            if type(e).__name__ == "ConditionalCheckFailedException":
+                metrics.increment("candle_watermark_conflicts")
+            else:
+                logger.error("SET_CANDLE_WATERMARK_ERROR", message=f"Error setting watermark: {e}")
+            return False
+
+    def pending(self, candles, period_seconds, watermark):
+        """
+        Closed candles newer than the watermark (all of them for None). The
+        provider returns candles newest first, so the scan stops at the
+        first published one.
+        """
+        closed_before = self.clock() - period_seconds
+        pending = []
+        for candle in candles:
+            start = int(candle["start"])
+            if watermark is not None and start <= watermark:
+                break
+            if start <= closed_before:
+                pending.append(candle)
+        return pending
+
+    def publish(self, send, queue_url, provider, product_id, granularity, candles, period_seconds, msg_attrs=None):
+        """
+        Sends pending candles with `send` (send_message_to_queue) as
+        CANDLE_STICK messages of at most max_batch candles. Candles without
+        a start cannot be tracked and are sent as they are. Returns how many
+        candles were sent. When `send` raises the claimed watermark is
+        rolled back before the error is raised again, batches sent before
+        it are sent again by the next run.
+        """
+        key = watermark_key(provider, product_id, granularity)
+        resync = (provider, product_id) in self._resync
+        tracked = all("start" in candle for candle in candles)
+        if tracked:
+            claim = self._claim(key, candles, period_seconds, resync)
+            if claim is None:
+                return 0
+            candles, previous, claimed = claim
+
+        try:
+            for i in range(0, len(candles), self.max_batch):
+                send(
+                    queue_url,
+                    {
+                        "data_collection_type": "CANDLE_STICK",
+                        "candle_stick_data": pack(candles[i:i + self.max_batch]),
+                    },
+                    msg_attrs=msg_attrs or {},
+                )
+        except Exception:
+            if tracked:
+                self.rollback_watermark(key, claimed, previous)
+            raise
+
+        metrics.increment("candles_published", len(candles))
+        if tracked:
+            self._resync.discard((provider, product_id))
+        return len(candles)
+
+    def _claim(self, key, candles, period_seconds, resync):
+        """
+        Pending candles whose range this container won the watermark write
+        for, with the watermark before and after the write. None when there
+        are too few or another container took them.
+        """
+        for reload in (False, True):
+            watermark = self.get_watermark(key, reload)
+            pending = self.pending(candles, period_seconds, None if resync else watermark)
+            if not pending or (len(pending) < self.min_batch and not resync):
+                metrics.increment("candles_held", len(pending))
+                return None
+            newest = max(int(candle["start"]) for candle in pending)
+            claimed = newest if watermark is None else max(newest, watermark)
+            if self.advance_watermark(key, watermark, claimed):
+                return pending, watermark, claimed
+        return None
+
+
+# Watermarks survive across warm invocations of the container
+candle_publisher = CandlePublisher()
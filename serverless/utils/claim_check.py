@@ -0,0 +1,181 @@
+import gzip
+import hashlib
+import os
+import time
+
+from collections import OrderedDict
+
+from utils.common import Env
+from utils.metrics import metrics
+from utils.serialization import dumps, loads
+
+
+# SQS rejects bodies over 256 KB, leave room for attributes and growth
+DEFAULT_THRESHOLD_BYTES = 200_000
+
+# Bulky message fields moved to blob storage, in this order
+CLAIM_CHECK_FIELDS = ("historical_data", "positions", "portfolio", "config")
+
+REFERENCE_KEY = "claim_check"
+
+# Keys remembered as written, the bucket expires blobs after a day so older
+# writes are redone in case the blob is gone
+CLAIM_CHECK_KNOWN_KEYS = int(os.environ.get("CLAIM_CHECK_KNOWN_KEYS", 1024))
+CLAIM_CHECK_KNOWN_MAX_AGE = int(os.environ.get("CLAIM_CHECK_KNOWN_MAX_AGE", 3600 * 12))
+
+
+class WrittenKeys:
+    """ Bounded LRU of the keys a store wrote, with the time of the write """
+
+    def __init__(self, maxsize=CLAIM_CHECK_KNOWN_KEYS, max_age=CLAIM_CHECK_KNOWN_MAX_AGE, clock=time.time):
+        self.maxsize = maxsize
+        self.max_age = max_age
+        self.clock = clock
+        self._written = OrderedDict()
+
+    def __contains__(self, key):
+        written = self._written.get(key)
+        if written is None:
+            return False
+        if written + self.max_age <= self.clock():
+            del self._written[key]
+            return False
+        self._written.move_to_end(key)
+        return True
+
+    def add(self, key):
+        self._written[key] = self.clock()
+        self._written.move_to_end(key)
+        if len(self._written) > self.maxsize:
+            self._written.popitem(last=False)
+
+
+class LocalBlobStore:
+    """ Filesystem stand-in for S3, used locally and in tests """
+
+    name = "local"
+
+    def __init__(self, directory, known=None):
+        self.location = directory
+        self._known = WrittenKeys() if known is None else known
+
+    def _path(self, key):
+        return os.path.join(self.location, key)
+
+    def put(self, key, data):
+        if key in self._known:
+            return False
+        path = self._path(key)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(data)
+        self._known.add(key)
+        return True
+
+    def get(self, key):
+        with open(self._path(key), "rb") as f:
+            return f.read()
+
+
+class S3BlobStore:
+    """
+    Content addressed blobs in S3. Keys this container wrote recently are
+    skipped, writes are idempotent so other containers rewriting them is safe.
+    """
+
+    name = "s3"
+
+    def __init__(self, bucket, known=None):
+        self.location = bucket
+        self._known = WrittenKeys() if known is None else known
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            # Imported here so the handler module loads without boto3
+            import boto3
+
+            self._client = boto3.client("s3", Env.REGION)
+        return self._client
+
+    def put(self, key, data):
+        if key in self._known:
+            return False
+        metrics.external_call("blob_writes")
+        self.client.put_object(
+            Bucket=self.location,
+            Key=key,
+            Body=data,
+            ContentType="application/json",
+            ContentEncoding="gzip",
+        )
+        self._known.add(key)
+        return True
+
+    def get(self, key):
+        return self.client.get_object(Bucket=self.location, Key=key)["Body"].read()
+
+
+def get_store(store=None, location=None):
+    """ Blob store from CLAIM_CHECK_STORE ("s3" or "local"), None when disabled """
+    store = store or Env.CLAIM_CHECK_STORE
+    if store == "s3":
+        return S3BlobStore(location or Env.CLAIM_CHECK_BUCKET)
+    if store == "local":
+        return LocalBlobStore(location or Env.CLAIM_CHECK_DIR)
+    return None
+
+
+THRESHOLD_BYTES = int(Env.CLAIM_CHECK_THRESHOLD_BYTES or DEFAULT_THRESHOLD_BYTES)
+
+# Store for this container, reused so its written keys survive warm starts
+blob_store = get_store()
+
+
+def content_key(data):
+    return f"claim-check/{hashlib.sha256(data).hexdigest()}.json.gz"
+
+
+def check_in(message_body, store=None, threshold=None):
+    """
+    Returns the body unchanged when it serialises within `threshold` bytes.
+    Otherwise the claim check fields are gzipped into `store` under their
+    sha256 and replaced by a reference, so identical windows share a blob.
+    """
+    store = store or blob_store
+    threshold = threshold or THRESHOLD_BYTES
+    if store is None or len(dumps(message_body).encode("utf-8")) <= threshold:
+        return message_body
+
+    with metrics.timer("claim_check"):
+        message_body = dict(message_body)
+        for field in CLAIM_CHECK_FIELDS:
+            if message_body.get(field) is None:
+                continue
+            data = dumps(message_body[field]).encode("utf-8")
+            key = content_key(data)
+            store.put(key, gzip.compress(data, mtime=0))
+            message_body[field] = {
+                REFERENCE_KEY: {
+                    "store": store.name,
+                    "location": store.location,
+                    "key": key,
+                    "encoding": "gzip",
+                    "size": len(data),
+                }
+            }
+    return message_body
+
+
+def check_out(message_body, store=None):
+    """ Resolves the references written by check_in back into their values """
+    store = store or blob_store
+    message_body = dict(message_body)
+    for field in CLAIM_CHECK_FIELDS:
+        value = message_body.get(field)
+        if isinstance(value, dict) and REFERENCE_KEY in value:
+            data = gzip.decompress(store.get(value[REFERENCE_KEY]["key"]))
+            message_body[field] = loads(data)
+    return message_body
@@ -1,5 +1,4 @@
 import os
-import boto3
 import decimal
 import json
 import time
@@ -7,6 +6,9 @@ import time
 from ulid import ULID
 from enum import Enum
 
+from utils.metrics import metrics
+from utils.serialization import dumps
+
 
 class Env:
     QUEUE_MARKET_URL = os.environ.get("QUEUE_MARKET_URL")
@@ -36,6 +38,33 @@ class Env:
     ASSISTANT_API_KEY = os.environ.get(
         "ASSISTANT_API_KEY"
     )
+    CLAIM_CHECK_STORE = os.environ.get("CLAIM_CHECK_STORE")
+    CLAIM_CHECK_BUCKET = os.environ.get("CLAIM_CHECK_BUCKET")
+    CLAIM_CHECK_DIR = os.environ.get("CLAIM_CHECK_DIR", "/tmp/claim-check")
+    CLAIM_CHECK_THRESHOLD_BYTES = os.environ.get("CLAIM_CHECK_THRESHOLD_BYTES")
+    CANDLE_CODEC = os.environ.get("CANDLE_CODEC", "json")
+    # Unset waits for the TA Lambda, otherwise the local indicators serve
+    # once it has not answered within this many milliseconds
+    TA_HEDGE_BUDGET_MS = os.environ.get("TA_HEDGE_BUDGET_MS")
+    # "clusters" (highs and lows within tolerance) or "volume_profile"
+    SUPPORT_RESISTANCE_SOURCE = os.environ.get("SUPPORT_RESISTANCE_SOURCE", "clusters")
+    # Comma separated higher timeframes (see utils.timeframes) whose trend
+    # must not oppose a confirmed side, unset confirms on one timeframe
+    CONFIRM_TIMEFRAMES = os.environ.get("CONFIRM_TIMEFRAMES")
+    # "scan" reviews every position on each evaluation, "triggers" only the
+    # positions whose band thresholds the price crossed since the previous
+    # one, so near-target notifications are sent once per band entry
+    SELL_REVIEW_MODE = os.environ.get("SELL_REVIEW_MODE", "scan")
+    # Unset disables trailing stops, otherwise a position is also sold once
+    # the price fell this many percent from its peak since entry, after the
+    # peak reached TRAILING_STOP_ACTIVATION_PCT profit
+    TRAILING_STOP_PCT = os.environ.get("TRAILING_STOP_PCT")
+    TRAILING_STOP_ACTIVATION_PCT = os.environ.get("TRAILING_STOP_ACTIVATION_PCT", "4.0")
+    # Unset disables the check, otherwise a buy that would take the quote
+    # value its portfolio holds across its cluster of correlated products
+    # above this is flagged high risk. Clusters only span the products the
+    # container handled (see utils.portfolio_analytics)
+    MAX_CLUSTER_EXPOSURE = os.environ.get("MAX_CLUSTER_EXPOSURE")
 
 
 class DecimalEncoder(json.JSONEncoder):
@@ -48,11 +77,9 @@ class DecimalEncoder(json.JSONEncoder):
 def send_message_to_queue(
     queue_url: str, message_body: dict, msg_group_id=str(ULID()), msg_attrs={}
 ):
-    sqs = boto3.client("sqs", Env.REGION)
-
     options = {
         "QueueUrl": queue_url,
-        "MessageBody": json.dumps(message_body, cls=DecimalEncoder),
+        "MessageBody": dumps(message_body),
         # "MessageGroupId": msg_group_id,
         # "MessageDeduplicationId": str(ULID()),
         "MessageAttributes": msg_attrs,
@@ -62,7 +89,13 @@ def send_message_to_queue(
         options["MessageGroupId"] = msg_group_id
         options["MessageDeduplicationId"] = str(ULID())
 
-    sqs.send_message(**options)
+    with metrics.timer("sqs_publish"):
+        # Imported here so the handler module loads without boto3
+        import boto3
+
+        sqs = boto3.client("sqs", Env.REGION)
+        metrics.external_call("sqs_messages")
+        sqs.send_message(**options)
 
 
 class CoinbaseApiResponseMessages:
@@ -0,0 +1,80 @@
+from collections import OrderedDict
+from itertools import repeat
+
+from pydantic import create_model
+
+
+MISSING = object()
+
+
+def content_key(values, names):
+    """
+    Hashable key over the values of `names` in a JSON-like mapping, with
+    absent names kept apart from explicit None. Unhashable values (lists,
+    nested mappings) are keyed by their repr.
+    """
+    key = tuple(map(values.get, names, repeat(MISSING)))
+    try:
+        hash(key)
+    except TypeError:
+        key = tuple(repr(value) if isinstance(value, (dict, list)) else value for value in key)
+    return key
+
+
+class ConfigurationCache:
+    """
+    Caches validated configuration for a pydantic model keyed by config_id
+    and the content of the static (non-dynamic) fields.
+
+    The first build for a configuration runs full validation. Later builds
+    with the same configuration only validate the dynamic fields, through a
+    small model holding just those fields, and apply them to a copy of the
+    model the first build returned. Private attributes are reset to their
+    defaults on every copy.
+    """
+
+    def __init__(self, model_cls, dynamic_fields, maxsize=256):
+        self.model_cls = model_cls
+        self.dynamic_fields = tuple(dynamic_fields)
+        # Undeclared keys are ignored by validation, so only declared fields
+        # take part in the key
+        self.static_fields = tuple(
+            field.alias or name for name, field in model_cls.model_fields.items()
+            if name not in self.dynamic_fields
+        )
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._dynamic_model = create_model(
+            f"{model_cls.__name__}DynamicFields",
+            **{
+                name: (model_cls.model_fields[name].annotation, model_cls.model_fields[name])
+                for name in self.dynamic_fields
+            },
+        )
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        self._entries.clear()
+
+    def build(self, **kwargs):
+        dynamic = {name: kwargs.pop(name) for name in self.dynamic_fields if name in kwargs}
+        key = (kwargs.get("config_id"), content_key(kwargs, self.static_fields))
+
+        template = self._entries.get(key)
+        if template is None or len(dynamic) != len(self.dynamic_fields):
+            model = self.model_cls(**kwargs, **dynamic)
+            self._entries[key] = model.model_copy()
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            return model
+
+        self._entries.move_to_end(key)
+        dynamic = self._dynamic_model(**dynamic).__dict__
+        # The static values were validated by the first build and are never
+        # mutated, the copy is shallow
+        model = template.model_copy(update=dynamic)
+        for name, private in self.model_cls.__private_attributes__.items():
+            setattr(model, name, private.get_default())
+        return model
@@ -0,0 +1,128 @@
+import hashlib
+import os
+import time
+
+from collections import OrderedDict
+from decimal import Decimal, InvalidOperation
+
+from utils.indicator_cache import DynamoDBResultBackend
+from utils.metrics import metrics
+from utils.serialization import dumps
+
+
+# What to do with a repeated evaluation: "off", "suppress" (no risk message)
+# or "reemit" (send the previous decision again)
+DECISION_MEMO_POLICY = os.environ.get("DECISION_MEMO_POLICY", "off")
+# Largest price move, in percent, within a candle at which a decision is
+# reused. Unset reuses it for the whole candle period.
+DECISION_MEMO_PRICE_MOVE_PCT = os.environ.get("DECISION_MEMO_PRICE_MOVE_PCT")
+DECISION_MEMO_SIZE = int(os.environ.get("DECISION_MEMO_SIZE", 256))
+# "dynamodb" shares decisions between containers through the cache table
+DECISION_MEMO_BACKEND = os.environ.get("DECISION_MEMO_BACKEND", "memory")
+
+# Candle period in seconds of the candles each strategy term evaluates
+CANDLE_PERIODS = {
+    "SHORT_TERM": 60,
+    "MEDIUM_TERM": 3600,
+}
+
+
+def fingerprint(value):
+    return hashlib.sha256(dumps(value).encode("utf-8")).hexdigest()
+
+
+def _price_move_pct(price, previous_price):
+    try:
+        price, previous_price = Decimal(price), Decimal(previous_price)
+        return abs(price - previous_price) / previous_price * 100
+    except (InvalidOperation, TypeError, ZeroDivisionError):
+        return None
+
+
+class DecisionMemo:
+    """
+    The latest decision per product and strategy term, reused while no new
+    candle has closed and neither the positions, the requested side nor
+    the configuration have changed.
+
+    A decision is the JSON-native part of the risk message the strategy
+    produced, or None when the run ended without one.
+    """
+
+    def __init__(
+        self,
+        policy=DECISION_MEMO_POLICY,
+        price_move_pct=DECISION_MEMO_PRICE_MOVE_PCT,
+        maxsize=DECISION_MEMO_SIZE,
+        backend=None,
+        clock=time.time,
+    ):
+        self.policy = policy
+        self.price_move_pct = Decimal(price_move_pct) if price_move_pct is not None else None
+        self.maxsize = maxsize
+        self.backend = backend
+        self.clock = clock
+        self._entries = OrderedDict()
+
+    @property
+    def enabled(self):
+        return self.policy in ("suppress", "reemit")
+
+    def key(self, provider, product_id, strategy_term, side, positions, config):
+        """ Memo key, None when disabled or for terms without a known candle period """
+        period = CANDLE_PERIODS.get(strategy_term)
+        if period is None or not self.enabled:
+            return None
+        # Start of the newest candle that has closed
+        last_closed = int(self.clock()) // period * period - period
+        return (
+            provider,
+            product_id,
+            strategy_term,
+            last_closed,
+            side,
+            fingerprint(positions),
+            fingerprint(config),
+        )
+
+    def get(self, key, price=None):
+        """ (found, decision) for the key, missed when the price moved too far """
+        if key is None or not self.enabled:
+            return False, None
+
+        entry = self._entries.get(key)
+        if entry is None and self.backend is not None:
+            found, entry = self.backend.get(key)
+            if not found:
+                entry = None
+        if entry is None:
+            metrics.increment("decision_memo_misses")
+            return False, None
+
+        if self.price_move_pct is not None:
+            move = _price_move_pct(price, entry["price"])
+            if move is None or move > self.price_move_pct:
+                metrics.increment("decision_memo_price_moved")
+                return False, None
+
+        metrics.increment("decision_memo_hits")
+        return True, entry["decision"]
+
+    def set(self, key, decision, price=None):
+        if key is None or not self.enabled:
+            return
+        entry = {"decision": decision, "price": price}
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        if self.backend is not None:
+            self.backend.set(key, entry)
+
+
+decision_memo = DecisionMemo(
+    backend=(
+        DynamoDBResultBackend(ttl=max(CANDLE_PERIODS.values()), prefix="decision_")
+        if DECISION_MEMO_BACKEND == "dynamodb" else None
+    ),
+)
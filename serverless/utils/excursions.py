@@ -0,0 +1,93 @@
+"""
+Price excursions of positions since their entry, for every position at
+once over one candle window.
+
+Suffix maxima and minima of the window are computed once, so the peak
+and trough since any entry are a single lookup and a whole book is
+evaluated in O(candles + positions) array operations. Entries before the
+window start count from its first candle. numpy is imported on first use
+so the handler module loads without it.
+"""
+import datetime
+
+from functools import lru_cache
+
+
+@lru_cache(maxsize=65536)
+def parse_time(value):
+    """ UNIX seconds of an ISO 8601 time as the provider formats them, None if it is not one """
+    if not value:
+        return None
+    try:
+        return datetime.datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def entry_time(position):
+    """ When the position reached its average price: its last fill, else its creation """
+    return parse_time(position.last_fill_time) or parse_time(position.created_time)
+
+
+def excursions(candles, entry_prices, entry_times):
+    """
+    Per position, as arrays: peak and trough (highest high and lowest low
+    since entry, the entry price included), drawdown_pct (latest close
+    below the peak), favorable_pct and adverse_pct (peak above and trough
+    below the entry), profit_pct (latest close against the entry),
+    time_in_trade (seconds from entry to the latest candle), candles
+    (candles since entry) and covered (the window reaches back to the
+    entry). Positions without an entry time give NaN. None when the
+    candles carry no start times to place the entries in.
+    """
+    import numpy as np
+
+    if not candles or "start" not in candles[0]:
+        return None
+
+    ordered = candles[::-1]
+    starts = np.array([int(candle["start"]) for candle in ordered], dtype=float)
+    highs = np.array([float(candle["high"]) for candle in ordered])
+    lows = np.array([float(candle["low"]) for candle in ordered])
+    latest_close = float(ordered[-1]["close"])
+
+    # Highest high and lowest low from each candle to the newest
+    suffix_highs = np.maximum.accumulate(highs[::-1])[::-1]
+    suffix_lows = np.minimum.accumulate(lows[::-1])[::-1]
+
+    # Decimal prices convert one by one, much faster than through an object array
+    entries = np.fromiter(map(float, entry_prices), dtype=float, count=len(entry_prices))
+    times = np.fromiter(
+        (np.nan if time is None else time for time in entry_times), dtype=float, count=len(entry_times)
+    )
+    known = ~np.isnan(times)
+    # The candle the entry happened in, the first one for earlier entries
+    first = np.clip(np.searchsorted(starts, np.where(known, times, starts[0]), side="right") - 1, 0, None)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        peak = np.where(known, np.maximum(suffix_highs[first], entries), np.nan)
+        trough = np.where(known, np.minimum(suffix_lows[first], entries), np.nan)
+        return {
+            "peak": peak,
+            "trough": trough,
+            "drawdown_pct": (peak - latest_close) / peak * 100,
+            "favorable_pct": (peak - entries) / entries * 100,
+            "adverse_pct": (entries - trough) / entries * 100,
+            "profit_pct": np.where(known, (latest_close - entries) / entries * 100, np.nan),
+            "time_in_trade": starts[-1] - times,
+            "candles": np.where(known, len(starts) - first, 0),
+            "covered": known & (times >= starts[0]),
+        }
+
+
+def trailing_stops(stats, trail_pct, activation_pct):
+    """
+    Positions whose trailing stop is hit: the peak since entry reached
+    activation_pct profit, the latest close has fallen trail_pct from
+    that peak, and the position is still in profit.
+    """
+    return (
+        (stats["favorable_pct"] >= float(activation_pct))
+        & (stats["drawdown_pct"] >= float(trail_pct))
+        & (stats["profit_pct"] > 0)
+    )
@@ -0,0 +1,185 @@
+from decimal import Decimal
+from statistics import mean
+
+
+class FeatureGraph:
+    """
+    Named features derived from a candle window. Each feature declares the
+    features it depends on; dependencies must be registered first, so the
+    graph cannot contain cycles.
+    """
+
+    def __init__(self):
+        self.features = {"candles": ((), None)}
+
+    def feature(self, name, *depends_on):
+        """ Registers fn(params, *dependency_values) as feature `name` """
+        missing = [dep for dep in depends_on if dep not in self.features]
+        if missing:
+            raise ValueError(f"Feature {name} depends on unknown features: {missing}")
+
+        def register(fn):
+            self.features[name] = (depends_on, fn)
+            return fn
+        return register
+
+    def consumes(self, *names):
+        """ Declares the features a decision stage reads, checked at import """
+        unknown = [name for name in names if name not in self.features]
+        if unknown:
+            raise ValueError(f"Unknown features: {unknown}")
+
+        def declare(fn):
+            fn.consumes = names
+            return fn
+        return declare
+
+
+class FeatureSet:
+    """
+    Lazily evaluated features for one candle window. A feature is computed
+    the first time it is asked for, together with what it depends on, and
+    at most once.
+    """
+
+    def __init__(self, graph, candles, **params):
+        self.graph = graph
+        self.candles = candles
+        self.params = params
+        self.values = {"candles": candles}
+        self.computed = []
+
+    def __getitem__(self, name):
+        try:
+            return self.values[name]
+        except KeyError:
+            pass
+        depends_on, fn = self.graph.features[name]
+        value = fn(self.params, *(self[dep] for dep in depends_on))
+        self.values[name] = value
+        self.computed.append(name)
+        return value
+
+
+candle_features = FeatureGraph()
+
+
+@candle_features.feature("closes", "candles")
+def closes(params, candles):
+    return [Decimal(candle["close"]) for candle in candles]
+
+
+@candle_features.feature("highs", "candles")
+def highs(params, candles):
+    return [Decimal(candle["high"]) for candle in candles]
+
+
+@candle_features.feature("lows", "candles")
+def lows(params, candles):
+    return [Decimal(candle["low"]) for candle in candles]
+
+
+@candle_features.feature("latest_close", "candles")
+def latest_close(params, candles):
+    return Decimal(candles[0]["close"])
+
+
+@candle_features.feature("diff_pct", "candles")
+def diff_pct(params, candles):
+    """ Percentage change from the oldest to the newest close """
+    latest_price = candles[0]["close"] or 0
+    opening_price = candles[-1]["close"] or 0
+
+    _diff = Decimal(latest_price) - Decimal(opening_price)
+    try:
+        x = _diff / Decimal(opening_price)
+    except ZeroDivisionError:
+        x = 0
+    return (x) * 100
+
+
+@candle_features.feature("levels", "highs", "lows")
+def levels(params, highs, lows):
+    """ Support and resistance: the mean of the lows/highs within tolerance of all others """
+    tolerance = params.get("tolerance", 0.05)
+    support_levels = [
+        low for low in lows
+        if all(abs(low - other_low) / low <= tolerance for other_low in lows)
+    ]
+    resistance_levels = [
+        high for high in highs
+        if all(abs(high - other_high) / high <= tolerance for other_high in highs)
+    ]
+    return {
+        "support": mean(support_levels) if support_levels else None,
+        "resistance": mean(resistance_levels) if resistance_levels else None,
+    }
+
+
+@candle_features.feature("max_min_pct", "highs", "lows")
+def max_min_pct(params, highs, lows):
+    """ Range of the window, highest high over lowest low, in percent """
+    low = min(lows, default=None)
+    if not low:
+        return None
+    return (max(highs) - low) / low * 100
+
+
+@candle_features.feature("pattern_window", "candles")
+def pattern_window(params, candles):
+    scope = params.get("candle_stick_scope")
+    return candles[:scope] if scope else candles
+
+
+@candle_features.feature("pattern_prices", "pattern_window")
+def pattern_prices(params, window):
+    """ (open, close) of the pattern window, newest first """
+    return [(Decimal(candle["open"]), Decimal(candle["close"])) for candle in window]
+
+
+@candle_features.feature("bullish_engulfing_mask", "pattern_prices")
+def bullish_engulfing_mask(params, prices):
+    """ Per candle pair, newest first: a bearish candle engulfed by the bullish one after it """
+    return [
+        prev_close < prev_open and curr_close > curr_open
+        and curr_close > prev_open and curr_open < prev_close
+        for (curr_open, curr_close), (prev_open, prev_close) in zip(prices, prices[1:])
+    ]
+
+
+@candle_features.feature("bearish_engulfing_mask", "pattern_prices")
+def bearish_engulfing_mask(params, prices):
+    """ Per candle pair, newest first: a bullish candle engulfed by the bearish one after it """
+    return [
+        prev_close > prev_open and curr_close < curr_open
+        and curr_open > prev_close and curr_close < prev_open
+        for (curr_open, curr_close), (prev_open, prev_close) in zip(prices, prices[1:])
+    ]
+
+
+@candle_features.feature("bullish_engulfing", "bullish_engulfing_mask")
+def bullish_engulfing(params, mask):
+    return any(mask)
+
+
+@candle_features.feature("bearish_engulfing", "bearish_engulfing_mask")
+def bearish_engulfing(params, mask):
+    return any(mask)
+
+
+def _latest_sma(closes, period):
+    if not period or len(closes) < period:
+        return None
+    return sum(closes[:period]) / period
+
+
+@candle_features.feature("sma_fast", "closes")
+def sma_fast(params, closes):
+    """ Mean of the latest n1 closes, None without enough candles """
+    return _latest_sma(closes, params.get("n1"))
+
+
+@candle_features.feature("sma_slow", "closes")
+def sma_slow(params, closes):
+    """ Mean of the latest n2 closes, None without enough candles """
+    return _latest_sma(closes, params.get("n2"))
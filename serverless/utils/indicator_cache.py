@@ -0,0 +1,148 @@
+import hashlib
+import os
+import time
+
+from collections import OrderedDict
+
+from utils.common import Env
+from utils.logger import logger
+from utils.metrics import metrics
+from utils.serialization import dumps, loads
+
+
+# Results are reused for at most this long, a new candle changes the key sooner
+INDICATOR_CACHE_TTL = int(os.environ.get("INDICATOR_CACHE_TTL", 300))
+INDICATOR_CACHE_SIZE = int(os.environ.get("INDICATOR_CACHE_SIZE", 256))
+# "dynamodb" shares results between containers through the cache table
+INDICATOR_CACHE_BACKEND = os.environ.get("INDICATOR_CACHE_BACKEND", "memory")
+
+
+def window_key(name, historical_data, *params, scope=()):
+    """
+    Fingerprint of an indicator over a candle window, None when the window
+    cannot be fingerprinted (candles without a start).
+
+    Closed candles never change, so the window is identified by its length,
+    oldest start and the full newest candle: a new candle closing, or the
+    open candle moving, gives a new key.
+    """
+    if not historical_data:
+        return None
+    newest, oldest = historical_data[0], historical_data[-1]
+    if "start" not in newest or "start" not in oldest:
+        return None
+    return (
+        name,
+        tuple(scope),
+        params,
+        len(historical_data),
+        oldest["start"],
+        tuple(newest.items()),
+    )
+
+
+class DynamoDBResultBackend:
+    """ JSON results in the cache table, shared by every container """
+
+    def __init__(self, ttl=INDICATOR_CACHE_TTL, clock=time.time, prefix="indicator_"):
+        self.ttl = ttl
+        self.clock = clock
+        self.prefix = prefix
+
+    def cache_key(self, key):
+        return self.prefix + hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+
+    def _table(self):
+        # Imported here so the handler module loads without boto3
+        import boto3
+
+        return boto3.resource("dynamodb", Env.REGION).Table(Env.CACHE_TABLE_NAME)
+
+    def get(self, key):
+        try:
+            metrics.external_call("dynamodb_requests")
+            item = self._table().get_item(Key={"cache_key": self.cache_key(key)}).get("Item")
+            if item and int(item["expiration"]) > self.clock():
+                return True, loads(item["result"])
+        except Exception as e:
+            logger.error("GET_INDICATOR_CACHE_ERROR", message=f"Error getting indicator result: {e}")
+        return False, None
+
+    def set(self, key, result):
+        try:
+            metrics.external_call("dynamodb_requests")
+            self._table().put_item(
+                Item={
+                    "cache_key": self.cache_key(key),
+                    "result": dumps(result),
+                    "expiration": int(self.clock() + self.ttl),
+                }
+            )
+        except Exception as e:
+            logger.error("SET_INDICATOR_CACHE_ERROR", message=f"Error setting indicator result: {e}")
+
+
+class Uncached:
+    """ A result compute() returns for its caller only, it is neither kept nor shared """
+
+    def __init__(self, result):
+        self.result = result
+
+
+class IndicatorCache:
+    """
+    Bounded LRU of indicator results with a TTL, kept in process memory.
+
+    Results marked shared are also read from and written to the backend,
+    which only suits JSON-native results. Exceptions are never cached and
+    results are shared between callers, so they must not be mutated.
+    compute() returns an Uncached result to serve it without caching it.
+    """
+
+    def __init__(self, maxsize=INDICATOR_CACHE_SIZE, ttl=INDICATOR_CACHE_TTL, backend=None, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.backend = backend
+        self.clock = clock
+        self.enabled = True
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        self._entries.clear()
+
+    def get_or_compute(self, key, compute, shared=False):
+        if key is None or not self.enabled:
+            result = compute()
+            return result.result if isinstance(result, Uncached) else result
+
+        now = self.clock()
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > now:
+            self._entries.move_to_end(key)
+            metrics.increment("indicator_cache_hits")
+            return entry[1]
+
+        found, result = False, None
+        if shared and self.backend is not None:
+            found, result = self.backend.get(key)
+        if not found:
+            metrics.increment("indicator_cache_misses")
+            result = compute()
+            if isinstance(result, Uncached):
+                return result.result
+            if shared and self.backend is not None:
+                self.backend.set(key, result)
+
+        self._entries[key] = (now + self.ttl, result)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return result
+
+
+indicator_cache = IndicatorCache(
+    backend=DynamoDBResultBackend() if INDICATOR_CACHE_BACKEND == "dynamodb" else None,
+)
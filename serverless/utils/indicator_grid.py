@@ -0,0 +1,106 @@
+"""
+Moving averages and SMA-cross signals for many parameters at once, for
+parameter sweeps and backtests. Not imported by the handler, numpy is
+loaded with this module.
+
+Series are evaluated in the order given, as the indicators service does,
+and averages warm up like the `ta` crate: until a window is full the
+average covers the values seen so far.
+"""
+import numpy as np
+
+
+def sma_matrix(closes, periods):
+    """ SMA of every period (rows) at every position (columns), from one cumulative sum """
+    closes = np.asarray(closes, dtype=float)
+    periods = np.asarray(periods, dtype=np.int64)
+    if (periods < 1).any():
+        raise ValueError(f"Invalid SMA periods: {periods.tolist()}")
+    sums = np.concatenate(([0.0], np.cumsum(closes)))
+    ends = np.arange(1, len(closes) + 1)
+    starts = np.maximum(ends - periods[:, None], 0)
+    return (sums[ends] - sums[starts]) / (ends - starts)
+
+
+def ema_matrix(closes, periods):
+    """
+    EMA of every period, k = 2 / (period + 1) and seeded with the first
+    value, filtered for all periods together in one pass over the series.
+    """
+    closes = np.asarray(closes, dtype=float)
+    periods = np.asarray(periods, dtype=float)
+    if (periods < 1).any():
+        raise ValueError(f"Invalid EMA periods: {periods.tolist()}")
+    k = 2 / (periods + 1)
+    result = np.empty((len(periods), len(closes)))
+    if not len(closes):
+        return result
+    current = np.full(len(periods), closes[0])
+    for t, close in enumerate(closes):
+        current = k * close + (1 - k) * current
+        result[:, t] = current
+    return result
+
+
+# Pairs evaluated together, bounds the temporary arrays of a sweep
+GRID_CHUNK_ROWS = 128
+
+
+def cross_signals(fast, slow):
+    """
+    SMA-cross signals per row: 1 to buy, -1 to sell, 0 for none. A signal is
+    given whenever the fast average is strictly above (below) the slow one
+    and the last signal was not already a buy (sell).
+    """
+    side = (fast > slow).astype(np.int8) - (fast < slow).astype(np.int8)
+    previous_side = np.zeros_like(side)
+    crossed = side != 0
+    if (crossed[..., 1:] >= crossed[..., :-1]).all():
+        # Equal averages only before the first crossing (the warm-up, where
+        # both average the same values), so the previous value is the last side
+        previous_side[..., 1:] = side[..., :-1]
+    else:
+        # Equal averages give no signal, compare with the latest non-zero side
+        positions = np.arange(side.shape[-1], dtype=np.int32)
+        latest = np.maximum.accumulate(np.where(side != 0, positions, -1), axis=-1)
+        previous = latest[..., :-1]
+        previous_side[..., 1:] = np.where(
+            previous >= 0, np.take_along_axis(side, np.maximum(previous, 0), axis=-1), 0
+        )
+    return np.where(side != previous_side, side, 0).astype(np.int8)
+
+
+def sma_cross_grid(closes, fast_periods, slow_periods):
+    """
+    SMA-cross signals of every (n1, n2) pair with n1 < n2, as
+    (pairs, signals) where signals has one row per pair.
+    """
+    periods = sorted(set(fast_periods) | set(slow_periods))
+    averages = sma_matrix(closes, periods)
+    row = {period: index for index, period in enumerate(periods)}
+
+    pairs = [(n1, n2) for n1 in fast_periods for n2 in slow_periods if n1 < n2]
+    signals = np.empty((len(pairs), averages.shape[1]), dtype=np.int8)
+    fast_rows = np.array([row[n1] for n1, _ in pairs], dtype=np.int64)
+    slow_rows = np.array([row[n2] for _, n2 in pairs], dtype=np.int64)
+    for chunk in range(0, len(pairs), GRID_CHUNK_ROWS):
+        rows = slice(chunk, chunk + GRID_CHUNK_ROWS)
+        signals[rows] = cross_signals(averages[fast_rows[rows]], averages[slow_rows[rows]])
+    return pairs, signals
+
+
+def signal_records(closes, signals):
+    """ Typed signal records (see models.signals) of one row of signals """
+    indexes = np.flatnonzero(signals)
+    return [
+        {
+            "indicator": "SMA",
+            "side": "BUY" if signals[index] > 0 else "SELL",
+            "reason": "CROSS",
+            "price": float(closes[index]),
+            "size": None,
+            "entry": None,
+            "index": int(index),
+        }
+        for index in indexes
+    ]
@@ -0,0 +1,81 @@
+class SimpleMovingAverage:
+    """
+    ta::indicators::SimpleMovingAverage from the indicators service: the
+    average of the values seen so far until the window is full, kept as a
+    running sum so float rounding matches the Rust side.
+    """
+
+    def __init__(self, period):
+        if period < 1:
+            raise ValueError(f"Invalid SMA period: {period}")
+        self.period = period
+        self.buffer = [0.0] * period
+        self.index = 0
+        self.count = 0
+        self.sum = 0.0
+
+    def next(self, value):
+        old_value = self.buffer[self.index]
+        self.buffer[self.index] = value
+        self.index = (self.index + 1) % self.period
+        if self.count < self.period:
+            self.count += 1
+        self.sum = self.sum - old_value + value
+        return self.sum / self.count
+
+
+def format_price(price):
+    """ f64 as Rust's Display prints it """
+    return str(int(price)) if price.is_integer() else repr(price)
+
+
+def sma_cross_records(historical_data, n1, n2):
+    """
+    Local equivalent of the SMA cross in the indicators service
+    (indicators/src/event_handler.rs), as typed signal records. Candles
+    are read in the order they are given, as the service does.
+    """
+    if len(historical_data) < n2:
+        raise ValueError("Insufficient data for the specified SMA periods")
+    if n1 >= n2:
+        raise ValueError("n1 must be less than n2")
+
+    sma1 = SimpleMovingAverage(n1)
+    sma2 = SimpleMovingAverage(n2)
+    position = 0  # 0 = flat, 1 = long, -1 = short
+    signals = []
+    for index, candle in enumerate(historical_data):
+        try:
+            price = float(candle["close"])
+        except (TypeError, ValueError):
+            price = 0.0
+        sma1_val = sma1.next(price)
+        sma2_val = sma2.next(price)
+
+        if sma1_val > sma2_val and position <= 0:
+            side = "BUY"
+            position = 1
+        elif sma1_val < sma2_val and position >= 0:
+            side = "SELL"
+            position = -1
+        else:
+            continue
+        signals.append({
+            "indicator": "SMA",
+            "side": side,
+            "reason": "CROSS",
+            "price": price,
+            "size": None,
+            "entry": None,
+            "index": index,
+        })
+
+    return signals
+
+
+def sma_cross_signals(historical_data, n1, n2):
+    """ sma_cross_records in the legacy string format of the service """
+    return [
+        f"SMA Signal: {signal['side'].capitalize()} at price: {format_price(signal['price'])}"
+        for signal in sma_cross_records(historical_data, n1, n2)
+    ]
@@ -1,7 +1,6 @@
-import boto3
-
 from utils.common import Env
 from utils.logger import logger
+from utils.metrics import metrics
 
 
 class LambdaClient:
@@ -14,6 +13,8 @@ class LambdaClient:
         """
         Returns a boto3 Lambda client with the default configuration.
         """
+        import boto3
+
         self.function_name = Env.SIMULATOR_LAMBDA if "SIMLAMBDA" in self.correlation_id else Env.TA_INDICATORS_LAMBDA
         return boto3.client('lambda', region_name=self.region)  # Adjust region as necessary
 
@@ -27,6 +28,7 @@ class LambdaClient:
         :return: The response from the Lambda function.
         """
         try:
+            metrics.external_call("lambda_invocations")
             response = self.client.invoke(
                 FunctionName=self.function_name,
                 InvocationType='RequestResponse',
@@ -1,16 +1,75 @@
+import logging
+import os
+import time
+
 import structlog
 
 
-def configure_logging():
-    # Configure structlog logging for aws lambda
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+
+# High frequency events and how many of each may be logged per window.
+# REVIEW_MARKET_ANALYZE_EXCEPTION fires once per unprofitable position.
+SAMPLED_EVENTS = {
+    "REVIEW_MARKET_ANALYZE_EXCEPTION": 20,
+    "NO_POSITIONS_FOUND": 5,
+}
+SAMPLE_WINDOW_SECONDS = 60
+
+
+class EventSampler:
+    """
+    structlog processor that rate limits the configured events per window.
+    Events over the limit are dropped before any rendering happens; the
+    first event of the next window carries how many were dropped.
+    """
+
+    def __init__(self, limits, window_seconds=SAMPLE_WINDOW_SECONDS, clock=time.monotonic):
+        self.limits = limits
+        self.window_seconds = window_seconds
+        self.clock = clock
+        self._windows = {}
+
+    def __call__(self, logger, method_name, event_dict):
+        event = event_dict.get("event")
+        limit = self.limits.get(event)
+        if limit is None:
+            return event_dict
+
+        now = self.clock()
+        window_start, count, dropped = self._windows.get(event, (now, 0, 0))
+        if now - window_start >= self.window_seconds:
+            if dropped:
+                event_dict["sampled_dropped"] = dropped
+            window_start, count, dropped = now, 0, 0
+
+        if count >= limit:
+            self._windows[event] = (window_start, count, dropped + 1)
+            raise structlog.DropEvent
+
+        self._windows[event] = (window_start, count + 1, dropped)
+        return event_dict
+
+
+sampler = EventSampler(SAMPLED_EVENTS)
+
 
+def configure_logging(level=LOG_LEVEL):
+    # Configure structlog logging for aws lambda.
+    # The filtering wrapper drops events below the level before any processor
+    # runs, the sampler drops rate limited events before timestamping and JSON
+    # rendering, and loggers are cached after their first use.
     structlog.configure(
         processors=[
+            sampler,
             structlog.stdlib.add_log_level,
             structlog.stdlib.PositionalArgumentsFormatter(),
             structlog.processors.TimeStamper(fmt="iso"),
             structlog.processors.JSONRenderer(),
-        ]
+        ],
+        wrapper_class=structlog.make_filtering_bound_logger(
+            logging.getLevelName(str(level).upper())
+        ),
+        cache_logger_on_first_use=True,
     )
     return structlog.get_logger()
 
@@ -0,0 +1,100 @@
+import functools
+import json
+import sys
+import time
+
+from contextlib import contextmanager
+
+
+NAMESPACE = "TraderStrategy"
+DIMENSIONS = ("provider", "product_id", "strategy_term")
+# CloudWatch accepts at most 100 values per metric in one EMF document
+MAX_VALUES_PER_METRIC = 100
+
+
+class MetricsLogger:
+    """
+    Collects per-stage timings and counters for one invocation and writes
+    them as a single CloudWatch Embedded Metric Format (EMF) log line.
+    """
+
+    def __init__(self, namespace=NAMESPACE, stream=None):
+        self.namespace = namespace
+        self.stream = stream
+        self.reset()
+
+    def reset(self, **dimensions):
+        self.dimensions = {}
+        self.timings = {}
+        self.counters = {}
+        self.set_dimensions(**dimensions)
+
+    def set_dimensions(self, **dimensions):
+        for key, value in dimensions.items():
+            self.dimensions[key] = str(value) if value is not None else "UNKNOWN"
+
+    @contextmanager
+    def timer(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.timings.setdefault(stage, []).append(round(elapsed_ms, 3))
+
+    def increment(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def external_call(self, kind):
+        """ Counts one call leaving the function, per kind and in total """
+        self.increment(kind)
+        self.increment("external_calls")
+
+    def document(self):
+        dimensions = {key: self.dimensions.get(key, "UNKNOWN") for key in DIMENSIONS}
+        metrics = []
+        values = {}
+        for stage, samples in self.timings.items():
+            name = f"{stage}_ms"
+            metrics.append({"Name": name, "Unit": "Milliseconds"})
+            samples = samples[:MAX_VALUES_PER_METRIC]
+            values[name] = samples[0] if len(samples) == 1 else samples
+        for name, count in self.counters.items():
+            metrics.append({"Name": name, "Unit": "Count"})
+            values[name] = count
+
+        return {
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [
+                    {
+                        "Namespace": self.namespace,
+                        "Dimensions": [list(DIMENSIONS)],
+                        "Metrics": metrics,
+                    }
+                ],
+            },
+            **dimensions,
+            **values,
+        }
+
+    def flush(self):
+        if self.timings or self.counters:
+            stream = self.stream or sys.stdout
+            stream.write(json.dumps(self.document()) + "\n")
+            stream.flush()
+        self.reset(**self.dimensions)
+
+    def flush_after(self, fn):
+        """ Decorates a handler so every invocation starts clean and is flushed at the end """
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            self.reset()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.flush()
+        return wrapper
+
+
+metrics = MetricsLogger()
@@ -1,20 +1,20 @@
-import boto3
-import requests
-
 from datetime import datetime, timedelta
 from utils.common import Env
 from utils.logger import logger
+from utils.metrics import metrics
 
 CACHE_TTL = 3600 * 12  # 12 hours
 
-dynamodb = boto3.resource("dynamodb", Env.REGION)
-cache_table = dynamodb.Table(Env.CACHE_TABLE_NAME)
-
 
+# boto3 and requests are imported where they are used so importing this
+# module (and the handler) stays cheap on a cold start
 def get_cached_token(cache_key):
+    import boto3
+
     dynamodb = boto3.resource("dynamodb", Env.REGION)
     cache_table = dynamodb.Table(Env.CACHE_TABLE_NAME)
     try:
+        metrics.external_call("dynamodb_requests")
         response = cache_table.get_item(Key={"cache_key": cache_key})
 
         if "Item" in response:
@@ -30,10 +30,13 @@ def get_cached_token(cache_key):
 
 
 def set_cached_token(cache_key, token, ttl):
+    import boto3
+
     dynamodb = boto3.resource("dynamodb", Env.REGION)
     cache_table = dynamodb.Table(Env.CACHE_TABLE_NAME)
     expiration = (datetime.utcnow() + timedelta(seconds=ttl)).isoformat()
     try:
+        metrics.external_call("dynamodb_requests")
         cache_table.put_item(
             Item={"cache_key": cache_key, "token": token, "expiration": expiration}
         )
@@ -46,6 +49,13 @@ def set_cached_token(cache_key, token, ttl):
 def generate_oauth_token(
     client_id, client_secret, audience, grant_type="client_credentials"
 ):
+    with metrics.timer("token_fetch"):
+        return _generate_oauth_token(client_id, client_secret, audience, grant_type)
+
+
+def _generate_oauth_token(client_id, client_secret, audience, grant_type):
+    import requests
+
     cache_key = f"trader_oauth_token_{client_id}_{audience}"
     cached_token = get_cached_token(cache_key)
 
@@ -61,6 +71,7 @@ def generate_oauth_token(
         "grant_type": grant_type,
     }
 
+    metrics.external_call("oauth_requests")
     response = requests.post(url, json=payload, headers=headers)
     response.raise_for_status()
     token = response.json().get("access_token")
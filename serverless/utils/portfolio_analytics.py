@@ -0,0 +1,283 @@
+"""
+Return correlations across the traded products and the exposure of each
+cluster of correlated products.
+
+Every product reports its closed candles as its strategy runs. Once a
+candle period is complete, the exponentially weighted covariance of the
+period's log returns is updated in O(k^2) for k products, and products
+whose correlation reaches a threshold are grouped into clusters. A
+strategy then reads its cluster's exposure in O(1). numpy is imported
+on first use so the handler module loads without it.
+
+The trackers live in the memory of one container. With several
+containers running, each one only sees the products it handled, so
+cluster exposure covers those products alone and starts over when the
+container is recycled.
+"""
+import math
+import os
+
+from decimal import Decimal
+
+
+# Weight of the previous covariance at each new period (RiskMetrics uses 0.94)
+PORTFOLIO_EWMA_DECAY = float(os.environ.get("PORTFOLIO_EWMA_DECAY", 0.94))
+# Correlation at or above which two products are in the same cluster
+PORTFOLIO_CLUSTER_CORRELATION = float(os.environ.get("PORTFOLIO_CLUSTER_CORRELATION", 0.7))
+# Joint returns a pair needs before its correlation is trusted
+PORTFOLIO_MIN_OBSERVATIONS = int(os.environ.get("PORTFOLIO_MIN_OBSERVATIONS", 20))
+# Applied periods kept, to start the covariances of a new product
+PORTFOLIO_HISTORY = int(os.environ.get("PORTFOLIO_HISTORY", 256))
+# Periods waiting for late products before the oldest is applied without them
+PORTFOLIO_MAX_PENDING = int(os.environ.get("PORTFOLIO_MAX_PENDING", 3))
+
+
+class CorrelationTracker:
+    """
+    Exponentially weighted (zero mean) covariance of the products' candle
+    returns, with the clusters and per-cluster exposure derived from it.
+
+    Returns are buffered per candle period. A period is applied once, in
+    order, when every product has reported it (each product's latest
+    closed candle is its watermark), or when max_pending later periods
+    are waiting for a product that stopped reporting. Every period decays
+    the whole matrix and adds the outer product of its returns, with zero
+    for the products that did not report, so the covariance stays positive
+    semi-definite and correlations within [-1, 1]. Returns for a period
+    already applied are dropped. The first candles of a new product start
+    its covariances from the periods applied before it, as if it had
+    reported them in time.
+
+    Exposures are kept per portfolio, so portfolios holding the same
+    products share the correlations but not their exposure totals.
+    """
+
+    def __init__(
+        self,
+        decay=PORTFOLIO_EWMA_DECAY,
+        threshold=PORTFOLIO_CLUSTER_CORRELATION,
+        min_observations=PORTFOLIO_MIN_OBSERVATIONS,
+        history=PORTFOLIO_HISTORY,
+        max_pending=PORTFOLIO_MAX_PENDING,
+    ):
+        import numpy as np
+
+        self.decay = decay
+        self.threshold = threshold
+        self.min_observations = min_observations
+        self.history = history
+        self.max_pending = max_pending
+        self.products = []
+        self.rows = {}
+        self.covariance = np.zeros((0, 0))
+        self.counts = np.zeros((0, 0), dtype=np.int64)
+        self.last_close = {}  # Product to (start, close) of its latest closed candle
+        self.pending = {}  # Period start to the products' returns for it
+        self.oldest = None  # Start of the oldest pending period
+        self.waiting = 0  # Products that have not reported it yet
+        self.latest = None  # Start of the latest applied period
+        self.slots = {}  # Start of the applied periods kept to their window row, oldest first
+        self.applied = 0  # Periods applied so far
+        self.window = np.zeros((history, 0))  # Returns of the applied periods kept
+        self.reported = np.zeros((history, 0), dtype=bool)  # Products that reported them
+        self.clusters = {}  # Product to its cluster, the cluster's first product
+        self.exposures = {}  # Portfolio to product to quote value held
+        self.cluster_exposures = {}  # Portfolio to cluster to quote value held
+
+    def _row(self, product_id):
+        import numpy as np
+
+        row = self.rows.get(product_id)
+        if row is None:
+            row = self.rows[product_id] = len(self.products)
+            self.products.append(product_id)
+            self.clusters[product_id] = product_id
+            if row >= len(self.covariance):
+                size = max(4, 2 * len(self.covariance))
+                covariance = np.zeros((size, size))
+                counts = np.zeros((size, size), dtype=np.int64)
+                window = np.zeros((self.history, size))
+                reported = np.zeros((self.history, size), dtype=bool)
+                covariance[:row, :row] = self.covariance[:row, :row]
+                counts[:row, :row] = self.counts[:row, :row]
+                window[:, :row] = self.window[:, :row]
+                reported[:, :row] = self.reported[:, :row]
+                self.covariance, self.counts = covariance, counts
+                self.window, self.reported = window, reported
+        return row
+
+    def observe(self, product_id, candles):
+        """
+        Adds the closed candles (provider format, newest first) newer than
+        the product's latest. Candles without start times are ignored.
+        """
+        if not candles or "start" not in candles[0]:
+            return
+        last = previous = self.last_close.get(product_id)
+        closed = []
+        for candle in candles[1:]:
+            start = int(candle["start"])
+            if last is not None and start <= last[0]:
+                break
+            closed.append((start, float(candle["close"])))
+
+        returns = []
+        for start, close in reversed(closed):
+            if last is not None and last[1] > 0 and close > 0:
+                returns.append((start, math.log(close / last[1])))
+            last = (start, close)
+        if last is not None:
+            self.last_close[product_id] = last
+        if not returns:
+            return
+
+        new = product_id not in self.rows
+        if new:
+            self._row(product_id)
+            self._backfill(product_id, dict(returns))
+        for start, value in returns:
+            if self.latest is None or start > self.latest:
+                self.pending.setdefault(start, {})[product_id] = value
+
+        if new or min(self.pending, default=None) != self.oldest:
+            self._count_waiting()
+        elif self.oldest is not None and previous[0] < self.oldest <= last[0]:
+            self.waiting -= 1
+        self._apply_ready()
+
+    def _backfill(self, product_id, returns):
+        """ Covariances of a new product from its returns for the periods already applied """
+        import numpy as np
+
+        starts = [start for start in self.slots if start in returns]
+        if not starts:
+            return
+        row, count = self.rows[product_id], len(self.products)
+        own = np.array([self.slots[start] for start in starts])
+        self.window[own, row] = [returns[start] for start in starts]
+        self.reported[own, row] = True
+
+        # An applied period is decayed once by every period applied after it
+        slots = np.array(list(self.slots.values()))
+        weights = (1 - self.decay) * self.decay ** np.arange(len(slots) - 1, -1, -1)
+        covariances = (weights * self.window[slots, row]) @ self.window[slots, :count]
+        counts = self.reported[slots, row].astype(np.int64) @ self.reported[slots, :count]
+        self.covariance[row, :count] = self.covariance[:count, row] = covariances
+        self.counts[row, :count] = self.counts[:count, row] = counts
+        self._cluster()
+
+    def _count_waiting(self):
+        self.oldest = min(self.pending, default=None)
+        self.waiting = 0 if self.oldest is None else sum(
+            self.last_close[product_id][0] < self.oldest for product_id in self.products
+        )
+
+    def _apply_ready(self):
+        """ Applies the periods every product reported, and those waiting too long """
+        applied = False
+        while self.pending and (self.waiting == 0 or len(self.pending) > self.max_pending):
+            self._apply(self.oldest, self.pending.pop(self.oldest))
+            self._count_waiting()
+            applied = True
+        if applied:
+            self._cluster()
+
+    def _apply(self, start, returns):
+        import numpy as np
+
+        if len(self.slots) == self.history:
+            del self.slots[next(iter(self.slots))]
+        slot = self.slots[start] = self.applied % self.history
+        self.applied += 1
+        self.latest = start
+
+        count = len(self.products)
+        rows = np.array([self.rows[product_id] for product_id in returns])
+        self.window[slot], self.reported[slot] = 0, False
+        self.window[slot, rows] = list(returns.values())
+        self.reported[slot, rows] = True
+        values = self.window[slot, :count]
+        covariance = self.covariance[:count, :count]
+        covariance *= self.decay
+        covariance += (1 - self.decay) * np.outer(values, values)
+        self.counts[np.ix_(rows, rows)] += 1
+
+    def complete(self):
+        """ Applies every period waiting for late products """
+        if not self.pending:
+            return
+        for start in sorted(self.pending):
+            self._apply(start, self.pending.pop(start))
+        self._count_waiting()
+        self._cluster()
+
+    def correlation(self):
+        """ Correlation matrix in the order of products, NaN for products without variance """
+        import numpy as np
+
+        count = len(self.products)
+        covariance = self.covariance[:count, :count]
+        deviations = np.sqrt(np.diag(covariance))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return covariance / np.outer(deviations, deviations)
+
+    def _cluster(self):
+        """ Connected components of the products correlated above the threshold """
+        import numpy as np
+
+        count = len(self.products)
+        linked = (self.correlation() >= self.threshold) & (self.counts[:count, :count] >= self.min_observations)
+        # Every product takes the lowest row linked to it until none changes,
+        # a pass per link of the longest chain between two products
+        labels = np.arange(count)
+        while True:
+            spread = np.minimum(labels, np.where(linked, labels, count).min(axis=1, initial=count))
+            if np.array_equal(spread, labels):
+                break
+            labels = spread
+
+        self.clusters = {product_id: self.products[label] for product_id, label in zip(self.products, labels)}
+        for portfolio in self.exposures:
+            self._total(portfolio)
+
+    def _total(self, portfolio):
+        totals = {}
+        for product_id, exposure in self.exposures[portfolio].items():
+            cluster = self.cluster_of(product_id)
+            totals[cluster] = totals.get(cluster, Decimal(0)) + exposure
+        self.cluster_exposures[portfolio] = totals
+
+    def set_exposure(self, product_id, exposure, portfolio=None):
+        """ Sets the quote value a portfolio holds in a product, its cluster's total follows """
+        if portfolio not in self.exposures:
+            self.exposures[portfolio] = {}
+            self._total(portfolio)
+        exposures, totals = self.exposures[portfolio], self.cluster_exposures[portfolio]
+        previous = exposures.get(product_id, Decimal(0))
+        exposures[product_id] = exposure
+        cluster = self.cluster_of(product_id)
+        totals[cluster] = totals.get(cluster, Decimal(0)) - previous + exposure
+
+    def cluster_of(self, product_id):
+        return self.clusters.get(product_id, product_id)
+
+    def cluster_exposure(self, product_id, portfolio=None):
+        """ Quote value a portfolio holds across the product's cluster """
+        return self.cluster_exposures.get(portfolio, {}).get(self.cluster_of(product_id), Decimal(0))
+
+
+class PortfolioAnalytics:
+    """ A tracker per provider and strategy term, whose candles share a period """
+
+    def __init__(self):
+        self._trackers = {}
+
+    def tracker(self, provider, strategy_term):
+        key = (provider, strategy_term)
+        tracker = self._trackers.get(key)
+        if tracker is None:
+            tracker = self._trackers[key] = CorrelationTracker()
+        return tracker
+
+
+portfolio_analytics = PortfolioAnalytics()
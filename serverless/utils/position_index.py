@@ -0,0 +1,237 @@
+import heapq
+import os
+import time
+
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from decimal import Decimal
+
+
+# Books with at least this many positions are reviewed through the index
+POSITION_INDEX_MIN_POSITIONS = int(os.environ.get("POSITION_INDEX_MIN_POSITIONS", 64))
+# Product/strategy term books kept per container
+POSITION_INDEX_SIZE = int(os.environ.get("POSITION_INDEX_SIZE", 64))
+
+# Relative distance from a threshold price within which positions are
+# checked with profit() itself, far above the rounding of the Decimal
+# arithmetic, so queries return exactly what a scan with profit() would
+MARGIN = Decimal("1e-12")
+
+
+def profit(current_price, size, at_price):
+    """ (current_amt, bought_amt, profit_amt_dlrs, profit_pct) of selling size bought at at_price """
+    current_amt = current_price * size
+    bought_amt = at_price * size
+
+    profit_amt_dlrs = current_amt - bought_amt
+    profit_pct = (profit_amt_dlrs / bought_amt) * 100
+    return current_amt, bought_amt, profit_amt_dlrs, profit_pct
+
+
+def entry_price(price, profit_pct):
+    """ Entry price at which a position has exactly profit_pct profit at price """
+    return price * 100 / (100 + profit_pct)
+
+
+class PositionIndex:
+    """
+    Positions of one product and strategy term sorted by entry price
+    (average_filled_price), with cumulative filled sizes.
+
+    Profit falls as the entry price rises, so the positions within a
+    profit band at a price are one contiguous run of the index, found by
+    bisection. Inserts and removals are O(n) list moves; the cumulative
+    sizes are rebuilt on the first query after a change.
+    """
+
+    def __init__(self):
+        self._prices = []  # Sorted entry prices
+        self._ids = []  # Position ids, in the order of _prices
+        self._positions = {}
+        self._order = {}  # Position id to its place in the book, results keep that order
+        self._expiry = []  # Heap of (ttl, position id)
+        self._cumulative = None
+        self._next = 0
+        self.degenerate = 0  # Positions profit() cannot be computed for
+        self.synced = None  # The positions list of the last sync while unchanged since
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __contains__(self, position_id):
+        return position_id in self._positions
+
+    @staticmethod
+    def _is_degenerate(position):
+        return not position.filled_size or position.average_filled_price <= 0
+
+    def add(self, position, order=None):
+        """ Adds or replaces a position, last in the book unless order is given """
+        position_id = position.position_id
+        if position_id in self._positions:
+            self.remove(position_id)
+
+        price = position.average_filled_price
+        index = bisect_right(self._prices, price)
+        self._prices.insert(index, price)
+        self._ids.insert(index, position_id)
+        self._positions[position_id] = position
+        if order is None:
+            order = self._next
+        self._order[position_id] = order
+        self._next = max(self._next, order + 1)
+        if position.ttl:
+            heapq.heappush(self._expiry, (position.ttl, position_id))
+        self.degenerate += self._is_degenerate(position)
+        self._cumulative = None
+        self.synced = None
+
+    def remove(self, position_id):
+        """ Removes a position, returns it or None when it is not indexed """
+        position = self._positions.pop(position_id, None)
+        if position is None:
+            return None
+        del self._order[position_id]
+        index = bisect_left(self._prices, position.average_filled_price)
+        while self._ids[index] != position_id:
+            index += 1
+        del self._prices[index]
+        del self._ids[index]
+        self.degenerate -= self._is_degenerate(position)
+        self._cumulative = None
+        self.synced = None
+        return position
+
+    def evict(self, now):
+        """ Removes the positions whose ttl has passed, returns their ids """
+        evicted = []
+        while self._expiry and self._expiry[0][0] <= now:
+            ttl, position_id = heapq.heappop(self._expiry)
+            position = self._positions.get(position_id)
+            # Entries of replaced positions are skipped
+            if position is not None and position.ttl == ttl:
+                self.remove(position_id)
+                evicted.append(position_id)
+        return evicted
+
+    def sync(self, positions):
+        """
+        Makes the index hold exactly `positions`, in their order. Positions
+        whose entry price and size are unchanged keep their place.
+        """
+        incoming = {position.position_id: position for position in positions}
+        for position_id in [position_id for position_id in self._positions if position_id not in incoming]:
+            self.remove(position_id)
+        for order, position in enumerate(positions):
+            current = self._positions.get(position.position_id)
+            if current is None or current.average_filled_price != position.average_filled_price \
+                    or current.filled_size != position.filled_size or current.ttl != position.ttl:
+                self.add(position, order)
+            else:
+                self._positions[position.position_id] = position
+                self._order[position.position_id] = order
+        self._next = len(positions)
+        self.synced = positions
+
+    def _sizes(self):
+        if self._cumulative is None:
+            cumulative = [Decimal(0)]
+            for position_id in self._ids:
+                cumulative.append(cumulative[-1] + self._positions[position_id].filled_size)
+            self._cumulative = cumulative
+        return self._cumulative
+
+    def _select(self, price, keep, low_pct=None, high_pct=None):
+        """
+        (sure, checked): the index range of positions with profit within
+        [low_pct, high_pct] at price by entry price alone, and the indexes
+        near either end whose profit was checked with keep(profit_pct).
+        """
+        prices = self._prices
+        start, sure_start = 0, 0
+        end, sure_end = len(prices), len(prices)
+        if high_pct is not None:
+            # Profit at most high_pct: entry price at least entry_price(high_pct)
+            threshold = entry_price(price, high_pct)
+            start = bisect_left(prices, threshold * (1 - MARGIN))
+            sure_start = bisect_right(prices, threshold * (1 + MARGIN), start)
+        if low_pct is not None:
+            # Profit at least low_pct: entry price at most entry_price(low_pct)
+            threshold = entry_price(price, low_pct)
+            end = bisect_right(prices, threshold * (1 + MARGIN), start)
+            sure_end = bisect_left(prices, threshold * (1 - MARGIN), start, end)
+        if sure_start >= sure_end:
+            sure_start = sure_end = start
+            boundary = range(start, end)
+        else:
+            boundary = [*range(start, sure_start), *range(sure_end, end)]
+
+        checked = []
+        for index in boundary:
+            position = self._positions[self._ids[index]]
+            if keep(profit(price, position.filled_size, position.average_filled_price)[3]):
+                checked.append(index)
+        return (sure_start, sure_end), checked
+
+    def _positions_at(self, sure, checked):
+        ids = self._ids[sure[0]:sure[1]] + [self._ids[index] for index in checked]
+        return sorted((self._positions[position_id] for position_id in ids), key=lambda p: self._order[p.position_id])
+
+    def _size_at(self, sure, checked):
+        cumulative = self._sizes()
+        size = cumulative[sure[1]] - cumulative[sure[0]]
+        return size + sum((self._positions[self._ids[index]].filled_size for index in checked), Decimal(0))
+
+    def in_band(self, price, low_pct, high_pct):
+        """ Positions with low_pct <= profit <= high_pct at price, in book order """
+        return self._positions_at(*self._select(
+            price, lambda pct: low_pct <= pct <= high_pct, low_pct=low_pct, high_pct=high_pct
+        ))
+
+    def above(self, price, pct):
+        """ Positions with a profit greater than pct at price, in book order """
+        return self._positions_at(*self._select(price, lambda profit_pct: profit_pct > pct, low_pct=pct))
+
+    def size_above(self, price, pct):
+        """ Total filled size of the positions with a profit greater than pct at price """
+        return self._size_at(*self._select(price, lambda profit_pct: profit_pct > pct, low_pct=pct))
+
+
+class PositionIndexStore:
+    """
+    Position indexes per provider/product/strategy term, the least recently
+    used dropped first. Every lookup evicts the expired positions of all
+    indexes and drops the ones left empty, so the books of products no
+    longer traded do not stay for the life of the container.
+    """
+
+    def __init__(self, maxsize=POSITION_INDEX_SIZE, clock=time.time):
+        self.maxsize = maxsize
+        self.clock = clock
+        self._indexes = OrderedDict()
+
+    def __len__(self):
+        return len(self._indexes)
+
+    def evict(self, now):
+        """ Evicts expired positions everywhere, returns the keys of the indexes dropped """
+        dropped = [key for key, index in self._indexes.items() if index.evict(now) and not len(index)]
+        for key in dropped:
+            del self._indexes[key]
+        return dropped
+
+    def index(self, key, positions):
+        """ The index for key, synced with positions unless it was last synced with the same list """
+        self.evict(self.clock())
+        index = self._indexes.pop(key, None)
+        if index is None:
+            index = PositionIndex()
+        if index.synced is not positions:
+            index.sync(positions)
+        self._indexes[key] = index
+        while len(self._indexes) > self.maxsize:
+            self._indexes.popitem(last=False)
+        return index
+
+
+position_indexes = PositionIndexStore()
@@ -0,0 +1,186 @@
+"""
+Rolling-window statistics over price series.
+
+The classes update in constant (amortised) time per appended value and
+work with any numbers, Decimals included. The functions at the bottom are
+whole-series transforms over float arrays; they import numpy on first
+use so the handler module loads without it.
+"""
+from bisect import bisect_left, insort
+from collections import deque
+from decimal import Decimal
+
+
+class RollingMinMax:
+    """ Minimum and maximum of the last `window` values, kept in monotonic deques """
+
+    def __init__(self, window):
+        if window < 1:
+            raise ValueError(f"Invalid window: {window}")
+        self.window = window
+        self.count = 0
+        self._mins = deque()
+        self._maxs = deque()
+
+    def push(self, value):
+        index = self.count
+        self.count += 1
+        while self._mins and self._mins[-1][1] >= value:
+            self._mins.pop()
+        self._mins.append((index, value))
+        while self._maxs and self._maxs[-1][1] <= value:
+            self._maxs.pop()
+        self._maxs.append((index, value))
+
+        oldest = self.count - self.window
+        if self._mins[0][0] < oldest:
+            self._mins.popleft()
+        if self._maxs[0][0] < oldest:
+            self._maxs.popleft()
+
+    @property
+    def min(self):
+        return self._mins[0][1] if self._mins else None
+
+    @property
+    def max(self):
+        return self._maxs[0][1] if self._maxs else None
+
+
+class RollingMaxMinPct(RollingMinMax):
+    """ Range of the last `window` values as a percentage of their minimum """
+
+    @property
+    def pct(self):
+        low, high = self.min, self.max
+        if low is None or not low:
+            return None
+        return (high - low) / low * 100
+
+
+class RollingMeanVariance:
+    """ Mean and sample variance of the last `window` values (Welford) """
+
+    def __init__(self, window):
+        if window < 1:
+            raise ValueError(f"Invalid window: {window}")
+        self.window = window
+        self.values = deque()
+        self.mean = 0
+        self._m2 = 0
+
+    def push(self, value):
+        self.values.append(value)
+        if len(self.values) > self.window:
+            old = self.values.popleft()
+            # Replace the oldest value in a single update
+            mean = self.mean + (value - old) / self.window
+            self._m2 += (value - old) * (value - mean + old - self.mean)
+            self.mean = mean
+        else:
+            delta = value - self.mean
+            self.mean += delta / len(self.values)
+            self._m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self):
+        count = len(self.values)
+        if count < 2:
+            return None
+        # Rounding can leave a tiny negative sum for constant windows
+        return max(self._m2, 0) / (count - 1)
+
+
+class RollingPercentile:
+    """
+    Percentile `q` (0-100, linear interpolation) of the last `window`
+    values, kept sorted by bisection.
+    """
+
+    def __init__(self, window, q):
+        if window < 1:
+            raise ValueError(f"Invalid window: {window}")
+        if not 0 <= q <= 100:
+            raise ValueError(f"Invalid percentile: {q}")
+        self.window = window
+        self.q = q
+        self.values = deque()
+        self._sorted = []
+
+    def push(self, value):
+        self.values.append(value)
+        insort(self._sorted, value)
+        if len(self.values) > self.window:
+            old = self.values.popleft()
+            del self._sorted[bisect_left(self._sorted, old)]
+
+    @property
+    def value(self):
+        if not self._sorted:
+            return None
+        position = (len(self._sorted) - 1) * self.q / 100
+        lower = int(position)
+        upper = min(lower + 1, len(self._sorted) - 1)
+        fraction = position - lower
+        low, high = self._sorted[lower], self._sorted[upper]
+        if not fraction:
+            return low
+        if isinstance(low, Decimal):
+            fraction = Decimal(repr(fraction))
+        return low + (high - low) * fraction
+
+
+def _windows(values, window):
+    import numpy as np
+
+    values = np.asarray(values, dtype=float)
+    if window < 1:
+        raise ValueError(f"Invalid window: {window}")
+    if len(values) < window:
+        return values, np.empty((0, window))
+    return values, np.lib.stride_tricks.sliding_window_view(values, window)
+
+
+def rolling_min(values, window):
+    """ Minimum of every full window, oldest window first """
+    return _windows(values, window)[1].min(axis=1)
+
+
+def rolling_max(values, window):
+    return _windows(values, window)[1].max(axis=1)
+
+
+def rolling_max_min_pct(values, window):
+    windows = _windows(values, window)[1]
+    low = windows.min(axis=1)
+    return (windows.max(axis=1) - low) / low * 100
+
+
+def rolling_mean(values, window):
+    """ Mean of every full window, from one cumulative sum """
+    import numpy as np
+
+    values = _windows(values, window)[0]
+    if len(values) < window:
+        return np.empty(0)
+    sums = np.cumsum(np.concatenate(([0.0], values)))
+    return (sums[window:] - sums[:-window]) / window
+
+
+def rolling_variance(values, window):
+    """ Sample variance of every full window """
+    import numpy as np
+
+    values, windows = _windows(values, window)
+    if window < 2:
+        return np.full(len(windows), np.nan)
+    return windows.var(axis=1, ddof=1)
+
+
+def rolling_percentile(values, window, q):
+    import numpy as np
+
+    windows = _windows(values, window)[1]
+    if not len(windows):
+        return np.empty(0)
+    return np.percentile(windows, q, axis=1)
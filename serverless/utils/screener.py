@@ -0,0 +1,108 @@
+"""
+Screening of a whole product universe before the per-product strategy.
+
+Recent closes and lows of every product are held as (products x time)
+matrices, and the cheap checks of a run (the price diff gate, proximity
+to support and momentum) are evaluated for all products at once. numpy
+is imported on first use so the handler module loads without it.
+"""
+import warnings
+
+
+class UniverseScreener:
+    """
+    The latest `window` candles of a fixed list of products. Rows are
+    products; columns form a ring buffer, so appending a candle for every
+    product is one column write. Products without a full window are NaN
+    padded and never screened out.
+    """
+
+    def __init__(self, product_ids, window):
+        import numpy as np
+
+        if window < 2:
+            raise ValueError(f"Invalid window: {window}")
+        self.product_ids = list(product_ids)
+        self.rows = {product_id: row for row, product_id in enumerate(self.product_ids)}
+        self.window = window
+        self.closes = np.full((len(self.product_ids), window), np.nan)
+        self.lows = np.full((len(self.product_ids), window), np.nan)
+        self.head = 0  # Column of the oldest candle
+
+    def load(self, product_id, candles):
+        """ Replaces a product's row with its latest candles (provider format, newest first) """
+        import numpy as np
+
+        candles = candles[:self.window]
+        row = self.rows[product_id]
+        closes = np.full(self.window, np.nan)
+        lows = np.full(self.window, np.nan)
+        count = len(candles)
+        if count:
+            closes[-count:] = [float(candle["close"]) for candle in reversed(candles)]
+            lows[-count:] = [float(candle["low"]) for candle in reversed(candles)]
+        self.closes[row] = np.roll(closes, self.head)
+        self.lows[row] = np.roll(lows, self.head)
+
+    def push(self, closes, lows=None):
+        """
+        Appends one candle for every product, as arrays in product order
+        (NaN where a product has none). The oldest candle is dropped.
+        """
+        import numpy as np
+
+        closes = np.asarray(closes, dtype=float)
+        self.closes[:, self.head] = closes
+        self.lows[:, self.head] = closes if lows is None else np.asarray(lows, dtype=float)
+        self.head = (self.head + 1) % self.window
+
+    def ordered(self):
+        """ (closes, lows) with the columns oldest first """
+        import numpy as np
+
+        if self.head == 0:
+            return self.closes, self.lows
+        order = np.r_[self.head:self.window, 0:self.head]
+        return self.closes[:, order], self.lows[:, order]
+
+    def screen(self, restricted=None, support_threshold=0.01, tolerance=0.05, momentum_window=12):
+        """
+        The checks of every product in one pass, as arrays in product order:
+        diff_pct (newest against oldest close, in percent), restricted
+        (diff_pct within the (min, max) restricted range), support (the
+        cluster level of the lows), support_distance (relative distance of
+        the newest close to it), near_support (distance below
+        support_threshold) and momentum (percent change over the latest
+        momentum_window candles).
+        """
+        import numpy as np
+
+        from utils.timeframes import cluster_levels
+
+        closes, lows = self.ordered()
+        latest, oldest = closes[:, -1], closes[:, 0]
+        # Incomplete rows give NaN, which fails every comparison
+        with warnings.catch_warnings(), np.errstate(divide="ignore", invalid="ignore"):
+            warnings.simplefilter("ignore", RuntimeWarning)
+            diff_pct = (latest - oldest) / oldest * 100
+            if restricted:
+                low, high = float(restricted[0]), float(restricted[1])
+                in_range = (diff_pct >= low) & (diff_pct <= high)
+            else:
+                in_range = np.zeros(len(closes), dtype=bool)
+            support = cluster_levels(lows, tolerance)
+            support_distance = np.abs(latest - support) / support
+            start = closes[:, -min(momentum_window, self.window)]
+            momentum = (latest - start) / start * 100
+
+        return {
+            "product_ids": self.product_ids,
+            "complete": ~np.isnan(closes).any(axis=1),
+            "diff_pct": diff_pct,
+            "restricted": in_range,
+            "support": support,
+            "support_distance": support_distance,
+            "near_support": support_distance < float(support_threshold),
+            "momentum": momentum,
+        }
+
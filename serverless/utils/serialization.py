@@ -0,0 +1,96 @@
+import decimal
+import json
+import math
+import os
+
+from itertools import chain
+from pydantic import BaseModel
+from ulid import ULID
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised when orjson is not packaged
+    orjson = None
+
+
+# "orjson" when it is installed, "json" forces the stdlib encoder
+JSON_BACKEND = os.environ.get("JSON_BACKEND", "orjson" if orjson else "json")
+
+# orjson's compact separators, so both backends write the same strings for
+# everything but float exponents (orjson 1e16 and 1e-7, stdlib 1e+16 and
+# 1e-07), which decode to the same values. Neither matches the spacing of
+# the previous DecimalEncoder, only its decoded content.
+SEPARATORS = (",", ":")
+
+# Types orjson encodes natively but the stdlib does not go through default(),
+# so both backends reject them alike
+ORJSON_OPTIONS = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS) if orjson else 0
+
+
+def default(o):
+    """
+    Encodes the non-JSON types we send. Decimals and ULIDs keep their exact
+    string form, pydantic models use their JSON mode dump.
+    """
+    if isinstance(o, decimal.Decimal):
+        return str(o)
+    if isinstance(o, ULID):
+        return str(o)
+    if isinstance(o, BaseModel):
+        return o.model_dump(mode="json")
+    raise TypeError(f"Object of type {o.__class__.__name__} is not JSON serializable")
+
+
+CONTAINERS = {dict, list, tuple}
+
+
+def _non_finite(obj):
+    """
+    Whether obj holds a NaN or infinite float. Values are checked a nesting
+    level at a time with builtins, so a candle window costs a few passes
+    in C rather than a Python step per value.
+    """
+    level = [obj]
+    while level:
+        dicts, sequences = [], []
+        for container in level:
+            (dicts if type(container) is dict else sequences).append(container)
+        values = list(chain(chain.from_iterable(map(dict.values, dicts)), chain.from_iterable(sequences)))
+        types = set(map(type, values))
+        if float in types and not all(math.isfinite(value) for value in values if type(value) is float):
+            return True
+        if types.isdisjoint(CONTAINERS):
+            return False
+        level = [value for value in values if type(value) in CONTAINERS]
+    return False
+
+
+def _stdlib_dumps(obj):
+    # NaN and Infinity are not JSON, rejected with a ValueError
+    return json.dumps(obj, default=default, separators=SEPARATORS, ensure_ascii=False, allow_nan=False)
+
+
+def _orjson_dumps(obj):
+    try:
+        data = orjson.dumps(obj, default=default, option=ORJSON_OPTIONS)
+    except orjson.JSONEncodeError:
+        # Integers over 64 bits and non-str dict keys, stdlib handles both
+        return _stdlib_dumps(obj)
+    # orjson writes NaN and Infinity as null, only bodies with a null can hold one
+    if b"null" in data and _non_finite([obj]):
+        raise ValueError("Out of range float values are not JSON compliant")
+    return data.decode("utf-8")
+
+
+def _orjson_loads(data):
+    try:
+        return orjson.loads(data)
+    except orjson.JSONDecodeError:
+        # NaN/Infinity literals and integers over 64 bits, same for loads
+        return json.loads(data)
+
+
+if JSON_BACKEND == "orjson" and orjson is not None:
+    dumps, loads = _orjson_dumps, _orjson_loads
+else:
+    dumps, loads = _stdlib_dumps, json.loads
@@ -0,0 +1,80 @@
+import re
+
+from typing import List
+
+from pydantic import TypeAdapter, ValidationError
+
+from models.signals import Signal
+
+
+FIELDS = ("indicator", "side", "reason", "price", "size", "entry", "index")
+
+# Formatted strings of the indicators service before the typed schema, e.g.
+# "SMA Signal: Buy at price: 100", "Sell at price: 101 size: 0.001 entry: 99"
+# or "Stop-loss sell at price: 95 size: 0.001 entry: 100"
+LEGACY_SIGNAL = re.compile(
+    r"(?:(?P<indicator>\w+) Signal: )?"
+    r"(?:(?P<reason>Stop-loss|Take-profit) )?"
+    r"(?P<side>[Bb]uy|[Ss]ell) at price: (?P<price>\S+)"
+    r"(?: size: (?P<size>\S+))?"
+    r"(?: entry: (?P<entry>\S+))?"
+)
+LEGACY_REASONS = {None: "CROSS", "Stop-loss": "STOP_LOSS", "Take-profit": "TAKE_PROFIT"}
+DEFAULTS = {"reason": "CROSS"}
+
+_signals = TypeAdapter(List[Signal])
+
+
+class SignalDecodeException(Exception):
+    pass
+
+
+def _float(value):
+    return float(value) if value is not None else None
+
+
+def parse_legacy(text):
+    """ Record with the schema fields from a formatted signal string """
+    match = LEGACY_SIGNAL.fullmatch(text)
+    if match is None:
+        raise SignalDecodeException(f"Unrecognised signal: {text!r}")
+    try:
+        return {
+            "indicator": match["indicator"] or "SMA",
+            "side": match["side"].upper(),
+            "reason": LEGACY_REASONS[match["reason"]],
+            "price": float(match["price"]),
+            "size": _float(match["size"]),
+            "entry": _float(match["entry"]),
+            "index": None,
+        }
+    except ValueError as e:
+        raise SignalDecodeException(f"Unrecognised signal: {text!r}") from e
+
+
+def records(signals):
+    """
+    Signal records (dicts with the schema fields) from typed signals,
+    legacy strings or a mix of both. Records are not validated.
+    """
+    result = []
+    for signal in signals or ():
+        if isinstance(signal, str):
+            result.append(parse_legacy(signal))
+        else:
+            result.append({field: signal.get(field, DEFAULTS.get(field)) for field in FIELDS})
+    return result
+
+
+def decode(signals):
+    """ Validated Signal models from typed signals or legacy strings """
+    try:
+        return _signals.validate_python(records(signals))
+    except ValidationError as e:
+        raise SignalDecodeException(str(e)) from e
+
+
+def columns(signals):
+    """ One list per schema field, for consumers working on whole columns """
+    rows = records(signals)
+    return {field: [row[field] for row in rows] for field in FIELDS}
@@ -0,0 +1,248 @@
+"""
+Multi-timeframe views of one candle series.
+
+The series (provider format, newest first) is resampled to every coarser
+timeframe at once, and the confirmation features (support/resistance,
+engulfing patterns and moving averages) are derived for all timeframes
+in one batch of array operations. numpy is imported on first use so the
+handler module loads without it.
+
+Bars are aligned to multiples of their period in UNIX time, as the
+provider's candles are, and the newest bar of every timeframe ends with
+the newest candle of the series, so all rows describe the same moment.
+"""
+
+# Timeframes derived from a finer series, in seconds, finest first
+TIMEFRAMES = {
+    "5m": 300,
+    "15m": 900,
+    "1h": 3600,
+    "4h": 3600 * 4,
+    "1d": 3600 * 24,
+}
+
+# Bars of each timeframe the support/resistance levels are taken over
+TIMEFRAME_WINDOW = 12
+
+COLUMNS = (
+    "timeframe", "period", "bars", "start",
+    "open", "high", "low", "close", "volume",
+    "support", "resistance", "bullish_engulfing", "bearish_engulfing",
+    "sma_fast", "sma_slow", "trend",
+)
+
+
+def _series(candles):
+    """ start, open, high, low, close and volume arrays of the candles, oldest first """
+    import numpy as np
+
+    ordered = candles[::-1]
+    starts = np.fromiter((int(candle["start"]) for candle in ordered), dtype=np.int64, count=len(ordered))
+    prices = np.array(
+        [
+            [float(candle[field]) for field in ("open", "high", "low", "close", "volume")]
+            for candle in ordered
+        ],
+        dtype=float,
+    ).reshape(len(ordered), 5)
+    return (starts, *prices.T)
+
+
+def granularity(starts):
+    """ Seconds between the candles of a series, the smallest gap between two starts """
+    import numpy as np
+
+    gaps = np.diff(starts)
+    gaps = gaps[gaps > 0]
+    return int(gaps.min()) if len(gaps) else None
+
+
+def supported(periods, base):
+    """ Timeframes that are whole multiples of the series' granularity """
+    return {
+        name: period for name, period in periods.items()
+        if base is not None and period >= base and period % base == 0
+    }
+
+
+def resample_bars(candles, periods):
+    """
+    OHLCV bars of every period from one series, in one pass over the
+    series repeated once per period. Returns (row, start, open, high, low,
+    close, volume) arrays of all bars, grouped by period and oldest first
+    within each; `row` is the index of the bar's period.
+    """
+    return _resample(_series(candles), periods)
+
+
+def _resample(series, periods):
+    import numpy as np
+
+    starts, opens, highs, lows, closes, volumes = series
+    periods = np.asarray(periods, dtype=np.int64)
+    count = len(starts)
+    buckets = (starts // periods[:, None]).ravel()
+
+    # A bar begins where the bucket changes or a period's series begins
+    begins = np.ones(len(buckets), dtype=bool)
+    begins[1:] = buckets[1:] != buckets[:-1]
+    begins[::count] = True
+    first = np.flatnonzero(begins)
+    last = np.append(first[1:], len(buckets)) - 1
+
+    rows = first // count
+    return (
+        rows,
+        buckets[first] * periods[rows],
+        np.tile(opens, len(periods))[first],
+        np.maximum.reduceat(np.tile(highs, len(periods)), first),
+        np.minimum.reduceat(np.tile(lows, len(periods)), first),
+        np.tile(closes, len(periods))[last],
+        np.add.reduceat(np.tile(volumes, len(periods)), first),
+    )
+
+
+def resample(candles, period):
+    """ Candles of one coarser period in the provider format, newest first """
+    _, starts, opens, highs, lows, closes, volumes = resample_bars(candles, [period])
+    bars = [
+        {
+            "start": str(int(start)),
+            "low": repr(float(low)),
+            "high": repr(float(high)),
+            "open": repr(float(open_)),
+            "close": repr(float(close)),
+            "volume": repr(float(volume)),
+        }
+        for start, open_, high, low, close, volume in zip(starts, opens, highs, lows, closes, volumes)
+    ]
+    bars.reverse()
+    return bars
+
+
+def _latest(counts, width):
+    """
+    Indexes of the latest `width` bars of every timeframe, one row per
+    timeframe and oldest first, with a mask of the positions that exist
+    """
+    import numpy as np
+
+    ends = np.cumsum(counts)
+    positions = ends[:, None] - width + np.arange(width)
+    return np.clip(positions, 0, None), positions >= (ends - counts)[:, None]
+
+
+def _sma(closes, counts, period):
+    import numpy as np
+
+    if not period or period > closes.shape[1]:
+        return np.full(len(closes), np.nan)
+    means = closes[:, -period:].mean(axis=1)
+    return np.where(counts >= period, means, np.nan)
+
+
+def cluster_levels(values, tolerance):
+    """
+    Per row, the mean of the values within tolerance of every other value
+    of the row, the support/resistance rule of utils.features on a
+    matrix. NaN pads are ignored, rows without such values give NaN.
+    """
+    import numpy as np
+
+    low = np.nanmin(values, axis=1, keepdims=True)
+    high = np.nanmax(values, axis=1, keepdims=True)
+    within = (high - values <= tolerance * values) & (values - low <= tolerance * values)
+    totals = np.where(within, values, 0).sum(axis=1)
+    counts = within.sum(axis=1)
+    return np.where(counts > 0, totals / np.maximum(counts, 1), np.nan)
+
+
+def _engulfing(opens, closes):
+    """ Bullish and bearish engulfing per row, any pair of consecutive bars """
+    prev_open, prev_close = opens[:, :-1], closes[:, :-1]
+    curr_open, curr_close = opens[:, 1:], closes[:, 1:]
+    bullish = (
+        (prev_close < prev_open) & (curr_close > curr_open)
+        & (curr_close > prev_open) & (curr_open < prev_close)
+    )
+    bearish = (
+        (prev_close > prev_open) & (curr_close < curr_open)
+        & (curr_open > prev_close) & (curr_close < prev_open)
+    )
+    return bullish.any(axis=1), bearish.any(axis=1)
+
+
+def _value(value):
+    return None if value != value else float(value)
+
+
+def timeframe_table(
+    candles,
+    timeframes=TIMEFRAMES,
+    window=TIMEFRAME_WINDOW,
+    candle_stick_scope=12,
+    tolerance=0.05,
+    n1=14,
+    n2=50,
+):
+    """
+    Confirmation features of every timeframe the series can be resampled
+    to, as {timeframe: row} ordered like `timeframes`. A row holds the
+    COLUMNS: the newest (possibly still forming) bar, the levels over the
+    latest `window` bars, engulfing patterns within the latest
+    `candle_stick_scope` bars, the n1/n2 bar SMAs and their trend, "UP" or
+    "DOWN". Values that need more bars than the series covers are None.
+    Timeframes finer than the series or not a multiple of it are left out.
+    """
+    import numpy as np
+
+    if not candles:
+        return {}
+    series = _series(candles)
+    periods = supported(timeframes, granularity(series[0]))
+    if not periods:
+        return {}
+
+    rows, starts, opens, highs, lows, closes, volumes = _resample(series, list(periods.values()))
+    counts = np.bincount(rows, minlength=len(periods))
+    ends = np.cumsum(counts) - 1
+    width = max(window, candle_stick_scope or 0, n1 or 0, n2 or 0)
+    positions, valid = _latest(counts, width)
+    latest = {
+        name: np.where(valid, values[positions], np.nan)
+        for name, values in (("open", opens), ("high", highs), ("low", lows), ("close", closes))
+    }
+
+    support = cluster_levels(latest["low"][:, -window:], tolerance)
+    resistance = cluster_levels(latest["high"][:, -window:], tolerance)
+    scope = candle_stick_scope or width
+    bullish, bearish = _engulfing(latest["open"][:, -scope:], latest["close"][:, -scope:])
+    sma_fast = _sma(latest["close"], counts, n1)
+    sma_slow = _sma(latest["close"], counts, n2)
+
+    table = {}
+    for row, (name, period) in enumerate(periods.items()):
+        end = ends[row]
+        fast, slow = _value(sma_fast[row]), _value(sma_slow[row])
+        trend = None
+        if fast is not None and slow is not None and fast != slow:
+            trend = "UP" if fast > slow else "DOWN"
+        table[name] = {
+            "timeframe": name,
+            "period": period,
+            "bars": int(counts[row]),
+            "start": int(starts[end]),
+            "open": float(opens[end]),
+            "high": float(highs[end]),
+            "low": float(lows[end]),
+            "close": float(closes[end]),
+            "volume": float(volumes[end]),
+            "support": _value(support[row]),
+            "resistance": _value(resistance[row]),
+            "bullish_engulfing": bool(bullish[row]),
+            "bearish_engulfing": bool(bearish[row]),
+            "sma_fast": fast,
+            "sma_slow": slow,
+            "trend": trend,
+        }
+    return table
@@ -0,0 +1,182 @@
+import os
+
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from decimal import Decimal
+
+from utils.position_index import MARGIN, profit
+
+
+# Product/strategy term books kept per container
+TRIGGER_BOOK_SIZE = int(os.environ.get("TRIGGER_BOOK_SIZE", 64))
+
+BELOW, NOTIFY, SELL = "BELOW", "NOTIFY", "SELL"
+
+
+def band(price, position, min_pct, profit_target):
+    """ The band a position is in at price, as review_positions decides it """
+    profit_pct = profit(price, position.filled_size, position.average_filled_price)[3]
+    if min_pct <= profit_pct <= profit_target:
+        return NOTIFY
+    if profit_pct > max(min_pct, profit_target):
+        return SELL
+    return BELOW
+
+
+class Crossings:
+    """ Positions that entered the notification band and the sell band, in book order """
+
+    def __init__(self, notify, sell):
+        self.notify = notify
+        self.sell = sell
+
+    def __bool__(self):
+        return bool(self.notify or self.sell)
+
+
+class TriggerBook:
+    """
+    Prices at which each position of a book enters the notification band
+    (min_pct profit) and the sell band (above profit_target), sorted.
+
+    A new price only touches the positions with a threshold between the
+    previous price and it, so an update costs O(log n + crossings). The
+    band of every touched position is decided with profit() itself, so a
+    position's band is always the one review_positions would give it.
+    """
+
+    def __init__(self, profit_target, min_pct=Decimal("4.0")):
+        self.profit_target = profit_target
+        self.min_pct = min_pct
+        self.price = None
+        self._positions = {}
+        self._order = {}
+        self._bands = {}
+        self._selling = set()
+        self._prices = []  # Sorted thresholds, both of every position
+        self._ids = []  # Position ids, in the order of _prices
+        self._unknown = set()  # Positions whose band was not decided yet
+        self.degenerate = 0  # Positions profit() cannot be computed for
+        self.synced = None  # The positions list of the last sync while unchanged since
+
+    def __len__(self):
+        return len(self._positions)
+
+    @staticmethod
+    def _is_degenerate(position):
+        return not position.filled_size or position.average_filled_price <= 0
+
+    def _threshold_prices(self, position):
+        entry = position.average_filled_price
+        return (
+            entry * (100 + self.min_pct) / 100,
+            entry * (100 + max(self.min_pct, self.profit_target)) / 100,
+        )
+
+    def add(self, position, order=None):
+        """ Adds or replaces a position, its band is decided on the next update """
+        position_id = position.position_id
+        self.remove(position_id)
+        self._positions[position_id] = position
+        self._order[position_id] = len(self._order) if order is None else order
+        for price in self._threshold_prices(position):
+            index = bisect_right(self._prices, price)
+            self._prices.insert(index, price)
+            self._ids.insert(index, position_id)
+        self._unknown.add(position_id)
+        self.degenerate += self._is_degenerate(position)
+        self.synced = None
+
+    def remove(self, position_id):
+        position = self._positions.pop(position_id, None)
+        if position is None:
+            return None
+        for price in self._threshold_prices(position):
+            index = bisect_left(self._prices, price)
+            while self._ids[index] != position_id:
+                index += 1
+            del self._prices[index]
+            del self._ids[index]
+        del self._order[position_id]
+        self._bands.pop(position_id, None)
+        self._selling.discard(position_id)
+        self._unknown.discard(position_id)
+        self.degenerate -= self._is_degenerate(position)
+        self.synced = None
+        return position
+
+    def sync(self, positions):
+        """ Makes the book hold exactly `positions`, unchanged positions keep their band """
+        incoming = {position.position_id: position for position in positions}
+        for position_id in [position_id for position_id in self._positions if position_id not in incoming]:
+            self.remove(position_id)
+        for order, position in enumerate(positions):
+            current = self._positions.get(position.position_id)
+            if current is None or current.average_filled_price != position.average_filled_price \
+                    or current.filled_size != position.filled_size:
+                self.add(position, order)
+            else:
+                self._positions[position.position_id] = position
+                self._order[position.position_id] = order
+        self.synced = positions
+
+    def _crossed(self, previous, price):
+        """ Ids of the positions with a threshold between the previous price and price """
+        low, high = min(previous, price), max(previous, price)
+        start = bisect_left(self._prices, low * (1 - MARGIN))
+        end = bisect_right(self._prices, high * (1 + MARGIN), start)
+        return set(self._ids[start:end])
+
+    def update(self, price):
+        """ Moves the book to price, returns the Crossings since the previous price """
+        touched = set(self._unknown)
+        if self.price is not None:
+            touched |= self._crossed(self.price, price)
+        self.price = price
+        self._unknown = set()
+
+        notify, sell = [], []
+        for position_id in touched:
+            position = self._positions[position_id]
+            current = band(price, position, self.min_pct, self.profit_target)
+            if current != self._bands.get(position_id):
+                self._bands[position_id] = current
+                if current == SELL:
+                    self._selling.add(position_id)
+                else:
+                    self._selling.discard(position_id)
+                if current == NOTIFY:
+                    notify.append(position)
+                elif current == SELL:
+                    sell.append(position)
+        return Crossings(self._in_order(notify), self._in_order(sell))
+
+    def _in_order(self, positions):
+        return sorted(positions, key=lambda position: self._order[position.position_id])
+
+    def sellable(self):
+        """ Positions in the sell band at the latest price, in book order """
+        return self._in_order([self._positions[position_id] for position_id in self._selling])
+
+
+class TriggerBookStore:
+    """ Trigger books per provider/product/strategy term, the least recently used dropped first """
+
+    def __init__(self, maxsize=TRIGGER_BOOK_SIZE):
+        self.maxsize = maxsize
+        self._books = OrderedDict()
+
+    def book(self, key, positions, profit_target, min_pct=Decimal("4.0")):
+        """ The book for key synced with positions, a new one when the targets changed """
+        book = self._books.pop(key, None)
+        if book is None or book.profit_target != profit_target or book.min_pct != min_pct:
+            book = TriggerBook(profit_target, min_pct)
+        if book.synced is not positions:
+            book.sync(positions)
+        self._books[key] = book
+        while len(self._books) > self.maxsize:
+            self._books.popitem(last=False)
+        return book
+
+
+trigger_books = TriggerBookStore()
@@ -0,0 +1,160 @@
+import heapq
+import math
+import os
+
+from collections import deque
+from decimal import Decimal
+
+from utils.indicator_cache import DynamoDBResultBackend
+
+
+# Bin width as a percentage of the price the profile is created at
+VOLUME_PROFILE_BIN_PCT = float(os.environ.get("VOLUME_PROFILE_BIN_PCT", 0.25))
+# Closed candles a profile covers
+VOLUME_PROFILE_WINDOW = int(os.environ.get("VOLUME_PROFILE_WINDOW", 300))
+# High-volume nodes considered as support/resistance candidates
+VOLUME_PROFILE_TOP_K = int(os.environ.get("VOLUME_PROFILE_TOP_K", 5))
+# "dynamodb" shares profiles between containers through the cache table
+VOLUME_PROFILE_BACKEND = os.environ.get("VOLUME_PROFILE_BACKEND", "memory")
+VOLUME_PROFILE_TTL = 3600 * 24
+
+
+def typical_price(candle):
+    return (float(candle["high"]) + float(candle["low"]) + float(candle["close"])) / 3
+
+
+class VolumeProfile:
+    """
+    Volume-at-price histogram over the latest `window` closed candles.
+
+    Each candle adds its volume to the fixed-width bin of its typical
+    price, so adding a candle and ageing one out are O(1) and a query is
+    O(bins). The newest candle of a window may still be open: it counts
+    towards queries but is only added once a newer candle arrives.
+    """
+
+    def __init__(self, bin_size, window=VOLUME_PROFILE_WINDOW):
+        if bin_size <= 0:
+            raise ValueError(f"Invalid bin size: {bin_size}")
+        self.bin_size = bin_size
+        self.window = window
+        self.bins = {}
+        self.candles = deque()  # (start, bin, volume), oldest first
+        self.open_candle = None
+
+    @classmethod
+    def for_price(cls, price, bin_pct=VOLUME_PROFILE_BIN_PCT, window=VOLUME_PROFILE_WINDOW):
+        return cls(float(price) * bin_pct / 100, window)
+
+    def bin(self, price):
+        return math.floor(price / self.bin_size)
+
+    @property
+    def last_start(self):
+        return self.candles[-1][0] if self.candles else None
+
+    def _add(self, start, candle):
+        index = self.bin(typical_price(candle))
+        volume = float(candle["volume"])
+        self.bins[index] = self.bins.get(index, 0.0) + volume
+        self.candles.append((start, index, volume))
+        if len(self.candles) > self.window:
+            _, old_index, old_volume = self.candles.popleft()
+            remaining = self.bins[old_index] - old_volume
+            if remaining > 1e-12:
+                self.bins[old_index] = remaining
+            else:
+                del self.bins[old_index]
+
+    def update(self, candles):
+        """ Adds the candles newer than the profile, given newest first """
+        if not candles:
+            return
+        last_start = self.last_start
+        closed = []
+        for candle in candles[1:]:
+            start = int(candle["start"])
+            if last_start is not None and start <= last_start:
+                break
+            closed.append((start, candle))
+        for start, candle in reversed(closed):
+            self._add(start, candle)
+        self.open_candle = candles[0]
+
+    def volumes(self):
+        """ Volume per bin, the open candle included """
+        if self.open_candle is None:
+            return self.bins
+        volumes = dict(self.bins)
+        index = self.bin(typical_price(self.open_candle))
+        volumes[index] = volumes.get(index, 0.0) + float(self.open_candle["volume"])
+        return volumes
+
+    def top_nodes(self, k=VOLUME_PROFILE_TOP_K):
+        """ (bin centre price, volume) of the k highest-volume bins """
+        return [
+            ((index + 0.5) * self.bin_size, volume)
+            for index, volume in heapq.nlargest(k, self.volumes().items(), key=lambda item: item[1])
+        ]
+
+    def levels(self, price, k=VOLUME_PROFILE_TOP_K):
+        """
+        Support and resistance: the nearest of the top-k nodes below and
+        above the price, None when there is none on that side.
+        """
+        price = float(price)
+        nodes = [node for node, _ in self.top_nodes(k)]
+        below = [node for node in nodes if node <= price]
+        above = [node for node in nodes if node > price]
+        return {
+            "support": Decimal(repr(max(below))) if below else None,
+            "resistance": Decimal(repr(min(above))) if above else None,
+        }
+
+    def to_dict(self):
+        return {
+            "bin_size": self.bin_size,
+            "window": self.window,
+            "candles": [list(candle) for candle in self.candles],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        profile = cls(data["bin_size"], data["window"])
+        for start, index, volume in data["candles"]:
+            profile.bins[index] = profile.bins.get(index, 0.0) + volume
+            profile.candles.append((start, index, volume))
+        return profile
+
+
+class VolumeProfileStore:
+    """ Profiles per provider/product/strategy term, kept in memory and optionally in the cache table """
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self._profiles = {}
+
+    def profile(self, key, candles):
+        """ The profile for key updated with candles (newest first) """
+        profile = self._profiles.get(key)
+        if profile is None and self.backend is not None:
+            found, data = self.backend.get(key)
+            if found:
+                profile = VolumeProfile.from_dict(data)
+        if profile is None:
+            profile = VolumeProfile.for_price(candles[0]["close"])
+
+        last_start = profile.last_start
+        profile.update(candles)
+        self._profiles[key] = profile
+        if self.backend is not None and profile.last_start != last_start:
+            self.backend.set(key, profile.to_dict())
+        return profile
+
+
+volume_profiles = VolumeProfileStore(
+    backend=(
+        DynamoDBResultBackend(ttl=VOLUME_PROFILE_TTL, prefix="volume_profile_")
+        if VOLUME_PROFILE_BACKEND == "dynamodb" else None
+    ),
+)